@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the matrix build and summary hot paths.
+
+Each benchmark first checks that the fast path returns exactly what the
+reference implementation returns on the same input, then times both over the
+real corpus (or rows) and prints one line per implementation. A speedup is
+never reported over a result that differs: a mismatch exits 1.
+
+    python3 scripts/registry-census/bench_matrix.py rewrite [--repeat 5]
+    python3 scripts/registry-census/bench_matrix.py verdict [--packs 18790]
+    python3 scripts/registry-census/bench_matrix.py model [--packs 20000]
+    python3 scripts/registry-census/bench_matrix.py load [--packs 5000]
+    python3 scripts/registry-census/bench_matrix.py sensitivity [--rows DIR]
+
+verdict has no corpus to read: it writes a synthetic population of row
+files, by default ten times the 1,879-pack baseline run.
+
+sensitivity is the verdict's counter-evidence without a vitest run. It takes
+passing rows (a real run's, or synthetic ones the baseline's size), damages
+more and more packs one way at a time (MUTATIONS) and bisects for the fewest
+that breach the criterion the damage targets, merging each population's
+aggregate from blocks aggregated once (damaged_aggregates()). It exits 1 when
+some damage never breaches its criterion, or the verdict is withheld first.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+import build_matrix  # noqa: E402
+import summarize_matrix  # noqa: E402
+from matrix_rows import READ_WORKERS, read_rows  # noqa: E402
+
+BASELINE_PACKS = 1879  # run 31624366070
+BATTERY = (
+    'load', 'serialize', 'reload', 'clone', 'collapse', 'resize', 'bypass',
+    'mute', 'widgetSet', 'connect', 'disconnect', 'undo',
+)
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name: str, seconds: float, base: float, unit: str, n: int) -> None:
+    print(
+        f'{name:<12} {seconds * 1000:9.1f} ms  {n / seconds:12,.0f} {unit}/s'
+        f'  x{base / seconds:5.2f}'
+    )
+
+
+def corpus_sources(limit: int = 0) -> list[str]:
+    texts = []
+    for pack in sorted(os.listdir(build_matrix.REPOS)):
+        src = os.path.join(build_matrix.REPOS, pack)
+        if not os.path.isdir(src):
+            continue
+        for fp, _rel, is_asset in build_matrix.pack_files(src):
+            try:
+                if is_asset or os.path.getsize(fp) > build_matrix.MAX_FILE_BYTES:
+                    continue
+                with open(fp, encoding='utf-8', errors='ignore') as fh:
+                    texts.append(fh.read())
+            except OSError:
+                continue
+        if limit and len(texts) >= limit:
+            break
+    return texts
+
+
+def bench_rewrite(args: argparse.Namespace) -> int:
+    if not os.path.isdir(build_matrix.REPOS):
+        sys.exit(f'corpus missing: {build_matrix.REPOS}')
+    texts = corpus_sources(args.limit)
+    sequential = [build_matrix.rewrite_sequential(t) for t in texts]
+    fused = [build_matrix.Rewriter().rewrite(t) for t in texts]
+    differ = sum(1 for a, b in zip(sequential, fused) if a != b)
+    if differ:
+        print(f'{differ} of {len(texts)} files rewrite differently', file=sys.stderr)
+        return 1
+    rewriter = build_matrix.Rewriter()
+    skipped = sum(
+        1 for t in texts if not any(n in t for n in rewriter.needles)
+    )
+    size = sum(len(t) for t in texts)
+    print(
+        f'{len(texts)} files, {size / 1e6:.1f} MB of JS,'
+        f' {skipped} ({skipped / max(len(texts), 1):.0%}) rejected by the prefilter,'
+        f' {sum(1 for _t, a in fused if a)} pack-rule hits; outputs identical'
+    )
+
+    def run_sequential() -> None:
+        for t in texts:
+            build_matrix.rewrite_sequential(t)
+
+    def run_fused() -> None:
+        cold = build_matrix.Rewriter()
+        for t in texts:
+            cold.rewrite(t)
+
+    base = best_of(args.repeat, run_sequential)
+    report('sequential', base, base, 'files', len(texts))
+    report('fused', best_of(args.repeat, run_fused), base, 'files', len(texts))
+    return 0
+
+
+def synthetic_row(rnd: random.Random, pack: str) -> dict:
+    """A row shaped like the runner's, with roughly the baseline's failures."""
+    if rnd.random() < 0.005:
+        return {'pack': pack, 'incomplete': True}
+    load = {
+        f'./web/js/e{i}.js': 'OK' if rnd.random() < 0.95 else 'THREW TypeError'
+        for i in range(rnd.randint(1, 4))
+    }
+    ops = {}
+    for op in BATTERY:
+        info = {'err': '', 'sig': f'{{"nodes":{rnd.randint(5, 9)}}}', 'depr': '', 'desync': ''}
+        if rnd.random() < 0.002:
+            info['err'] = rnd.choice(('TypeError: x is undefined', 'boom'))
+        if rnd.random() < 0.001:
+            info['desync'] = 'KSampler#3(w7/r5)'
+        ops[op] = info
+    return {
+        'pack': pack,
+        'selfCheck': 'OK',
+        'load': load,
+        'loadedOk': sum(v == 'OK' for v in load.values()),
+        'registerNodeDef': 'OK',
+        'registerCustomNodes': 'OK',
+        'storeReadErrors': 0,
+        'newTypes': [],
+        'driveTypes': {},
+        'hookErrors': [],
+        'ops': ops,
+        'elapsedMs': rnd.randint(800, 9000),
+    }
+
+
+def bench_verdict(args: argparse.Namespace) -> int:
+    rnd = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        names = []
+        for i in range(args.packs):
+            pack = f'pack-{i:06d}'
+            names.append(f'{pack}.json')
+            with open(os.path.join(tmp, names[-1]), 'w', encoding='utf-8') as fh:
+                json.dump(synthetic_row(rnd, pack), fh)
+
+        def read(name: str) -> dict:
+            with open(os.path.join(tmp, name), encoding='utf-8') as fh:
+                return json.load(fh)
+
+        def run_list() -> summarize_matrix.Verdict:
+            return summarize_matrix.evaluate([read(n) for n in names], {})
+
+        def run_stream() -> summarize_matrix.Verdict:
+            return summarize_matrix.evaluate_stream((read(n) for n in names), {})
+
+        peaks = {}
+        results = {}
+        for name, fn in (('list', run_list), ('stream', run_stream)):
+            tracemalloc.start()
+            results[name] = fn()
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        a, b = results['list'], results['stream']
+        if (a.code, a.lines, a.breaches, a.metrics) != (
+            b.code, b.lines, b.breaches, b.metrics
+        ):
+            print('streamed verdict differs from the list verdict', file=sys.stderr)
+            return 1
+        print(
+            f'{args.packs} rows ({args.packs / BASELINE_PACKS:.1f}x the baseline'
+            f' population), {len(BATTERY)} ops each, verdict {a.code};'
+            f' peak memory list {peaks["list"] / 1e6:.1f} MB,'
+            f' stream {peaks["stream"] / 1e6:.1f} MB; verdicts identical'
+        )
+        base = best_of(args.repeat, run_list)
+        report('list', base, base, 'rows', args.packs)
+        report('stream', best_of(args.repeat, run_stream), base, 'rows', args.packs)
+    return 0
+
+
+def evict(out_dir: str) -> bool:
+    """Drop out_dir's files from the page cache, so the next read is cold;
+    False where the platform cannot."""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for name in os.listdir(out_dir):
+        fd = os.open(os.path.join(out_dir, name), os.O_RDONLY)
+        try:
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def bench_model(args: argparse.Namespace) -> int:
+    rnd = random.Random(0)
+    texts = [
+        json.dumps(synthetic_row(rnd, f'pack-{i:06d}')) for i in range(args.packs)
+    ]
+
+    def held(build) -> tuple[list, int]:
+        tracemalloc.start()
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return kept, size
+
+    dicts, dict_bytes = held(lambda: [json.loads(t) for t in texts])
+    rows, row_bytes = held(
+        lambda: [summarize_matrix.parse_row(json.loads(t)) for t in texts]
+    )
+    a = summarize_matrix.evaluate(dicts, {})
+    b = summarize_matrix.evaluate(rows, {})
+    if (a.code, a.lines, a.breaches, a.metrics) != (
+        b.code, b.lines, b.breaches, b.metrics
+    ):
+        print('the parsed rows get a different verdict', file=sys.stderr)
+        return 1
+    print(
+        f'{args.packs} rows, {len(BATTERY)} ops each, verdict {a.code};'
+        f' held as dicts {dict_bytes / args.packs:,.0f} B/row,'
+        f' as Row {row_bytes / args.packs:,.0f} B/row'
+        f' (x{dict_bytes / row_bytes:.1f} smaller); verdicts identical'
+    )
+    base = best_of(args.repeat, summarize_matrix.evaluate, dicts, {})
+    report('dicts', base, base, 'rows', args.packs)
+    report(
+        'Row',
+        best_of(args.repeat, summarize_matrix.evaluate, rows, {}),
+        base, 'rows', args.packs,
+    )
+    report(
+        'parse_row',
+        best_of(args.repeat, lambda: [summarize_matrix.parse_row(r) for r in dicts]),
+        base, 'rows', args.packs,
+    )
+    return 0
+
+
+def bench_load(args: argparse.Namespace) -> int:
+    rnd = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.packs):
+            pack = f'pack-{i:06d}'
+            with open(os.path.join(tmp, f'{pack}.json'), 'w', encoding='utf-8') as fh:
+                json.dump(synthetic_row(rnd, pack), fh)
+        with open(os.path.join(tmp, 'torn.json'), 'w', encoding='utf-8') as fh:
+            fh.write('{"pack": ')
+
+        def load(workers: int) -> tuple[list, list[str]]:
+            unreadable: list[str] = []
+            return list(read_rows(tmp, unreadable, workers)), unreadable
+
+        def cold(workers: int) -> float:
+            best = float('inf')
+            for _ in range(args.repeat):
+                cleared = evict(tmp)
+                start = time.perf_counter()
+                load(workers)
+                best = min(best, time.perf_counter() - start)
+            return best if cleared else -best
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            serial, pooled = load(1), load(args.workers)
+            if serial != pooled:
+                print('the pool read different rows', file=sys.stderr)
+                return 1
+            base = cold(1)
+            timed = cold(args.workers)
+        print(
+            f'{args.packs} row files and 1 torn one, {len(serial[1])} unreadable;'
+            f' rows identical; '
+            + ('page cache dropped before each read' if base > 0
+               else 'page cache NOT dropped (no posix_fadvise): warm reads')
+        )
+        report('1 thread', abs(base), abs(base), 'rows', args.packs)
+        report(
+            f'{args.workers} threads', abs(timed), abs(base), 'rows', args.packs
+        )
+    return 0
+
+
+def _drop_loaded(r: dict, _op: str) -> dict | None:
+    return {**r, 'loadedOk': 0} if r.get('loadedOk') else None
+
+
+def _throw_entry(r: dict, _op: str) -> dict | None:
+    load = r.get('load') or {}
+    ok = [entry for entry, status in load.items() if status == 'OK']
+    if not ok:
+        return None
+    return {
+        **r,
+        'load': {**load, ok[0]: 'THREW Error: mutated'},
+        'loadedOk': max((r.get('loadedOk') or 0) - 1, 0),
+    }
+
+
+def _stage_throw(stage: str):
+    def mutate(r: dict, _op: str) -> dict | None:
+        return {**r, stage: 'THREW Error: mutated'} if r.get(stage) == 'OK' else None
+    return mutate
+
+
+def _hook_error(r: dict, _op: str) -> dict | None:
+    return None if r.get('hookErrors') else {**r, 'hookErrors': ['Error: mutated']}
+
+
+def _op_arm(arm: str):
+    def mutate(r: dict, op: str) -> dict | None:
+        ops = r.get('ops') if isinstance(r.get('ops'), dict) else {}
+        info = ops.get(op)
+        if not isinstance(info, dict) or info.get('desync') or (
+            info.get('err') and info.get('dispatching', True)
+        ):
+            return None  # already counted bad
+        return {
+            **r,
+            'ops': {**ops, op: {**info, arm: 'mutated', 'dispatching': True}},
+        }
+    return mutate
+
+
+def _stub(r: dict, _op: str) -> dict | None:
+    return {'pack': r.get('pack'), 'incomplete': True}
+
+
+# (mutation, criterion it must breach, row mutation). None for rows the
+# mutation would not change: they are not eligible.
+MUTATIONS = (
+    ('drop-loadedOk', 'any_loaded', _drop_loaded),
+    ('throw-entry', 'entry_clean', _throw_entry),
+    ('regdef-throw', 'register_node_def', _stage_throw('registerNodeDef')),
+    ('customnodes-throw', 'register_custom_nodes', _stage_throw('registerCustomNodes')),
+    ('hook-error', 'hook_free', _hook_error),
+    ('op-err', 'op_clean', _op_arm('err')),
+    ('op-desync', 'op_clean', _op_arm('desync')),
+    ('stub', 'rows_complete', _stub),
+    ('throw-entry', 'delta', _throw_entry),
+)
+
+
+def damaged_aggregates(
+    rows: list[dict], mutated: dict[int, dict], order: list[int]
+):
+    """k -> the aggregate of rows with the first k packs of order mutated,
+    without aggregating the whole population again for every k.
+
+    The packs outside order are aggregated once, and order in blocks of
+    about sqrt(len(order)) packs, once clean and once mutated: a population
+    merges the mutated blocks before k, the clean blocks after it, and
+    aggregates only the block k falls in. Rows keep aggregate()'s default
+    key, their index in rows, so the merge is what aggregating the whole
+    population gives - less the signatures, which are telemetry: hashing
+    every pack's was most of each verdict, and no criterion reads them.
+    """
+
+    def aggregate(source, indices: list[int]) -> dict:
+        agg = summarize_matrix.aggregate(
+            [source[i] for i in indices], {}, [f'{i:09d}' for i in indices]
+        )
+        agg['sigs'] = []
+        return agg
+
+    size = max(1, math.isqrt(len(order)))
+    blocks = [order[at:at + size] for at in range(0, len(order), size)]
+    chosen = set(order)
+    rest = aggregate(rows, [i for i in range(len(rows)) if i not in chosen])
+    clean = [aggregate(rows, block) for block in blocks]
+    damaged = [aggregate(mutated, block) for block in blocks]
+
+    def at(k: int) -> dict:
+        q, r = divmod(k, size)
+        parts = [rest, *damaged[:q], *clean[q + 1:]]
+        if q < len(blocks):
+            block = blocks[q]
+            parts += [aggregate(mutated, block[:r]), aggregate(rows, block[r:])]
+        return summarize_matrix.merge(parts)
+    return at
+
+
+def flip_point(
+    rows: list[dict], mutated: dict[int, dict], order: list[int], judge
+) -> tuple[int, str] | None:
+    """The fewest packs, taken in order, whose mutation stops the PASS, and
+    how it stopped: judge's 'breach' or 'withheld' for the population's
+    aggregate (damaged_aggregates()). None when mutating every one of them
+    still passes.
+
+    Damage only ever lowers a rate, so once the PASS stops it stays stopped
+    (a breach can turn into a withheld verdict, never back into a PASS) and
+    bisection finds the point.
+    """
+    population = damaged_aggregates(rows, mutated, order)
+
+    def damaged(k: int) -> str:
+        return judge(population(k))
+
+    if not order or not damaged(len(order)):
+        return None
+    low, high = 0, len(order)  # damaged(high) stops the PASS, damaged(low) does not
+    while high - low > 1:
+        mid = (low + high) // 2
+        if damaged(mid):
+            high = mid
+        else:
+            low = mid
+    return high, damaged(high)
+
+
+def judge(criterion: str, baseline: dict):
+    """An aggregate -> 'breach' when its verdict breaches criterion (against
+    baseline for 'delta'), 'withheld' when the verdict is withheld, else ''."""
+    if criterion == 'delta':
+        prefix, prev = 'entry files clean dropped', baseline
+    else:
+        prefix, prev = summarize_matrix.CRITERION_LABELS[criterion], None
+
+    def outcome(agg: dict) -> str:
+        verdict = summarize_matrix.render(agg, {}, prev)
+        if verdict.code == 2:
+            return 'withheld'
+        return 'breach' if any(b.startswith(prefix) for b in verdict.breaches) else ''
+    return outcome
+
+
+def bench_sensitivity(args: argparse.Namespace) -> int:
+    if args.rows:
+        unreadable: list[str] = []
+        rows = [r for _name, r in read_rows(args.rows, unreadable)]
+        if unreadable:
+            sys.exit(f'{len(unreadable)} unreadable rows in {args.rows}')
+        source = args.rows
+    else:
+        rnd = random.Random(0)
+        rows = [synthetic_row(rnd, f'pack-{i:06d}') for i in range(args.packs)]
+        source = 'synthetic'
+    clean = summarize_matrix.evaluate(rows, {})
+    if clean.code != 0:
+        print(
+            f'the unmutated rows do not PASS (exit {clean.code}): no flip to'
+            ' measure',
+            file=sys.stderr,
+        )
+        return 1
+    agg = summarize_matrix.aggregate(rows, {})
+    values = summarize_matrix.criterion_values(agg)
+    # Every op mutation hits the operation most packs ran.
+    op = max(sorted(agg['ops']), key=lambda o: agg['ops'][o]['seen'])
+    # Each row is parsed once, however many populations it is judged in.
+    parsed = [summarize_matrix.parse_row(r) for r in rows]
+    evaluations = 0
+
+    def counted(outcome_of):
+        def outcome(agg: dict) -> str:
+            nonlocal evaluations
+            evaluations += 1
+            return outcome_of(agg)
+        return outcome
+
+    print(
+        f'{len(rows)} rows ({source}), verdict PASS; {args.seeds} pack orders'
+        f' per mutation, op mutations on {op!r}'
+    )
+    print(
+        f'{"mutation":<18} {"breaches":<22} {"margin":>8}  {"eligible":>8}'
+        '  flips at (packs: min median max)'
+    )
+    missed = []
+    start = time.perf_counter()
+    for name, criterion, mutate in MUTATIONS:
+        mutated = {}
+        for i, r in enumerate(rows):
+            changed = mutate(r, op)
+            if changed is not None:
+                mutated[i] = summarize_matrix.parse_row(changed)
+        if criterion == 'delta':
+            margin = f'-{summarize_matrix.DELTA_TOLERANCE:.1f}pp'
+        else:
+            margin = f'{values[criterion] - summarize_matrix.FLOORS[criterion]:.2f}pp'
+        flips = []
+        for seed in range(args.seeds):
+            order = sorted(mutated)
+            random.Random(seed).shuffle(order)
+            outcome = counted(judge(criterion, clean.metrics))
+            flips.append(flip_point(parsed, mutated, order, outcome))
+        if any(flip is None or flip[1] != 'breach' for flip in flips):
+            missed.append(f'{name} -> {criterion}')
+            stopped = [flip for flip in flips if flip is not None]
+            shown = 'NEVER' + (
+                f' (withheld first, at {min(stopped)[0]} packs)' if stopped else ''
+            )
+        else:
+            counts = sorted(k for k, _outcome in flips)
+            shown = '  '.join(
+                f'{k} ({k / len(rows):.2%})'
+                for k in (counts[0], counts[len(counts) // 2], counts[-1])
+            )
+        print(f'{name:<18} {criterion:<22} {margin:>8}  {len(mutated):>8}  {shown}')
+    elapsed = time.perf_counter() - start
+    print(
+        f'{evaluations} verdicts in {elapsed:.1f} s,'
+        f' {evaluations / elapsed:.1f} verdicts/s'
+    )
+    if missed:
+        print(
+            'no amount of damage breaches: ' + ', '.join(missed), file=sys.stderr
+        )
+        return 1
+    return 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    sub = ap.add_subparsers(dest='bench', required=True)
+    rw = sub.add_parser('rewrite', help='import rewriting over every corpus JS file')
+    rw.add_argument('--limit', type=int, default=0, help='stop after about N files')
+    rw.set_defaults(run=bench_rewrite)
+    vd = sub.add_parser('verdict', help='summarize_matrix verdict over synthetic rows')
+    vd.add_argument(
+        '--packs', type=int, default=BASELINE_PACKS * 10,
+        help='population size (default: 10x the baseline run)',
+    )
+    vd.set_defaults(run=bench_verdict)
+    md = sub.add_parser('model', help='evaluate() over dict rows versus parsed Rows')
+    md.add_argument('--packs', type=int, default=20000, help='population size')
+    md.set_defaults(run=bench_model)
+    ld = sub.add_parser('load', help='matrix_rows.read_rows() over loose row files')
+    ld.add_argument('--packs', type=int, default=5000, help='row files written')
+    ld.add_argument(
+        '--workers', type=int, default=READ_WORKERS, help='threads to compare'
+    )
+    ld.set_defaults(run=bench_load)
+    sn = sub.add_parser(
+        'sensitivity', help='damage that flips the verdict, per criterion'
+    )
+    sn.add_argument('--rows', default='', help='clean rows (default: synthetic)')
+    sn.add_argument(
+        '--packs', type=int, default=BASELINE_PACKS,
+        help='synthetic population size (default: the baseline run)',
+    )
+    sn.add_argument('--seeds', type=int, default=3, help='pack orders per mutation')
+    sn.set_defaults(run=bench_sensitivity)
+    for parser in (rw, vd, md, ld):
+        parser.add_argument('--repeat', type=int, default=5, help='best of N')
+    args = ap.parse_args()
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -9,15 +9,81 @@ pack's own registered node types.
 
 Each spec writes one JSON row. Running the folder on the ECS branch and on the
 pre-ECS merge-base and diffing the rows yields the pack x operation matrix.
+
+Builds are incremental. DEST keeps a build cache keyed per pack by (pack
+content hash, rules hash, template hash); a pack whose key is unchanged keeps
+its staged files and spec, packs no longer built are deleted, and everything
+else is rebuilt. --clean discards DEST first.
+
+A pack's entries are its files that use the extension API as code: a
+comment, string or regex that merely names it does not make one
+(entry_sites()).
+
+Only what the entries can load is staged: the pack's relative import graph
+is followed from the entries (reachable()), specifiers that resolve to
+nothing are listed in the manifest, and a pack that computes an import path
+at runtime is staged whole.
+
+--shard I/N builds the I-th shard of a cost-balanced plan (shard_plan.py):
+read from --plan when one is given, so every shard shares one assignment,
+else computed here from the corpus. The plan used is left in DEST/plan.json.
+
+--serve corpus skips staging altogether. Each pack gets a rewrite map
+(DEST/maps/<safe>.json: per file, the UTF-16 offset, old text and
+replacement of every rewrite) and DEST/serve.json indexes the corpus roots;
+the plugin in vitest.matrix.config.mts resolves the specs' entry imports
+into the corpus and applies the maps as vite loads each file.
+
+--batch-ms B groups cheap packs into shared spec files (batch-NNN) of at most
+B ms of predicted run time, so the long tail of one-entry packs stops paying
+vitest's per-file setup once each. Every pack keeps its own describe block
+and row; between packs the file resets the module registry and mocks, puts
+back the globals, built-in prototypes, head and body it started with, and
+cancels the timers and window/document listeners left behind. A pack whose
+code defines a custom element (UNBATCHABLE_RX), which no reset can undo,
+keeps a spec of its own.
+
+--vendor-index PATH decides which JS files are vendored libraries by content
+hash (vendor_index.py) instead of by VEND filename substrings; a listed file
+is staged as an asset, never rewritten or scanned for entries. The filename
+rule still covers unlisted files that are not evidently pack code.
+--write-vendor-index PATH seeds that index from the corpus.
+
+Every build writes DEST/build-profile.json: per pack the build time and the
+bytes read, rewritten, written, linked and copied, and how often each rewrite
+rule fired; in aggregate the totals, the PROFILE_TOP slowest packs and every
+rule's hit count, zeros included.
+
+--sample N builds only a stratified sample of N packs (sample_plan.py):
+read from --sample-plan when one is given, else drawn here; the sample used
+is left in DEST/sample.json. --write-sample PATH draws it from the corpus.
+
+--rewrite-cache PATH (default CENSUS_ROOT/rewrite-cache.json.gz, '' for
+none) reuses each JS file's rewrite edits and entry sites from any earlier
+build that scanned the same bytes under the same rules (rewrite_cache.py),
+and adds what this build scanned. --warm-rewrite-cache scans the whole
+corpus into it and exits, so CI can save it before any pack code runs.
 """
 import argparse
+import errno
 import hashlib
-import json, os, re, shutil, sys
+import json, os, posixpath, re, shutil, sys, time
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: assets are hardlinked or copied there
+    fcntl = None
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, HERE)
-from paths import CORPUS  # noqa: E402
+from paths import CORPUS, REWRITE_CACHE, registry_snapshot  # noqa: E402
+from rewrite_cache import load_cache, write_cache  # noqa: E402
+from sample_plan import check_sample, make_sample  # noqa: E402
+from shard_plan import batch, check_plan, load_runtimes, make_plan, predict  # noqa: E402
+from vendor_index import MIN_PACKS, content_hash, load_index, make_index  # noqa: E402
 
 DEST = os.path.abspath(os.path.join(HERE, os.pardir, os.pardir, 'src', '__ecs_matrix__'))
 REPOS = CORPUS
@@ -43,6 +109,8 @@ PACK_REWRITES = [
     ('rgthree', re.compile(r'(["\'])(?:\.\./)+rgthree/config\.js\1'), r'"__PACKROOT__/web/comfyui/config.js"'),
     ('rgthree', re.compile(r'(["\'])(?:\.\./)+rgthree/'), r'"__PACKROOT__/web/'),
 ]
+# The extension API names. A bare-word match is only a prefilter: a file is
+# an entry candidate when entry_sites() finds one used as code.
 ENTRY_RX = re.compile(r'registerExtension|registerNodeType|beforeRegisterNodeDef')
 ENTRY_CAP = 60
 # The token scan cannot tell an extension entry from a test or an example that
@@ -54,16 +122,410 @@ UNSERVED_FILE_RX = re.compile(r'\.(?:test|spec)\.m?js$')
 JS = ('.js', '.mjs')
 ASSETS = ('.css', '.json', '.svg', '.woff2', '.png')
 SKIP = {'.git', 'node_modules', 'vendor', '__pycache__', 'dist', 'venv'}
-# runtime fixture: copy what the pack ships; exclude only true vendored bundles
+MAX_FILE_BYTES = 2_000_000
+# runtime fixture: copy what the pack ships; exclude only true vendored bundles.
+# The filename fallback for builds without a --vendor-index.
 VEND = ('three.min', 'jquery', 'codemirror', 'chart.min', 'd3.min',
         'litegraph.core', '.min.js', 'fabric.min', 'protobuf')
 
+BUILD_CACHE = 'build-cache.json'
+# Bump when build_pack() would stage different output from the same pack,
+# rules and template - the rule tables are hashed, the code around them is not.
+BUILD_CACHE_VERSION = 8
+
+# The literal path segment a rule's matches must contain: the first word
+# followed by a slash in its pattern ('scripts/', 'extensions/', 'rgthree/').
+NEEDLE_RX = re.compile(r'[A-Za-z][\w-]*/')
+BACKREF_RX = re.compile(r'\\(\d+)')
+QUOTE = r'["\']'
+
+
+class Edit(NamedTuple):
+    start: int
+    end: int
+    replacement: str
+    label: str
+    rule: str = ''  # Rule.name, for the build profile's hit counts
+
+
+class Rule(NamedTuple):
+    label: str  # '' for the shared REWRITES, the assisted pack otherwise
+    rx: re.Pattern
+    rep: str
+    needle: str
+
+    @property
+    def name(self) -> str:
+        """The replacement, which no two rules share; pack rules say whose."""
+        return f'{self.label}: {self.rep}' if self.label else self.rep
+
+
+class Rewriter:
+    """REWRITES then PACK_REWRITES, applied in one scan per file.
+
+    A file containing none of the rules' needles is returned without running
+    a regex, which is most files. The rules whose needle is present are
+    fused into one alternation, earlier rule winning at a position, and each
+    match is dispatched to its rule by the group that closed it. That is what
+    applying them in sequence does: every match starts at a quote and runs
+    through a literal path with no quote inside, and no replacement produces
+    text another rule matches, so no two rules compete for one span.
+
+    PACK_REWRITES are indexed by needle rather than by pack id: they exist
+    for one pack but fire wherever its paths are imported, and `assisted`
+    must keep counting every pack they fire on.
+    """
+
+    def __init__(
+        self,
+        rewrites: list = REWRITES,
+        pack_rewrites: list = PACK_REWRITES,
+    ) -> None:
+        rules = [('', rx, rep) for rx, rep in rewrites]
+        rules += [(label, rx, rep) for label, rx, rep in pack_rewrites]
+        self.rules = []
+        for label, rx, rep in rules:
+            if not rx.pattern.startswith(f'({QUOTE})'):
+                raise ValueError(f'rewrite rule does not start at a quote: {rx.pattern}')
+            found = NEEDLE_RX.search(rx.pattern)
+            # no literal to key on: the rule is tried on every file
+            self.rules.append(Rule(label, rx, rep, found.group() if found else ''))
+        self.needles = sorted({rule.needle for rule in self.rules})
+        self._fused: dict[tuple[int, ...], tuple[re.Pattern, dict[int, Rule]]] = {}
+
+    def fused(self, active: tuple[int, ...]) -> tuple[re.Pattern, dict[int, Rule]]:
+        """One alternation over the given rules, and its group -> rule map."""
+        if active not in self._fused:
+            parts, by_group, group = [], {}, 1
+            for i in active:
+                rule = self.rules[i]
+                base = group
+                body = BACKREF_RX.sub(
+                    lambda m: f'\\{base + int(m.group(1))}', rule.rx.pattern
+                )
+                parts.append(f'({body})')
+                by_group[base] = rule
+                group += 1 + rule.rx.groups
+            # Every rule starts at a quote; saying so up front lets the
+            # engine skip to quotes instead of trying each branch everywhere.
+            fused = re.compile(f'(?={QUOTE})(?:{"|".join(parts)})')
+            self._fused[active] = (fused, by_group)
+        return self._fused[active]
+
+    def rewrite(self, text: str) -> tuple[str, set[str]]:
+        """The rewritten text and the labels of the pack rules that fired."""
+        present = {needle for needle in self.needles if needle in text}
+        if not present:
+            return text, set()
+        active = tuple(
+            i for i, rule in enumerate(self.rules) if rule.needle in present
+        )
+        fused, by_group = self.fused(active)
+        assisted: set[str] = set()
+
+        def replace(m: re.Match) -> str:
+            rule = by_group[m.lastindex]
+            if rule.label:
+                assisted.add(rule.label)
+            return rule.rx.fullmatch(m.group()).expand(rule.rep)
+
+        return fused.sub(replace, text), assisted
+
+    def edits(self, text: str) -> list[Edit]:
+        """What rewrite() would change, as (start, end, replacement, label)."""
+        present = {needle for needle in self.needles if needle in text}
+        if not present:
+            return []
+        active = tuple(
+            i for i, rule in enumerate(self.rules) if rule.needle in present
+        )
+        fused, by_group = self.fused(active)
+        out = []
+        for m in fused.finditer(text):
+            rule = by_group[m.lastindex]
+            out.append(
+                Edit(
+                    m.start(),
+                    m.end(),
+                    rule.rx.fullmatch(m.group()).expand(rule.rep),
+                    rule.label,
+                    rule.name,
+                )
+            )
+        return out
+
+
+def apply_edits(text: str, edits: list[Edit]) -> str:
+    parts, pos = [], 0
+    for edit in edits:
+        parts += (text[pos:edit.start], edit.replacement)
+        pos = edit.end
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+
+def rewrite_map(text: str, edits: list[Edit]) -> list[list]:
+    """[offset, old, new] per edit, offsets in UTF-16 code units.
+
+    The vite side indexes JavaScript strings, which count an astral
+    character as two units where Python counts one. The old text rides
+    along so a map that no longer fits its file fails loudly.
+    """
+    out, pos, offset = [], 0, 0
+    for edit in edits:
+        offset += len(text[pos:edit.start].encode('utf-16-le')) // 2
+        out.append([offset, text[edit.start:edit.end], edit.replacement])
+        offset += len(text[edit.start:edit.end].encode('utf-16-le')) // 2
+        pos = edit.end
+    return out
+
+
+def rewrite_sequential(text: str) -> tuple[str, set[str]]:
+    """The rules applied one after another: the reference Rewriter matches."""
+    for rx, rep in REWRITES:
+        text = rx.sub(rep, text)
+    assisted = set()
+    for label, rx, rep in PACK_REWRITES:
+        text, hits = rx.subn(rep, text)
+        if hits:
+            assisted.add(label)
+    return text, assisted
+
+
+REWRITER = Rewriter()
+
 TEMPLATE_RUNNER_IMPORT = "from './matrix_runner'"
 SPEC_RUNNER_IMPORT = "from './runner'"
+TEMPLATE_GLOB = "import.meta.glob('./packs/__MATRIX_PACK_DIR__/**/*.{js,mjs}')"
+# --serve corpus: specs import entries as SERVE_PREFIX<safe>/<path>, which the
+# plugin in vitest.matrix.config.mts resolves through DEST/serve.json.
+SERVE_PREFIX = 'virtual:ecs-matrix-pack/'
+SERVE_INDEX = 'serve.json'
 PLACEHOLDERS = (
     '__MATRIX_PACK__', '__MATRIX_SAFE__', '__MATRIX_ENTRIES__', '__MATRIX_PACK_DIR__'
 )
 RELATIVE_IMPORT_RX = re.compile(r"""(?:from|import)\s*\(?\s*['"](\.\.?/[^'"]+)['"]""")
+# Staging follows the import graph out of the entries. Same idea as
+# RELATIVE_IMPORT_RX, widened to every specifier form a module can load
+# another file through: `from '...'` (import and export), bare
+# `import '...'`, `import('...')` and `new URL('...', import.meta.url)`.
+IMPORT_SPEC_RX = re.compile(
+    r"""(?:\bfrom|(?<![.\w$])import\s*\(?|\bnew\s+URL\s*\()\s*(['"])([^'"\n]+)\1"""
+)
+# A dynamic import whose argument is not one string literal can name any file
+# in the pack, as can import.meta.glob: such a pack is staged whole.
+OPAQUE_IMPORT_RX = re.compile(
+    r"""(?<![.\w$])import\s*\(\s*(?!(['"])[^'"\n]*\1\s*[,)])|import\.meta\.glob"""
+)
+RESOLVE_SUFFIXES = ('', '.js', '.mjs', '/index.js')
+UNRESOLVED_CAP = 20
+BUILD_PROFILE = 'build-profile.json'
+PROFILE_TOP = 20
+
+
+# entry_sites() lexing. Outside a template substitution only comments,
+# strings, templates, regex literals and the API names matter; inside one,
+# braces too, to find where it closes.
+#
+# Bump LEXER_VERSION with ANY change to what entry_sites() returns - its
+# code, _site() and the helpers they call, not only the patterns below. The
+# rewrite and build caches hash the patterns but cannot hash the code, and
+# cached sites outlive the build that found them.
+LEXER_VERSION = 3
+LEX_RX = re.compile(
+    r'//|/\*|[\'"`/]|(?<![\w$])(' + ENTRY_RX.pattern + r')(?![\w$])'
+)
+LEX_NESTED_RX = re.compile(LEX_RX.pattern + r'|[{}]')
+STRING_RX = {
+    q: re.compile(q + r'(?:[^' + q + r'\\\n]|\\.)*' + q, re.S) for q in '\'"'
+}
+TEMPLATE_RX = re.compile(r'(?:[^`\\$]|\\.|\$(?!\{))*(`|\$\{)', re.S)
+REGEX_LITERAL_RX = re.compile(
+    r'/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*'
+)
+# A '/' after one of these words starts a regex literal, not a division.
+REGEX_AFTER = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+}
+# So does a '/' after the ')' closing one of these: if (x) /re/.test(s).
+REGEX_AFTER_PAREN = {'if', 'while', 'for', 'with'}
+PAREN_MAX = 4000
+WORD_RX = re.compile(r'[\w$]+$')
+WORD_MAX = 12  # longer than any keyword that matters here
+# What an import/export specifier list or a destructuring pattern holds
+# between its '{' and a name: names, 'as' aliases and ':' renames, commas.
+SPECIFIERS_RX = re.compile(r'[\w$\s,:]*')
+SPECIFIERS_MAX = 2000
+
+
+def _prev_char(text: str, i: int) -> tuple[str, int]:
+    """The last non-space character before i, and its index (-1 if none)."""
+    i -= 1
+    while i >= 0 and text[i].isspace():
+        i -= 1
+    return (text[i], i) if i >= 0 else ('', -1)
+
+
+def _next_char(text: str, i: int) -> tuple[str, int]:
+    n = len(text)
+    while i < n and text[i].isspace():
+        i += 1
+    return (text[i], i) if i < n else ('', n)
+
+
+def _word_before(text: str, j: int) -> str:
+    """The identifier or keyword ending at index j, '' if none or too long."""
+    lo = max(0, j + 1 - WORD_MAX)
+    word = WORD_RX.search(text, lo, j + 1)
+    if not word or (word.start() == lo and lo):
+        return ''
+    return word.group()
+
+
+def _line_end(text: str, i: int) -> int:
+    end = text.find('\n', i)
+    return len(text) if end < 0 else end
+
+
+def _open_paren(text: str, j: int) -> int:
+    """The index of the '(' the ')' at j closes; -1 if none within PAREN_MAX."""
+    lo = max(0, j - PAREN_MAX)
+    depth, k = 1, j
+    while depth:
+        k = max(text.rfind('(', lo, k), text.rfind(')', lo, k))
+        if k < 0:
+            return -1
+        depth += 1 if text[k] == ')' else -1
+    return k
+
+
+def _starts_regex(text: str, i: int) -> bool:
+    c, j = _prev_char(text, i)
+    if c == ']':
+        return False
+    if c == ')':
+        k = _open_paren(text, j)
+        return k >= 0 and (
+            _word_before(text, _prev_char(text, k)[1]) in REGEX_AFTER_PAREN
+        )
+    if c == '_' or c == '$' or c.isalnum():
+        return _word_before(text, j) in REGEX_AFTER
+    return True
+
+
+def _in_binding_list(text: str, start: int) -> bool:
+    """Whether the name at start is in an import or export specifier list -
+    import { a } / import d, { a } / import type { a } / export { a } - or a
+    destructuring pattern: const { a } = b / ({ a } = b)."""
+    brace = text.rfind('{', max(0, start - SPECIFIERS_MAX), start)
+    if brace < 0 or not SPECIFIERS_RX.fullmatch(text, brace + 1, start):
+        return False
+    close = SPECIFIERS_RX.match(text, start).end()
+    if text.startswith('}', close):
+        c, k = _next_char(text, close + 1)
+        if c == '=' and text[k + 1:k + 2] not in ('=', '>'):
+            return True
+    c, j = _prev_char(text, brace)
+    if c == ',':  # after a default import
+        j = _prev_char(text, j)[1]
+        default = _word_before(text, j)
+        if not default:
+            return False
+        j = _prev_char(text, j - len(default) + 1)[1]
+    word = _word_before(text, j)
+    if word == 'type':
+        word = _word_before(text, _prev_char(text, j - len(word) + 1)[1])
+    return word in ('import', 'export') or (
+        c != ',' and word in ('const', 'let', 'var')
+    )
+
+
+def _site(text: str, start: int, end: int) -> str:
+    """How the API name at [start, end) is used; '' when not as code."""
+    before, b = _prev_char(text, start)
+    after, a = _next_char(text, end)
+    if before == '.':
+        return 'call' if after == '(' else 'property'
+    if _word_before(text, b) in ('function', 'class', 'let', 'const', 'var'):
+        return ''  # a declaration of the name, not a use of the API
+    if after == '(':
+        depth = 0
+        for k in range(a, min(len(text), a + 4000)):
+            depth += {'(': 1, ')': -1}.get(text[k], 0)
+            if not depth:
+                return 'method' if _next_char(text, k + 1)[0] == '{' else 'call'
+        return 'call'
+    if before not in ('{', ','):
+        return ''  # a ternary's branch, a label, a plain reference
+    if after == ':':
+        return '' if _in_binding_list(text, start) else 'key'
+    if after in (',', '}'):
+        # A shorthand key - unless the braces are an import or export clause
+        # or a destructuring pattern.
+        return '' if _in_binding_list(text, start) else 'key'
+    return ''
+
+
+def entry_sites(text: str) -> list[str]:
+    """The distinct 'kind name' uses of the extension API in text as code.
+
+    kind is call (app.registerExtension(...)), property (x.beforeRegisterNodeDef
+    = ...), method (a shorthand method definition) or key (an object literal
+    key). A name inside a comment, string, template text or regex literal is
+    not a use, nor is a declaration, a plain reference or a name an import
+    list or destructuring pattern binds. The lexer is a single regex-driven
+    pass that stops after the last bare-word match; a '/' is a regex literal
+    unless it follows a value (the usual heuristic), the ')' of an if or a
+    loop not counting as one.
+    """
+    last = max((m.end() for m in ENTRY_RX.finditer(text)), default=-1)
+    found: set[str] = set()
+    templates: list[int] = []  # open-brace depth of each ${ we are inside
+    pos = 0
+    while pos < last:
+        m = (LEX_NESTED_RX if templates else LEX_RX).search(text, pos, last)
+        if not m:
+            break
+        tok, start = m.group(), m.start()
+        pos = m.end()
+        if m.group(1):
+            kind = _site(text, start, pos)
+            if kind:
+                found.add(f'{kind} {tok}')
+        elif tok == '//':
+            pos = _line_end(text, pos)
+        elif tok == '/*':
+            end = text.find('*/', pos)
+            if end < 0:
+                break
+            pos = end + 2
+        elif tok in ('"', "'"):
+            # A quote that does not close on its line is no string (JS has
+            # none such): something before it was mis-read. Lex on from just
+            # after it rather than lose the line - in a minified file, the
+            # rest of the file.
+            string = STRING_RX[tok].match(text, start)
+            if string:
+                pos = string.end()
+        elif tok == '/':
+            literal = _starts_regex(text, start) and REGEX_LITERAL_RX.match(text, start)
+            if literal:
+                pos = literal.end()
+        elif tok == '{':
+            templates[-1] += 1
+        elif tok == '}' and templates[-1]:
+            templates[-1] -= 1
+        else:  # a backtick, or the } closing a ${ substitution
+            if tok == '}':
+                templates.pop()
+            part = TEMPLATE_RX.match(text, pos)
+            if not part:
+                break
+            pos = part.end()
+            if part.group(1) == '${':
+                templates.append(0)
+    return sorted(found)
 
 
 def safe_name(pack: str) -> str:
@@ -99,6 +561,54 @@ def packroot_anchor(src: str, dst: str, fp: str) -> str:
     return dst
 
 
+def reachable(
+    entries: list[str], js: dict[str, str], assets: dict[str, str]
+) -> tuple[set[str], list[str], str]:
+    """Pack files the entries can load, the specifiers that resolved to
+    nothing, and the file that forced staging the whole pack ('' if none).
+
+    Keys are pack-relative posix paths; js holds rewritten text, so frontend
+    imports are already '@/' aliases and only the pack's own relative
+    imports are followed. An absolute specifier names a server path that no
+    staged file answers, and a relative one that leaves the pack or names a
+    missing file cannot load either: both are reported, not guessed at.
+    """
+    keep: set[str] = set()
+    unresolved: set[str] = set()
+    todo = list(entries)
+    while todo:
+        rel = todo.pop()
+        if rel in keep:
+            continue
+        keep.add(rel)
+        text = js.get(rel)
+        if text is None:
+            continue  # an asset: nothing to follow
+        if OPAQUE_IMPORT_RX.search(text):
+            return set(js) | set(assets), [], rel
+        for _quote, spec in IMPORT_SPEC_RX.findall(text):
+            path = spec.split('?', 1)[0].split('#', 1)[0]
+            if path.startswith('/'):
+                unresolved.add(f'{rel}: {spec}')
+                continue
+            if not path.startswith(('./', '../')):
+                continue  # bare or aliased: vite resolves it, not the pack
+            target = posixpath.normpath(posixpath.join(posixpath.dirname(rel), path))
+            found = next(
+                (
+                    target + suffix
+                    for suffix in RESOLVE_SUFFIXES
+                    if target + suffix in js or target + suffix in assets
+                ),
+                None,
+            )
+            if found is None:
+                unresolved.add(f'{rel}: {spec}')
+            elif found not in keep:
+                todo.append(found)
+    return keep, sorted(unresolved), ''
+
+
 def assert_runner_copy_depth(text: str) -> None:
     """The runner is copied out of HERE into DEST, so every relative import it
     carries has to name the same file from both directories."""
@@ -122,15 +632,32 @@ def load_spec_template() -> str:
         text = open(TEMPLATE, encoding='utf-8').read()
     except OSError as e:
         sys.exit(f'spec template unreadable: {TEMPLATE} ({e})')
-    if text.count(TEMPLATE_RUNNER_IMPORT) != 1:
-        sys.exit(f'{TEMPLATE} must contain {TEMPLATE_RUNNER_IMPORT} exactly once')
+    for fixed in (TEMPLATE_RUNNER_IMPORT, TEMPLATE_GLOB, PACK_BLOCK):
+        if text.count(fixed) != 1:
+            sys.exit(f'{TEMPLATE} must contain {fixed} exactly once')
     for name in PLACEHOLDERS:
         if text.count(name) != 1:
             sys.exit(f'{TEMPLATE} must contain {name} exactly once')
     return text.replace(TEMPLATE_RUNNER_IMPORT, SPEC_RUNNER_IMPORT)
 
 
-def render_spec(template: str, pack: str, safe: str, entries: list) -> str:
+def render_spec(
+    template: str,
+    pack: str,
+    safe: str,
+    entries: list,
+    served: list | None = None,
+) -> str:
+    """The pack's spec. With served (entry paths inside the corpus pack),
+    the staged-tree glob becomes explicit loaders through the matrix vite
+    plugin, which resolves them into the corpus."""
+    if served is not None:
+        loaders = ''.join(
+            f'\n  {json.dumps(key)}: () =>'
+            f'\n    import({json.dumps(f"{SERVE_PREFIX}{safe}/{rel}")}),'
+            for key, rel in zip(entries, served)
+        )
+        template = template.replace(TEMPLATE_GLOB, '{' + loaders + '\n}')
     spec = (
         template.replace("'__MATRIX_PACK__'", json.dumps(pack))
         .replace("'__MATRIX_SAFE__'", json.dumps(safe))
@@ -142,25 +669,957 @@ def render_spec(template: str, pack: str, safe: str, entries: list) -> str:
     return spec
 
 
-def build(limit: int = 0, shard: str = ''):
+BATCH_ISOLATION = '''import type { DetachedWindowAPI } from 'happy-dom'
+import { beforeEach, vi } from 'vitest'
+
+// Several packs share this file: each starts where a file of its own would.
+// Its module registry is fresh and the console restored. The globals,
+// document and built-in prototypes are as this file found them (a pack that
+// sets window.app or patches HTMLElement.prototype takes it with it), head
+// and body hold what they held, and no timer or window/document listener an
+// earlier pack left behind runs. A custom element definition cannot be
+// undone: build_matrix.py keeps packs that define one out of batches.
+const listeners: (() => void)[] = []
+for (const target of new Set<EventTarget>([globalThis, window, document])) {
+  const add = target.addEventListener.bind(target)
+  target.addEventListener = (...args: Parameters<EventTarget['addEventListener']>) => {
+    add(...args)
+    listeners.push(() => target.removeEventListener(args[0], args[1], args[2]))
+  }
+}
+const PROTOTYPES = [
+  'Object', 'Array', 'Function', 'String', 'Number', 'Promise', 'EventTarget',
+  'Node', 'Element', 'HTMLElement', 'HTMLCanvasElement', 'Document',
+  'CanvasRenderingContext2D', 'Image', 'WebSocket', 'XMLHttpRequest',
+]
+const owners = new Set<object>([globalThis, window, document])
+for (const name of PROTOTYPES) {
+  const proto = (globalThis as Record<string, { prototype?: object }>)[name]?.prototype
+  if (proto) owners.add(proto)
+}
+// Taken before the first pack runs, once vitest has set up everything else.
+let found: Map<object, Record<PropertyKey, PropertyDescriptor>> | undefined
+let head: ChildNode[] = []
+
+function restore(owner: object, was: Record<PropertyKey, PropertyDescriptor>) {
+  for (const key of Reflect.ownKeys(owner)) {
+    if (!(key in was)) Reflect.deleteProperty(owner, key)
+  }
+  for (const key of Reflect.ownKeys(was)) {
+    const now = Reflect.getOwnPropertyDescriptor(owner, key)
+    const then = was[key]
+    if (now?.value !== then.value || now?.get !== then.get || now?.set !== then.set) {
+      Reflect.defineProperty(owner, key, then)
+    }
+  }
+}
+
+beforeEach(async () => {
+  await (window as unknown as { happyDOM?: DetachedWindowAPI }).happyDOM?.abort()
+  listeners.splice(0).forEach((remove) => remove())
+  if (found) {
+    found.forEach((was, owner) => restore(owner, was))
+  } else {
+    found = new Map([...owners].map((o) => [o, Object.getOwnPropertyDescriptors(o)]))
+    head = [...document.head.childNodes]
+  }
+  vi.resetModules()
+  vi.restoreAllMocks()
+  document.head.replaceChildren(...head)
+  document.body.replaceChildren()
+})
+'''
+# What a batch cannot put back. The custom element registry has no delete,
+# so a second pack defining the same name would throw where, alone, it ran.
+UNBATCHABLE_RX = re.compile(r'\bcustomElements\s*\.\s*define\b')
+PACK_BLOCK = '\nconst PACK = '
+
+
+def render_batch(specs: list[str]) -> str:
+    """One spec file running several packs' specs, each in its own block."""
+    head = specs[0].partition(PACK_BLOCK)[0]
+    blocks = ['{' + PACK_BLOCK + spec.partition(PACK_BLOCK)[2] + '}\n' for spec in specs]
+    return head + '\n' + BATCH_ISOLATION + '\n' + '\n'.join(blocks)
+
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+# errnos that mean "this filesystem pair cannot share bytes", not "this file
+# failed": once seen, the staging mode is not tried again in this process.
+UNSHAREABLE = {
+    errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL,
+    errno.EMLINK, errno.ENOSYS,
+}
+_share_modes = ['reflink', 'hardlink']
+
+
+def _reflink(src: str, out: str) -> None:
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, 'no FICLONE without fcntl')
+    with open(src, 'rb') as fin, open(out, 'wb') as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+        except OSError:
+            fout.close()
+            os.remove(out)
+            raise
+    shutil.copymode(src, out)
+
+
+def stage_asset(src: str, out: str) -> str:
+    """Put src's bytes at out without copying them where the filesystem allows.
+
+    A reflink (copy-on-write clone) first: it costs no space and is still an
+    independent file. Then a hardlink, which shares the corpus inode - fine
+    for files the matrix only reads, and the shard jobs never save the
+    corpus back to the cache. A byte copy when neither works. Returns the
+    mode used.
+    """
+    for mode in tuple(_share_modes):
+        try:
+            if mode == 'reflink':
+                _reflink(src, out)
+            else:
+                os.link(src, out)
+            return mode
+        except OSError as exc:
+            if exc.errno in UNSHAREABLE and mode in _share_modes:
+                _share_modes.remove(mode)
+    shutil.copy(src, out)
+    return 'copy'
+
+
+def named_vendored(name: str) -> bool:
+    """The VEND filename rule."""
+    lo = os.path.basename(name).lower()
+    return any(v in lo for v in VEND) or '.min.js' in lo
+
+
+def is_pack_code(edits: list[Edit], sites: list[str] | None) -> bool:
+    """Whether a scanned file is the pack's own code whatever it is named or
+    however many packs copy it: it imports the frontend, or registers an
+    extension. Defining or calling LiteGraph's registerNodeType, as the
+    litegraph bundle itself does, is not enough."""
+    return bool(edits) or 'call registerExtension' in (sites or ())
+
+
+def pack_files(src: str, by_name: bool = True):
+    """(path, relative path, is_asset) for every file the build stages.
+
+    by_name=False leaves vendored JS to the caller: the content-hash check,
+    then the filename rule for pack code it does not list (named_vendored(),
+    is_pack_code()).
+    """
+    for root, dirs, files in os.walk(src):
+        dirs[:] = [d for d in dirs if d not in SKIP]
+        for f in files:
+            lo = f.lower()
+            is_vendored = by_name and named_vendored(lo)
+            is_asset = lo.endswith(ASSETS) or (lo.endswith(JS) and is_vendored)
+            if lo.endswith(JS) or is_asset:
+                fp = os.path.join(root, f)
+                yield fp, os.path.relpath(fp, src), is_asset
+
+
+def pack_digest(src: str) -> str:
+    """Content hash over exactly the files build_pack() would read."""
+    digest = hashlib.sha1()
+    for fp, rel, _is_asset in sorted(pack_files(src)):
+        try:
+            size = os.path.getsize(fp)
+            digest.update(f'{rel}\0{size}\0'.encode())
+            if size <= MAX_FILE_BYTES:
+                with open(fp, 'rb') as fh:
+                    digest.update(fh.read())
+        except OSError:
+            digest.update(f'{rel}\0unreadable\0'.encode())
+    return digest.hexdigest()
+
+
+def rules_digest(template: str, serve: str = 'copy', vendored: str = '') -> str:
+    """Hash of everything besides the pack itself that shapes its output;
+    vendored is the vendor index's digest, '' for the VEND fallback."""
+    rules = (
+        BUILD_CACHE_VERSION,
+        LEXER_VERSION,
+        serve,
+        vendored,
+        [(rx.pattern, rep) for rx, rep in REWRITES],
+        [(label, rx.pattern, rep) for label, rx, rep in PACK_REWRITES],
+        ENTRY_RX.pattern,
+        LEX_NESTED_RX.pattern,
+        STRING_RX['"'].pattern,
+        TEMPLATE_RX.pattern,
+        REGEX_LITERAL_RX.pattern,
+        sorted(REGEX_AFTER),
+        sorted(REGEX_AFTER_PAREN),
+        SPECIFIERS_RX.pattern,
+        UNBATCHABLE_RX.pattern,
+        ENTRY_CAP,
+        IMPORT_SPEC_RX.pattern,
+        OPAQUE_IMPORT_RX.pattern,
+        RESOLVE_SUFFIXES,
+        sorted(UNSERVED_DIRS),
+        UNSERVED_FILE_RX.pattern,
+        JS,
+        ASSETS,
+        sorted(SKIP),
+        MAX_FILE_BYTES,
+        VEND,
+    )
+    return hashlib.sha1(
+        (json.dumps(rules) + '\0' + template).encode()
+    ).hexdigest()
+
+
+def rewrite_digest(serve: str = 'copy') -> str:
+    """Hash of what scan_file()'s result depends on besides the file's bytes."""
+    rules = (
+        LEXER_VERSION,
+        serve,  # the decoding, which the edits' offsets count in
+        [(rx.pattern, rep) for rx, rep in REWRITES],
+        [(label, rx.pattern, rep) for label, rx, rep in PACK_REWRITES],
+        ENTRY_RX.pattern,
+        LEX_NESTED_RX.pattern,
+        STRING_RX['"'].pattern,
+        TEMPLATE_RX.pattern,
+        REGEX_LITERAL_RX.pattern,
+        sorted(REGEX_AFTER),
+        sorted(REGEX_AFTER_PAREN),
+        SPECIFIERS_RX.pattern,
+    )
+    return hashlib.sha1(json.dumps(rules).encode()).hexdigest()
+
+
+def decode(data: bytes, serve: str) -> str:
+    if serve == 'corpus':
+        # vite decodes the file itself, and a dropped byte or a folded line
+        # ending would shift every offset after it: decode as Node does.
+        # Copies keep their historical (text-mode) decoding.
+        return data.decode('utf-8', 'replace')
+    return data.decode('utf-8', 'ignore').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def scan_file(
+    text: str, data: bytes, known: dict | None, found: dict, profile: Counter
+) -> tuple[list[Edit], list[str] | None]:
+    """(rewrite edits, entry sites) for one file; sites is None when the
+    file never names the API, [] when it only mentions it.
+
+    Edits are as the rules produce them, before __PACKROOT__ is resolved
+    for the file's place in the pack; the sites are read from the text they
+    rewrite, where the substitution cannot matter as it only ever changes
+    the inside of a string. A file with neither an API name nor a rule's
+    needle costs nothing to scan and is not cached. Every other result is
+    taken from known (the rewrite cache) when there, and goes into found
+    under its content hash either way.
+    """
+    named = ENTRY_RX.search(text) is not None
+    if not named and not any(needle in text for needle in REWRITER.needles):
+        return [], None
+    digest = hashlib.sha1(data).hexdigest()
+    if known is not None:
+        hit = known.get(digest)
+        profile['rewriteHits' if hit else 'rewriteMisses'] += 1
+        if hit:
+            found[digest] = hit
+            return [Edit(*e) for e in hit[0]], hit[1]
+    edits = REWRITER.edits(text)
+    sites = entry_sites(apply_edits(text, edits) if edits else text) if named else None
+    found[digest] = [[list(e) for e in edits], sites]
+    return edits, sites
+
+
+class PackJob(NamedTuple):
+    pack: str
+    safe: str
+    src: str
+    dest: str
+    template: str
+    rules: str
+    cached: dict | None
+    serve: str = 'copy'
+    vendor_index: str = ''
+    rewrite_cache: str = ''
+    rewrite_rules: str = ''
+
+
+class PackResult(NamedTuple):
+    pack: str
+    entry: dict
+    key: str
+    reused: bool
+    staged: dict[str, int]
+    entry_files: list[str] = []
+    js_bytes: int = 0
+    libraries: int = 0
+    profile: dict = {}
+    rewrites: dict = {}  # every rewrite cache entry the pack's files needed
+
+
+def build_pack(job: PackJob) -> PackResult:
+    """Stage one pack under dest/packs/<safe>.
+
+    Runs in a worker process: everything it needs arrives in the job and
+    everything the build needs back is the returned manifest entry and entry
+    files, so packs can be built in any order and merged deterministically;
+    the build writes the specs from them. A pack whose cache key matches the
+    previous build's is left exactly as staged.
+    """
+    started = time.perf_counter()
+    pack, safe, src = job.pack, job.safe, job.src
+    dst = os.path.join(job.dest, 'packs', safe)
+    map_path = os.path.join(job.dest, 'maps', f'{safe}.json')
+    key = hashlib.sha1(
+        f'{pack_digest(src)}:{job.rules}'.encode()
+    ).hexdigest()
+    if (
+        job.cached
+        and job.cached.get('key') == key
+        and isinstance(job.cached.get('entry'), dict)
+        and (
+            'skipped' in job.cached['entry']
+            or (
+                isinstance(job.cached.get('entryFiles'), list)
+                and (
+                    os.path.isfile(map_path)
+                    if job.serve == 'corpus'
+                    else os.path.isdir(dst)
+                )
+            )
+        )
+    ):
+        return PackResult(
+            pack,
+            job.cached['entry'],
+            key,
+            True,
+            {},
+            job.cached.get('entryFiles', []),
+            job.cached.get('jsBytes', 0),
+            job.cached.get('libraries', 0),
+            {'ms': round((time.perf_counter() - started) * 1000), 'reused': True},
+        )
+
+    # A rebuild starts from nothing: a file the pack no longer ships must not
+    # survive in its staged tree, where the spec's glob would still find it.
+    shutil.rmtree(dst, ignore_errors=True)
+    if os.path.exists(map_path):
+        os.remove(map_path)
+    vendored = load_index(job.vendor_index)[0] if job.vendor_index else None
+    known = (
+        load_cache(job.rewrite_cache, job.rewrite_rules) if job.rewrite_cache else None
+    )
+    found: dict[str, list] = {}
+    candidates = []
+    reasons: dict[str, list[str]] = {}
+    mentions = 0  # files naming the API only in comments, strings and the like
+    js_bytes = libraries = 0
+    assisted = set()
+    staged = Counter()
+    # build-profile.json: where this pack's build time and I/O went
+    profile = Counter()
+    hits = Counter()
+    js: dict[str, str] = {}
+    assets: dict[str, str] = {}
+    file_edits: dict[str, tuple[str, list[Edit]]] = {}
+    for fp, rel, is_asset in pack_files(src, by_name=vendored is None):
+        key_rel = rel.replace(os.sep, '/')
+        try:
+            size = os.path.getsize(fp)
+            if size > MAX_FILE_BYTES:
+                continue
+            if is_asset:
+                assets[key_rel] = fp
+                continue
+            with open(fp, 'rb') as fh:
+                data = fh.read()
+        except OSError:
+            continue
+        profile['bytesRead'] += len(data)
+        if vendored is not None and content_hash(data) in vendored:
+            assets[key_rel] = fp
+            libraries += 1
+            continue
+        t = decode(data, job.serve)
+        edits, sites = scan_file(t, data, known, found, profile)
+        if (
+            vendored is not None
+            and named_vendored(rel)
+            and not is_pack_code(edits, sites)
+        ):
+            # A bundle too few packs ship for the index to list it.
+            assets[key_rel] = fp
+            libraries += 1
+            continue
+        js_bytes += size
+        if any('__PACKROOT__' in e.replacement for e in edits):
+            anchor = packroot_anchor(src, dst, fp)
+            up = os.path.relpath(anchor, os.path.dirname(os.path.join(dst, rel))) or '.'
+            up = up if up.startswith('.') else './' + up
+            edits = [
+                e._replace(replacement=e.replacement.replace('__PACKROOT__', up))
+                for e in edits
+            ]
+        assisted.update(e.label for e in edits if e.label)
+        if edits:
+            profile['bytesRewritten'] += len(data)
+            hits.update(e.rule for e in edits)
+            file_edits[key_rel] = (t, edits)
+            t = apply_edits(t, edits)
+        js[key_rel] = t
+        if sites is not None:
+            if sites:
+                candidates.append(key_rel)
+                reasons[key_rel] = sites
+            else:
+                mentions += 1
+    candidates.sort()
+    entries = [c for c in candidates if is_served(c)]
+    # Nothing outside the unserved paths matched, so which files ComfyUI
+    # would boot is a guess: run them, but keep the guess out of the rates.
+    indeterminate = '' if entries else 'entries-unserved-only'
+    entries = entries or candidates
+    if len(entries) > ENTRY_CAP:
+        indeterminate = 'entry-truncated'
+        entries = entries[:ENTRY_CAP]
+    if not entries:
+        return PackResult(
+            pack,
+            {'skipped': 'no extension-shaped JS'},
+            key,
+            False,
+            {},
+            [],
+            js_bytes,
+            libraries,
+            finish_profile(profile, hits, started),
+            found,
+        )
+
+    keep, unresolved, staged_whole = reachable(entries, js, assets)
+    if job.serve == 'corpus':
+        served = {
+            rel: rewrite_map(*file_edits[rel])
+            for rel in sorted(keep)
+            if rel in file_edits
+        }
+        os.makedirs(os.path.dirname(map_path), exist_ok=True)
+        with open(map_path, 'w', encoding='utf-8') as fh:
+            json.dump({'pack': pack, 'root': src, 'files': served}, fh)
+        profile['bytesWritten'] += os.path.getsize(map_path)
+    else:
+        for rel in sorted(keep):
+            out = os.path.join(dst, *rel.split('/'))
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            if rel in js:
+                with open(out, 'w', encoding='utf-8') as fh:
+                    fh.write(js[rel])
+                profile['bytesWritten'] += os.path.getsize(out)
+            else:
+                mode = stage_asset(assets[rel], out)
+                staged[mode] += 1
+                profile['bytesCopied' if mode == 'copy' else 'bytesLinked'] += (
+                    os.path.getsize(out)
+                )
+    entry = {
+        'files': sum(1 for rel in keep if rel in js),
+        'entries': len(entries),
+        'entryCandidates': len(candidates),
+        'entryReasons': {rel: reasons[rel] for rel in entries},
+        'safe': safe,
+    }
+    if mentions:
+        entry['entryMentionsOnly'] = mentions
+    if len(keep) < len(js) + len(assets):
+        entry['unreachable'] = len(js) + len(assets) - len(keep)
+    if staged_whole:
+        entry['stagedWhole'] = staged_whole
+    if unresolved:
+        entry['unresolvedImports'] = unresolved[:UNRESOLVED_CAP]
+        if len(unresolved) > UNRESOLVED_CAP:
+            entry['unresolvedMore'] = len(unresolved) - UNRESOLVED_CAP
+    if assisted:
+        entry['packSpecificRewrites'] = sorted(assisted)
+    if indeterminate:
+        entry['indeterminate'] = indeterminate
+    if any(UNBATCHABLE_RX.search(js[rel]) for rel in sorted(keep) if rel in js):
+        entry['unbatchable'] = 'customElements.define'
+    return PackResult(
+        pack,
+        entry,
+        key,
+        False,
+        dict(staged),
+        entries,
+        js_bytes,
+        libraries,
+        finish_profile(profile, hits, started),
+        found,
+    )
+
+
+def finish_profile(profile: Counter, hits: Counter, started: float) -> dict:
+    return {
+        'ms': round((time.perf_counter() - started) * 1000),
+        **{k: profile[k] for k in sorted(profile)},
+        'ruleHits': dict(sorted(hits.items())),
+    }
+
+
+def write_profile(path: str, results: list[PackResult], wall_ms: int) -> dict:
+    """Aggregate the per-pack profiles into build-profile.json.
+
+    Rule hits cover every rule, zeros included: a rule that never fires
+    across the corpus is a candidate for pruning. Reused packs were not
+    rebuilt, so they carry no build cost and are left out of the slowest.
+    """
+    packs = {r.pack: r.profile for r in sorted(results, key=lambda r: r.pack)}
+    built = {p: v for p, v in packs.items() if not v.get('reused')}
+    rules = dict.fromkeys(sorted(rule.name for rule in REWRITER.rules), 0)
+    totals = Counter()
+    for profile in built.values():
+        rules.update(
+            {name: rules.get(name, 0) + n for name, n in profile['ruleHits'].items()}
+        )
+        totals.update({k: v for k, v in profile.items() if k != 'ruleHits'})
+    doc = {
+        'wallMs': wall_ms,
+        'packs': len(packs),
+        'rebuilt': len(built),
+        'totals': dict(sorted(totals.items())),
+        'slowest': [
+            [pack, built[pack]['ms']]
+            for pack in sorted(built, key=lambda p: (-built[p]['ms'], p))[:PROFILE_TOP]
+        ],
+        'ruleHits': rules,
+        'perPack': packs,
+    }
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(doc, fh, indent=1)
+    return doc
+
+
+def pack_estimate(src: str, vendor_index: str = '') -> tuple[int, int]:
+    """(entry candidates up to ENTRY_CAP, bytes of JS): the planner's inputs."""
+    entries, js_bytes, _modules = pack_features(src, vendor_index)
+    return entries, js_bytes
+
+
+def pack_features(src: str, vendor_index: str = '') -> tuple[int, int, list[str]]:
+    """pack_estimate() and the frontend modules the pack imports, as the
+    shared rewrites name them (@/scripts/app, ...): the sampler's inputs."""
+    vendored = load_index(vendor_index)[0] if vendor_index else None
+    entries = js_bytes = 0
+    modules = set()
+    for fp, _rel, is_asset in pack_files(src, by_name=vendored is None):
+        try:
+            size = os.path.getsize(fp)
+            if is_asset or size > MAX_FILE_BYTES:
+                continue
+            with open(fp, 'rb') as fh:
+                data = fh.read()
+        except OSError:
+            continue
+        if vendored is not None and content_hash(data) in vendored:
+            continue
+        text = data.decode('utf-8', 'ignore')
+        sites = entry_sites(text) if ENTRY_RX.search(text) else None
+        edits = REWRITER.edits(text)
+        if vendored is not None and named_vendored(fp) and not is_pack_code(edits, sites):
+            continue
+        js_bytes += size
+        entries += bool(sites)
+        modules.update(edit.replacement.strip('"') for edit in edits if not edit.label)
+    return min(entries, ENTRY_CAP), js_bytes, sorted(modules)
+
+
+def library_candidates(src: str) -> dict[str, tuple[int, str]]:
+    """{content hash: (bytes, file name)} of the pack's self-contained JS.
+
+    A file that registers an extension, imports the app or loads another
+    file by path is pack code however many packs copy it: the build has to
+    rewrite it, find entries in it, or follow its imports. A bundle that
+    only mentions the API, as litegraph.core.js defines registerNodeType,
+    or that imports a computed path is still a library.
+    """
+    found = {}
+    for fp, _rel, is_asset in pack_files(src, by_name=False):
+        try:
+            if is_asset or os.path.getsize(fp) > MAX_FILE_BYTES:
+                continue
+            with open(fp, 'rb') as fh:
+                data = fh.read()
+        except OSError:
+            continue
+        text = data.decode('utf-8', 'ignore')
+        sites = entry_sites(text) if ENTRY_RX.search(text) else None
+        if (
+            is_pack_code(REWRITER.edits(text), sites)
+            or any(
+                spec.startswith(('.', '/'))
+                for _quote, spec in IMPORT_SPEC_RX.findall(text)
+            )
+        ):
+            continue
+        found[content_hash(data)] = (len(data), os.path.basename(fp))
+    return found
+
+
+def map_packs(fn, args: list, workers: int = 0) -> list:
+    """fn over args in a process pool, results in argument order."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(args) < 2:
+        return [fn(*a) for a in args]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(fn, *zip(*args), chunksize=16))
+
+
+def corpus_packs() -> list[str]:
+    return sorted(p for p in os.listdir(REPOS) if os.path.isdir(os.path.join(REPOS, p)))
+
+
+def plan_corpus(
+    packs: list[str],
+    shards: int,
+    runtimes: dict[str, int],
+    workers: int = 0,
+    vendor_index: str = '',
+) -> dict:
+    estimates = map_packs(
+        pack_estimate,
+        [(os.path.join(REPOS, pack), vendor_index) for pack in packs],
+        workers,
+    )
+    return make_plan(dict(zip(packs, estimates)), runtimes, shards)
+
+
+def registry_downloads() -> dict[str, float]:
+    """Per-pack downloads from the registry snapshot; empty without one."""
+    try:
+        with open(registry_snapshot(), encoding='utf-8') as fh:
+            registry = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(registry, list):
+        return {}
+    return {
+        e['id']: float(e['downloads'])
+        if isinstance(e.get('downloads'), (int, float)) else 0.0
+        for e in registry
+        if isinstance(e, dict) and isinstance(e.get('id'), str)
+    }
+
+
+def sample_corpus(
+    packs: list[str], size: int, seed: int = 0, workers: int = 0, vendor_index: str = ''
+) -> dict:
+    features = map_packs(
+        pack_features,
+        [(os.path.join(REPOS, pack), vendor_index) for pack in packs],
+        workers,
+    )
+    downloads = registry_downloads()
+    return make_sample(
+        {
+            pack: [entries, downloads.get(pack, 0.0), modules]
+            for pack, (entries, _js_bytes, modules) in zip(packs, features)
+            if entries
+        },
+        size,
+        seed,
+    )
+
+
+def write_vendor_index(path: str, min_packs: int = MIN_PACKS, workers: int = 0) -> dict:
+    found = map_packs(
+        library_candidates,
+        [(os.path.join(REPOS, pack),) for pack in corpus_packs()],
+        workers,
+    )
+    index = make_index(found, min_packs)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(index, fh, indent=1)
+        fh.write('\n')
+    return index
+
+
+def update_rewrite_cache(path: str, rules: str, results: list[PackResult]) -> int:
+    """Add the builds' new scan results to the rewrite cache; returns its
+    size in bytes, 0 when there is none and -1 when nothing was new.
+
+    Entries are only added: a build of a shard or a --limit sees a slice of
+    the corpus, and the rest of the cache is still good for the next build
+    of the rest. warm_rewrite_cache() is what prunes.
+    """
+    if not path:
+        return 0
+    known = load_cache(path, rules)
+    new = {d: e for r in results for d, e in r.rewrites.items() if d not in known}
+    if not new:
+        return -1
+    return write_cache(path, rules, {**known, **new})
+
+
+def describe_rewrites(totals: dict, size: int) -> str:
+    hits, misses = totals.get('rewriteHits', 0), totals.get('rewriteMisses', 0)
+    saved = (
+        'unchanged' if size < 0 else f'saved, {size / 1e6:.1f} MB'
+    )
+    return (
+        f'rewrite cache: {hits} of {hits + misses} scanned files hit'
+        f' ({hits / max(hits + misses, 1):.0%}); {saved}'
+    )
+
+
+def pack_rewrites(
+    src: str, serve: str, vendor_index: str, path: str, rules: str
+) -> tuple[dict, dict]:
+    """(cache entries, hit/miss counts) for every JS file build_pack()
+    would scan in the pack, whatever its entries turn out to reach."""
+    vendored = load_index(vendor_index)[0] if vendor_index else None
+    known = load_cache(path, rules)
+    found: dict[str, list] = {}
+    profile = Counter()
+    for fp, _rel, is_asset in pack_files(src, by_name=vendored is None):
+        try:
+            if is_asset or os.path.getsize(fp) > MAX_FILE_BYTES:
+                continue
+            with open(fp, 'rb') as fh:
+                data = fh.read()
+        except OSError:
+            continue
+        if vendored is not None and content_hash(data) in vendored:
+            continue
+        scan_file(decode(data, serve), data, known, found, profile)
+    return found, dict(profile)
+
+
+def warm_rewrite_cache(
+    path: str, serve: str = 'copy', vendor_index: str = '', workers: int = 0
+) -> str:
+    """Scan the whole corpus into the rewrite cache at path.
+
+    The cache is rewritten to exactly what this corpus needs, which drops
+    the entries of files no pack ships any more.
+    """
+    path = os.path.abspath(path)
+    if vendor_index:
+        vendor_index = os.path.abspath(vendor_index)
+    rules = rewrite_digest(serve)
+    scanned = map_packs(
+        pack_rewrites,
+        [
+            (os.path.join(REPOS, pack), serve, vendor_index, path, rules)
+            for pack in corpus_packs()
+        ],
+        workers,
+    )
+    files, totals = {}, Counter()
+    for found, counts in scanned:
+        files.update(found)
+        totals.update(counts)
+    unchanged = files == load_cache(path, rules)
+    size = -1 if unchanged else write_cache(path, rules, files)
+    return f'{describe_rewrites(totals, size)}, {len(files)} distinct files'
+
+
+def write_plan(path: str, plan: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(plan, fh, indent=1)
+        fh.write('\n')
+
+
+def describe_plan(plan: dict) -> str:
+    loads = ', '.join(f'{ms / 1000:.0f}s' for ms in plan['predictedMs'])
+    return (
+        f'shard plan {plan["digest"][:12]}: {len(plan["packs"])} packs over'
+        f' {plan["shards"]} shards, predicted [{loads}],'
+        f' {plan["measured"]} costs measured'
+    )
+
+
+def describe_sample(sample: dict) -> str:
+    strata = ', '.join(
+        f'{name}: {s["sampled"]}/{s["population"]}'
+        for name, s in sample['strata'].items()
+    )
+    return (
+        f'sample {sample["digest"][:12]}: {len(sample["packs"])} of'
+        f' {len(sample["features"])} JS packs (strata {strata}),'
+        f' {len(sample["modules"])} frontend modules covered'
+    )
+
+
+def load_build_cache(path: str) -> dict:
+    try:
+        with open(path, encoding='utf-8') as fh:
+            cache = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    packs = cache.get('packs') if isinstance(cache, dict) else None
+    return packs if isinstance(packs, dict) else {}
+
+
+def write_specs(
+    dest: str,
+    template: str,
+    results: list[PackResult],
+    serve: str,
+    costs: dict[str, int],
+    batch_ms: int,
+) -> dict[str, list[str]]:
+    """Write the spec files; spec name -> safe names of the packs it runs.
+
+    A pack alone keeps the spec named after it. Packs batch() groups share a
+    batch-NNN spec, numbered cheapest group first; an unbatchable pack is
+    always alone.
+    """
+    specs, safes, alone = {}, {}, []
+    for r in results:
+        if 'entries' not in r.entry:
+            continue
+        if 'unbatchable' in r.entry:
+            alone.append(r.pack)
+        safe = safes[r.pack] = r.entry['safe']
+        specs[r.pack] = render_spec(
+            template,
+            r.pack,
+            safe,
+            [f'./packs/{safe}/{e}' for e in r.entry_files],
+            r.entry_files if serve == 'corpus' else None,
+        )
+    files: dict[str, list[str]] = {}
+    groups = batch({p: costs.get(p, 0) for p in specs if p not in alone}, batch_ms)
+    for group in groups + [[p] for p in sorted(alone)]:
+        if len(group) == 1:
+            name, text = safes[group[0]], specs[group[0]]
+        else:
+            name = f'batch-{sum(len(v) > 1 for v in files.values()) + 1:03d}'
+            text = render_batch([specs[p] for p in group])
+        with open(os.path.join(dest, f'{name}.matrix.test.ts'), 'w', encoding='utf-8') as fh:
+            fh.write(text)
+        files[name] = [safes[p] for p in group]
+    return files
+
+
+def remove_orphans(dest: str, keep: set[str], specs: set[str]) -> int:
+    """Delete staged trees, maps and specs this build did not produce."""
+    removed = 0
+    packs_dir = os.path.join(dest, 'packs')
+    for name in os.listdir(packs_dir):
+        if name not in keep:
+            shutil.rmtree(os.path.join(packs_dir, name), ignore_errors=True)
+            removed += 1
+    for name in os.listdir(dest):
+        if name.endswith('.matrix.test.ts') and name[: -len('.matrix.test.ts')] not in specs:
+            os.remove(os.path.join(dest, name))
+    maps_dir = os.path.join(dest, 'maps')
+    for name in os.listdir(maps_dir) if os.path.isdir(maps_dir) else []:
+        if name[: -len('.json')] not in keep:
+            os.remove(os.path.join(maps_dir, name))
+    return removed
+
+
+def build(
+    limit: int = 0,
+    shard: str = '',
+    workers: int = 0,
+    clean: bool = False,
+    plan_path: str = '',
+    runtimes: str = '',
+    serve: str = 'copy',
+    batch_ms: int = 0,
+    vendor_index: str = '',
+    rewrite_cache: str = '',
+    sample: int = 0,
+    sample_path: str = '',
+):
     if not os.path.isdir(REPOS):
         sys.exit(f'corpus missing: {REPOS} - run fetch_corpus.py (or restore the cache) first')
+    started = time.perf_counter()
     template = load_spec_template()
+    if vendor_index:
+        vendor_index = os.path.abspath(vendor_index)
+    vendored = load_index(vendor_index)[1] if vendor_index else ''
     runner = os.path.join(HERE, 'matrix_runner.ts')
     assert_runner_copy_depth(open(runner, encoding='utf-8').read())
-    if os.path.isdir(DEST):
+    if clean and os.path.isdir(DEST):
         shutil.rmtree(DEST)
-    os.makedirs(os.path.join(DEST, 'packs'))
+    cache_path = os.path.join(DEST, BUILD_CACHE)
+    cached = load_build_cache(cache_path)
+    # Dropped until this build completes: an interrupted build must not leave
+    # an index vouching for packs it was halfway through restaging.
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+    os.makedirs(os.path.join(DEST, 'packs'), exist_ok=True)
+    # The runner is not part of any pack's key; it is copied fresh every
+    # build, so iterating on matrix_runner.ts rebuilds nothing.
     shutil.copy(runner, os.path.join(DEST, 'runner.ts'))
 
-    packs = sorted(os.listdir(REPOS))
+    packs = corpus_packs()
+    plan = None
+    plan_out = os.path.join(DEST, 'plan.json')
+    sample_out = os.path.join(DEST, 'sample.json')
+    for stale in (plan_out, sample_out):
+        if os.path.exists(stale):
+            os.remove(stale)
+    if sample and shard:
+        sys.exit('--sample builds one job of its own; it does not take --shard')
+    if sample:
+        if sample_path:
+            try:
+                with open(sample_path, encoding='utf-8') as fh:
+                    drawn = json.load(fh)
+            except (OSError, ValueError) as exc:
+                sys.exit(f'unreadable sample {sample_path}: {exc}')
+            problem = check_sample(drawn) or (
+                f'drawn for {drawn["size"]} packs, not {sample}'
+                if drawn.get('size') != sample else ''
+            ) or (
+                f'{len(set(drawn["packs"]) - set(packs))} sampled packs not in the corpus'
+                if set(drawn['packs']) - set(packs) else ''
+            )
+            if problem:
+                sys.exit(f'sample {sample_path}: {problem}')
+        else:
+            drawn = sample_corpus(packs, sample, 0, workers, vendor_index)
+        # Rides with the rows like the shard plan: the verdict weighs each
+        # row by its stratum's share of the population.
+        write_plan(sample_out, drawn)
+        packs = [p for p in packs if p in drawn['packs']]
+        print(describe_sample(drawn), file=sys.stderr)
     if shard:
         index, total = (int(v) for v in shard.split('/'))
-        packs = [p for i, p in enumerate(packs) if i % total == index - 1]
+        if plan_path:
+            try:
+                with open(plan_path, encoding='utf-8') as fh:
+                    plan = json.load(fh)
+            except (OSError, ValueError) as exc:
+                sys.exit(f'unreadable shard plan {plan_path}: {exc}')
+            problem = check_plan(plan, total, packs)
+            if problem:
+                sys.exit(f'shard plan {plan_path}: {problem}')
+        else:
+            plan = plan_corpus(
+                packs,
+                total,
+                load_runtimes(runtimes) if runtimes else {},
+                workers,
+                vendor_index,
+            )
+        # The plan this shard built from rides with its rows, so the verdict
+        # can check every shard drew from the same assignment.
+        write_plan(plan_out, plan)
+        packs = [p for p in packs if plan['packs'][p] == index]
+        print(
+            f'{describe_plan(plan)}; shard {index}: {len(packs)} packs',
+            file=sys.stderr,
+        )
     if limit:
         packs = packs[:limit]
 
-    packs = [p for p in packs if os.path.isdir(os.path.join(REPOS, p))]
     safes = {pack: safe_name(pack) for pack in packs}
     clashing = {s for s, n in Counter(safes.values()).items() if n > 1}
     if clashing:
@@ -168,105 +1627,290 @@ def build(limit: int = 0, shard: str = ''):
         sys.exit(
             f'safe names collide for {len(colliding)} packs: {colliding} -'
             ' colliding packs overwrite each other and vanish from the census'
-            ' without moving the rows-vs-specs count'
+            ' without moving the rows-vs-packs count'
         )
 
-    manifest = {}
-    for pack in packs:
-        src = os.path.join(REPOS, pack)
-        safe = safes[pack]
-        dst = os.path.join(DEST, 'packs', safe)
-        candidates = []
-        assisted = set()
-        n_files = 0
-        for root, dirs, files in os.walk(src):
-            dirs[:] = [d for d in dirs if d not in SKIP]
-            for f in files:
-                lo = f.lower()
-                is_vendored = any(v in lo for v in VEND) or '.min.js' in lo
-                is_asset = lo.endswith(ASSETS) or (lo.endswith(JS) and is_vendored)
-                if not (lo.endswith(JS) or is_asset):
-                    continue
-                fp = os.path.join(root, f)
-                try:
-                    if os.path.getsize(fp) > 2_000_000:
-                        continue
-                    if is_asset:
-                        rel = os.path.relpath(fp, src)
-                        out = os.path.join(dst, rel)
-                        os.makedirs(os.path.dirname(out), exist_ok=True)
-                        shutil.copy(fp, out)
-                        continue
-                    t = open(fp, encoding='utf-8', errors='ignore').read()
-                except OSError:
-                    continue
-
-                rel = os.path.relpath(fp, src)
-                out = os.path.join(dst, rel)
-                os.makedirs(os.path.dirname(out), exist_ok=True)
-                for rx, rep in REWRITES:
-                    t = rx.sub(rep, t)
-                for label, rx, rep in PACK_REWRITES:
-                    t, hits = rx.subn(rep, t)
-                    if hits:
-                        assisted.add(label)
-                if '__PACKROOT__' in t:
-                    anchor = packroot_anchor(src, dst, fp)
-                    up = os.path.relpath(anchor, os.path.dirname(out)) or '.'
-                    up = up if up.startswith('.') else './' + up
-                    t = t.replace('__PACKROOT__', up)
-                open(out, 'w', encoding='utf-8').write(t)
-                n_files += 1
-                if ENTRY_RX.search(t):
-                    candidates.append(rel.replace(os.sep, '/'))
-        candidates.sort()
-        entries = [c for c in candidates if is_served(c)]
-        # Nothing outside the unserved paths matched, so which files ComfyUI
-        # would boot is a guess: run them, but keep the guess out of the rates.
-        indeterminate = '' if entries else 'entries-unserved-only'
-        entries = entries or candidates
-        if len(entries) > ENTRY_CAP:
-            indeterminate = 'entry-truncated'
-            entries = entries[:ENTRY_CAP]
-        if not entries:
-            shutil.rmtree(dst, ignore_errors=True)
-            manifest[pack] = {'skipped': 'no extension-shaped JS'}
-            continue
-        spec = render_spec(
-            template, pack, safe, [f'./packs/{safe}/{e}' for e in entries]
+    rules = rules_digest(template, serve, vendored)
+    rewrite_rules = rewrite_digest(serve)
+    if rewrite_cache:
+        rewrite_cache = os.path.abspath(rewrite_cache)
+    jobs = [
+        PackJob(
+            pack,
+            safes[pack],
+            os.path.abspath(os.path.join(REPOS, pack)),
+            DEST,
+            template,
+            rules,
+            cached.get(pack),
+            serve,
+            vendor_index,
+            rewrite_cache,
+            rewrite_rules,
         )
-        open(
-            os.path.join(DEST, f'{safe}.matrix.test.ts'), 'w', encoding='utf-8'
-        ).write(spec)
-        manifest[pack] = {
-            'files': n_files,
-            'entries': len(entries),
-            'entryCandidates': len(candidates),
-            'safe': safe,
-        }
-        if assisted:
-            manifest[pack]['packSpecificRewrites'] = sorted(assisted)
-        if indeterminate:
-            manifest[pack]['indeterminate'] = indeterminate
+        for pack in packs
+    ]
+    # Rewriting is CPU-bound regex work over ~1GB of JS, so packs build in a
+    # process pool. map() returns results in job order, which keeps the
+    # manifest byte-identical to a serial build whatever finishes first.
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 2:
+        built_packs = [build_pack(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            built_packs = list(ex.map(build_pack, jobs, chunksize=8))
+    manifest = {r.pack: r.entry for r in built_packs}
+    rewrites = update_rewrite_cache(rewrite_cache, rewrite_rules, built_packs)
+    costs = {}
+    if batch_ms:
+        costs = plan['costMs'] if plan else predict(
+            {
+                r.pack: (r.entry['entries'], r.js_bytes)
+                for r in built_packs
+                if 'entries' in r.entry
+            },
+            load_runtimes(runtimes) if runtimes else {},
+        )
+    specs = write_specs(DEST, template, built_packs, serve, costs, batch_ms)
+    orphans = remove_orphans(
+        DEST, {v['safe'] for v in manifest.values() if 'entries' in v}, set(specs)
+    )
+    batches_path = os.path.join(DEST, 'batches.json')
+    shared = {name: safes for name, safes in specs.items() if len(safes) > 1}
+    if shared:
+        with open(batches_path, 'w', encoding='utf-8') as fh:
+            json.dump(shared, fh, indent=1)
+    elif os.path.exists(batches_path):
+        os.remove(batches_path)
     json.dump(
         manifest,
         open(os.path.join(DEST, 'manifest.json'), 'w', encoding='utf-8'),
         indent=1,
     )
+    serve_index = os.path.join(DEST, SERVE_INDEX)
+    if serve == 'corpus':
+        with open(serve_index, 'w', encoding='utf-8') as fh:
+            json.dump(
+                {
+                    'corpus': os.path.abspath(REPOS),
+                    'packs': {
+                        v['safe']: {
+                            'root': os.path.abspath(os.path.join(REPOS, pack)),
+                            'map': f'maps/{v["safe"]}.json',
+                        }
+                        for pack, v in manifest.items()
+                        if 'entries' in v
+                    },
+                },
+                fh,
+                indent=1,
+            )
+    elif os.path.exists(serve_index):
+        os.remove(serve_index)
+    with open(cache_path, 'w', encoding='utf-8') as fh:
+        json.dump(
+            {
+                'packs': {
+                    r.pack: {
+                        'key': r.key,
+                        'entry': r.entry,
+                        'entryFiles': r.entry_files,
+                        'jsBytes': r.js_bytes,
+                        'libraries': r.libraries,
+                    }
+                    for r in built_packs
+                }
+            },
+            fh,
+        )
+    profile = write_profile(
+        os.path.join(DEST, BUILD_PROFILE),
+        built_packs,
+        round((time.perf_counter() - started) * 1000),
+    )
     built = sum(1 for v in manifest.values() if 'entries' in v)
     helped = sum(1 for v in manifest.values() if v.get('packSpecificRewrites'))
     unsure = sum(1 for v in manifest.values() if v.get('indeterminate'))
+    reused = sum(1 for r in built_packs if r.reused)
+    staged = Counter()
+    for r in built_packs:
+        staged.update(r.staged)
     print(
         f'{built} pack specs built, {len(manifest)-built} skipped,'
         f' {helped} needed a pack-specific rewrite,'
         f' {unsure} indeterminate (excluded from rates) -> {DEST}',
         file=sys.stderr,
     )
+    print(
+        f'  {len(built_packs) - reused} packs rebuilt, {reused} reused'
+        f' unchanged, {orphans} orphaned pack trees removed',
+        file=sys.stderr,
+    )
+    if shared:
+        print(
+            f'  {built} packs in {len(specs)} spec files,'
+            f' {sum(map(len, shared.values()))} of them sharing {len(shared)}'
+            f' batch files (--batch-ms {batch_ms})',
+            file=sys.stderr,
+        )
+    if vendor_index:
+        print(
+            f'  {sum(r.libraries for r in built_packs)} JS files matched the'
+            f' vendor index ({vendored[:12]}) and were staged as assets',
+            file=sys.stderr,
+        )
+    if staged:
+        print(
+            '  assets staged: '
+            + ', '.join(f'{staged[m]} {m}' for m in ('reflink', 'hardlink', 'copy')),
+            file=sys.stderr,
+        )
+    totals = profile['totals']
+    if rewrite_cache:
+        print(f'  {describe_rewrites(totals, rewrites)}', file=sys.stderr)
+    idle = [name for name, n in profile['ruleHits'].items() if not n]
+    print(
+        f'  profile: {totals.get("bytesRead", 0) / 1e6:.1f} MB read,'
+        f' {totals.get("bytesRewritten", 0) / 1e6:.1f} MB rewritten,'
+        f' {totals.get("bytesWritten", 0) / 1e6:.1f} MB written;'
+        f' slowest {", ".join(f"{p} {ms}ms" for p, ms in profile["slowest"][:3]) or "-"};'
+        f' {len(idle)} rules never fired -> {BUILD_PROFILE}',
+        file=sys.stderr,
+    )
 
 
 if __name__ == '__main__':
     ap = argparse.ArgumentParser(description=__doc__)
     ap.add_argument('--limit', type=int, default=0, help='only N packs (smoke test)')
     ap.add_argument('--shard', default='', help='I/N: build only the I-th of N pack shards')
+    ap.add_argument(
+        '--workers', type=int, default=0,
+        help='build processes (default: one per core; 1 builds in-process)',
+    )
+    ap.add_argument(
+        '--clean', action='store_true',
+        help='discard DEST and its build cache before building',
+    )
+    ap.add_argument(
+        '--plan', default='',
+        help='shard plan to build --shard from (default: plan the corpus here)',
+    )
+    ap.add_argument(
+        '--runtimes', default='',
+        help="metrics.json whose packMs calibrates the plan's cost model",
+    )
+    ap.add_argument(
+        '--write-plan', default='', metavar='PATH',
+        help='write the --shards N plan for the whole corpus to PATH and exit',
+    )
+    ap.add_argument('--shards', type=int, default=4, help='shard count for --write-plan')
+    ap.add_argument(
+        '--sample', type=int, default=0, metavar='N',
+        help='build only a stratified sample of N packs (sample_plan.py)',
+    )
+    ap.add_argument(
+        '--sample-plan', default='', metavar='PATH',
+        help='sample to build --sample from (default: draw it here)',
+    )
+    ap.add_argument(
+        '--write-sample', default='', metavar='PATH',
+        help='draw the --sample N sample of the whole corpus, write it to PATH and exit',
+    )
+    ap.add_argument(
+        '--vendor-index', default='', metavar='PATH',
+        help='content-hash index of vendored libraries (default: VEND filename rule)',
+    )
+    ap.add_argument(
+        '--write-vendor-index', default='', metavar='PATH',
+        help='seed the vendor index from the corpus, write it to PATH and exit',
+    )
+    ap.add_argument(
+        '--vendor-min-packs', type=int, default=MIN_PACKS, metavar='N',
+        help='a library is a file found identical in at least N packs',
+    )
+    ap.add_argument(
+        '--serve', choices=('copy', 'corpus'), default='copy',
+        help='copy: stage rewritten packs into DEST; corpus: write rewrite'
+        ' maps and let vitest.matrix.config.mts serve packs from the corpus',
+    )
+    ap.add_argument(
+        '--batch-ms', type=int, default=0, metavar='MS',
+        help='share spec files among cheap packs up to MS of predicted run'
+        ' time each (default: one spec per pack)',
+    )
+    ap.add_argument(
+        '--rewrite-cache', default=REWRITE_CACHE, metavar='PATH',
+        help="per-file rewrite results shared across builds ('' for none;"
+        ' default: %(default)s)',
+    )
+    ap.add_argument(
+        '--warm-rewrite-cache', action='store_true',
+        help='scan the whole corpus into --rewrite-cache and exit',
+    )
     args = ap.parse_args()
-    build(args.limit, args.shard)
+    if args.warm_rewrite_cache:
+        if not os.path.isdir(REPOS):
+            sys.exit(f'corpus missing: {REPOS}')
+        if not args.rewrite_cache:
+            sys.exit('--warm-rewrite-cache needs a --rewrite-cache path')
+        print(
+            warm_rewrite_cache(
+                args.rewrite_cache, args.serve, args.vendor_index, args.workers
+            ),
+            file=sys.stderr,
+        )
+        sys.exit(0)
+    if args.write_vendor_index:
+        if not os.path.isdir(REPOS):
+            sys.exit(f'corpus missing: {REPOS}')
+        index = write_vendor_index(
+            args.write_vendor_index, args.vendor_min_packs, args.workers
+        )
+        print(
+            f'vendor index {index["digest"][:12]}: {len(index["libraries"])}'
+            f' libraries found in >= {args.vendor_min_packs} packs',
+            file=sys.stderr,
+        )
+        sys.exit(0)
+    if args.write_plan:
+        if not os.path.isdir(REPOS):
+            sys.exit(f'corpus missing: {REPOS}')
+        plan = plan_corpus(
+            corpus_packs(),
+            args.shards,
+            load_runtimes(args.runtimes) if args.runtimes else {},
+            args.workers,
+            os.path.abspath(args.vendor_index) if args.vendor_index else '',
+        )
+        write_plan(args.write_plan, plan)
+        print(describe_plan(plan), file=sys.stderr)
+        sys.exit(0)
+    if args.write_sample:
+        if not os.path.isdir(REPOS):
+            sys.exit(f'corpus missing: {REPOS}')
+        if args.sample < 1:
+            sys.exit('--write-sample needs --sample N')
+        drawn = sample_corpus(
+            corpus_packs(),
+            args.sample,
+            0,
+            args.workers,
+            os.path.abspath(args.vendor_index) if args.vendor_index else '',
+        )
+        write_plan(args.write_sample, drawn)
+        print(describe_sample(drawn), file=sys.stderr)
+        sys.exit(0)
+    build(
+        args.limit,
+        args.shard,
+        args.workers,
+        args.clean,
+        args.plan,
+        args.runtimes,
+        args.serve,
+        args.batch_ms,
+        args.vendor_index,
+        args.rewrite_cache,
+        args.sample,
+        args.sample_plan,
+    )
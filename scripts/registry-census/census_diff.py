@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""Provenance diff between two census snapshots.
+
+Two runs measured the same population only if their registry snapshot, pins
+and lockfile agree. This compares two sets of those files and names every
+pack that differs, in one of six ways:
+
+  added / removed   the pack is present on only one side
+  repoChanged       the registry points the pack at a different repository
+  refMoved          its pinned commit or its fetched ref moved
+  etagMoved         the tarball ETag moved - the bytes changed, whatever the
+                    ref says
+  statusChanged     the fetch status changed (ok, empty, failed, ...)
+
+Each side is a directory laid out like CENSUS_ROOT or the corpus-lock
+artifact (data/registry.json or registry.json, corpus.lock.json,
+corpus.pins.json); any file can be named explicitly instead, and a facet
+missing on either side is simply not compared. The result is JSON on stdout
+for CI, or --markdown for a step summary:
+
+    python3 scripts/registry-census/census_diff.py base/ head/
+    python3 scripts/registry-census/census_diff.py \\
+        --before-pins old-pins.json --after-pins corpus.pins.json --markdown
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import NamedTuple
+
+CATEGORIES = (
+    'added',
+    'removed',
+    'repoChanged',
+    'refMoved',
+    'etagMoved',
+    'statusChanged',
+)
+
+
+class Facts(NamedTuple):
+    """What one side records about one pack; None where a facet is silent."""
+
+    repo: str | None
+    pin: str | None
+    ref: str | None
+    etag: str | None
+    status: str | None
+
+
+class Side(NamedTuple):
+    registry: dict[str, str] | None
+    pins: dict[str, str] | None
+    lock: dict[str, dict] | None
+
+
+def _load(path: str | None) -> object:
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError) as exc:
+        raise SystemExit(f'unreadable census file {path}: {exc}') from exc
+
+
+def _first(root: str | None, *names: str) -> str | None:
+    if not root:
+        return None
+    for name in names:
+        path = os.path.join(root, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_side(
+    root: str | None,
+    registry: str | None = None,
+    pins: str | None = None,
+    lock: str | None = None,
+) -> Side:
+    reg = _load(registry or _first(root, 'data/registry.json', 'registry.json'))
+    pin = _load(pins or _first(root, 'corpus.pins.json'))
+    lck = _load(lock or _first(root, 'corpus.lock.json'))
+    return Side(
+        {
+            str(e['id']): str(e.get('repo') or '')
+            for e in reg
+            if isinstance(e, dict) and e.get('id')
+        }
+        if isinstance(reg, list)
+        else None,
+        pin.get('packs') if isinstance(pin, dict) else None,
+        lck.get('packs') if isinstance(lck, dict) else None,
+    )
+
+
+def _facts(side: Side, pack: str) -> Facts:
+    entry = (side.lock or {}).get(pack)
+    entry = entry if isinstance(entry, dict) else {}
+    return Facts(
+        side.registry.get(pack) if side.registry is not None else None,
+        side.pins.get(pack) if side.pins is not None else None,
+        entry.get('ref'),
+        entry.get('etag'),
+        entry.get('status'),
+    )
+
+
+def _ids(side: Side, compare: list[bool]) -> list[str]:
+    """The ids of the compared facets only: a pack known to a facet the
+    other side lacks is neither added nor removed."""
+    ids: set[str] = set()
+    for facet, on in zip(side, compare):
+        if on:
+            ids.update(facet)
+    return sorted(ids)
+
+
+def diff(before: Side, after: Side) -> dict:
+    """One linear merge over both sides' sorted ids.
+
+    A facet is compared only when both sides carry it: a lockfile missing
+    from one side says nothing about whether ETags moved.
+    """
+    compare = [b is not None and a is not None for b, a in zip(before, after)]
+    out: dict[str, list] = {name: [] for name in CATEGORIES}
+    old, new = _ids(before, compare), _ids(after, compare)
+    i = j = 0
+    while i < len(old) or j < len(new):
+        if j == len(new) or (i < len(old) and old[i] < new[j]):
+            out['removed'].append(old[i])
+            i += 1
+            continue
+        if i == len(old) or new[j] < old[i]:
+            out['added'].append(new[j])
+            j += 1
+            continue
+        pack = old[i]
+        i += 1
+        j += 1
+        was, now = _facts(before, pack), _facts(after, pack)
+        if compare[0] and was.repo != now.repo:
+            out['repoChanged'].append(
+                {'id': pack, 'before': was.repo, 'after': now.repo}
+            )
+        moved = {}
+        if compare[1] and was.pin != now.pin:
+            moved['pin'] = [was.pin, now.pin]
+        if compare[2] and was.ref != now.ref:
+            moved['ref'] = [was.ref, now.ref]
+        if moved:
+            out['refMoved'].append({'id': pack, **moved})
+        if compare[2] and was.etag != now.etag:
+            out['etagMoved'].append(
+                {'id': pack, 'before': was.etag, 'after': now.etag}
+            )
+        if compare[2] and was.status != now.status:
+            out['statusChanged'].append(
+                {'id': pack, 'before': was.status, 'after': now.status}
+            )
+    return {
+        'compared': [
+            facet
+            for facet, on in zip(('registry', 'pins', 'lock'), compare)
+            if on
+        ],
+        'packs': {'before': len(old), 'after': len(new)},
+        'counts': {name: len(out[name]) for name in CATEGORIES},
+        **out,
+    }
+
+
+def _short(value: object) -> str:
+    if value is None:
+        return '-'
+    text = str(value)
+    return text[:8] if len(text) == 40 else text
+
+
+def markdown(result: dict, title: str) -> str:
+    counts = result['counts']
+    lines = [
+        f'## {title}',
+        '',
+        f'- {result["packs"]["after"]} packs'
+        f' (was {result["packs"]["before"]});'
+        f' compared: {", ".join(result["compared"]) or "nothing"}',
+        '- '
+        + ', '.join(f'{counts[name]} {name}' for name in CATEGORIES),
+        '',
+    ]
+    for name in CATEGORIES:
+        items = result[name]
+        if not items:
+            continue
+        lines.append(f'<details><summary>{name}</summary>\n')
+        for item in items:
+            if isinstance(item, str):
+                lines.append(f'- `{item}`')
+                continue
+            pairs = {k: v for k, v in item.items() if k != 'id'}
+            if 'before' in pairs:
+                pairs = {'': [pairs['before'], pairs['after']]}
+            lines.append(
+                f'- `{item["id"]}` '
+                + ' '.join(
+                    f'{k + " " if k else ""}{_short(b)} -> {_short(a)}'
+                    for k, (b, a) in pairs.items()
+                )
+            )
+        lines.append('\n</details>')
+    return '\n'.join(lines)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument('before', nargs='?', help='directory of the earlier census')
+    ap.add_argument('after', nargs='?', help='directory of the later census')
+    for side in ('before', 'after'):
+        for facet in ('registry', 'pins', 'lock'):
+            ap.add_argument(f'--{side}-{facet}', help=f'{side} {facet} file')
+    ap.add_argument('--markdown', action='store_true', help='step-summary output')
+    ap.add_argument('--title', default='Census diff')
+    args = ap.parse_args()
+
+    before = load_side(
+        args.before, args.before_registry, args.before_pins, args.before_lock
+    )
+    after = load_side(
+        args.after, args.after_registry, args.after_pins, args.after_lock
+    )
+    result = diff(before, after)
+    if not result['compared']:
+        print('no census facet is present on both sides', file=sys.stderr)
+        return 2
+    if args.markdown:
+        print(markdown(result, args.title))
+    else:
+        json.dump(result, sys.stdout, indent=1)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
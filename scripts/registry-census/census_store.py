@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""Optional SQLite store for census state.
+
+The census keeps its state in separate JSON files - the registry snapshot,
+corpus.lock.json, the ready marker, one row per pack - each rewritten whole.
+Those files stay the interchange format: CI caches them, artifacts carry them
+and validate_corpus.py reads them. This store sits beside them under
+CENSUS_ROOT and holds the same records as indexed tables, so a question such
+as "which packs regressed since the last run, by downloads" is one query
+instead of a bespoke script over two directories of JSON.
+
+Writers commit per pack as results arrive, so an interrupted fetch leaves
+every finished pack recorded. The exporters reproduce the JSON artifacts
+byte-for-byte; a store that could not round-trip them would be a second,
+subtly different source of truth.
+
+The metrics table is the matrix verdict's history: every passing run's
+Verdict.metrics, appended and never rewritten, indexed by run and by the
+time it was recorded. summarize_matrix.py reads it for the rolling baseline
+of its delta gate ($MATRIX_HISTORY_DB).
+
+    python3 scripts/registry-census/fetch_corpus.py --store
+    python3 scripts/registry-census/census_store.py import
+    python3 scripts/registry-census/census_store.py rows "$MATRIX_OUT" --run 123
+    python3 scripts/registry-census/census_store.py regressed
+    python3 scripts/registry-census/census_store.py metrics matrix-metrics/metrics.json
+    python3 scripts/registry-census/census_store.py trend --since 2026-01-01
+    python3 scripts/registry-census/census_store.py export /tmp/census
+"""
+
+from __future__ import annotations
+
+import argparse
+import calendar
+import json
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import matrix_rows  # noqa: E402
+from paths import (  # noqa: E402
+    LOCKFILE,
+    READY_MARKER,
+    STALE_MARKER,
+    STORE,
+    registry_snapshot,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+  key TEXT PRIMARY KEY,
+  data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+  run TEXT PRIMARY KEY,
+  kind TEXT NOT NULL,
+  started REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS registry (
+  id TEXT PRIMARY KEY,
+  repo TEXT NOT NULL,
+  downloads REAL NOT NULL,
+  data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS registry_downloads ON registry (downloads);
+CREATE TABLE IF NOT EXISTS lock (
+  id TEXT PRIMARY KEY,
+  status TEXT,
+  etag TEXT,
+  ref TEXT,
+  data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lock_status ON lock (status);
+CREATE TABLE IF NOT EXISTS fetches (
+  run TEXT NOT NULL,
+  id TEXT NOT NULL,
+  status TEXT NOT NULL,
+  detail TEXT NOT NULL,
+  etag TEXT,
+  ref TEXT,
+  seconds REAL NOT NULL,
+  PRIMARY KEY (run, id)
+);
+CREATE INDEX IF NOT EXISTS fetches_id ON fetches (id);
+CREATE TABLE IF NOT EXISTS rows (
+  run TEXT NOT NULL,
+  pack TEXT NOT NULL,
+  name TEXT NOT NULL,
+  incomplete INTEGER NOT NULL,
+  loaded_ok INTEGER NOT NULL,
+  entries INTEGER NOT NULL,
+  entries_ok INTEGER NOT NULL,
+  hook_errors INTEGER NOT NULL,
+  bad_ops INTEGER NOT NULL,
+  data TEXT NOT NULL,
+  PRIMARY KEY (run, pack)
+);
+CREATE INDEX IF NOT EXISTS rows_pack ON rows (pack);
+CREATE TABLE IF NOT EXISTS metrics (
+  run TEXT PRIMARY KEY,
+  recorded REAL NOT NULL,
+  verdict TEXT NOT NULL,
+  packs INTEGER,
+  any_pct REAL,
+  entry_pct REAL,
+  reg_pct REAL,
+  custom_pct REAL,
+  hook_free_pct REAL,
+  complete_pct REAL,
+  worst_op_pct REAL,
+  data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS metrics_recorded ON metrics (recorded);
+"""
+
+# Verdict.metrics keys with a column of their own, for trend queries that
+# never parse the stored JSON.
+METRIC_COLUMNS = {
+    'packs': 'packs',
+    'anyPct': 'any_pct',
+    'entryPct': 'entry_pct',
+    'regPct': 'reg_pct',
+    'customPct': 'custom_pct',
+    'hookFreePct': 'hook_free_pct',
+    'completePct': 'complete_pct',
+    'worstOpPct': 'worst_op_pct',
+}
+# Per-pack tables in Verdict.metrics. The history leaves them out: each is
+# hundreds of kilobytes a run, and the newest run's ride in its metrics.json.
+PER_PACK_KEYS = ('sigHashes', 'opSigs', 'packMs')
+
+READY_KEY = 'corpus.ready'
+STALE_KEY = 'registry.stale'
+
+
+def default_run() -> str:
+    """GITHUB_RUN_ID in CI; a sortable local timestamp otherwise."""
+    return os.environ.get('GITHUB_RUN_ID') or time.strftime('local-%Y%m%dT%H%M%S')
+
+
+def row_counters(row: dict) -> tuple[int, int, int, int, int, int]:
+    """(incomplete, loadedOk, entries, clean entries, hook errors, bad ops).
+
+    The same reading summarize_matrix.evaluate() gives a row, flattened into
+    columns so a regression query never has to parse the row JSON.
+    """
+    load = row.get('load') if isinstance(row.get('load'), dict) else {}
+    ops = row.get('ops') if isinstance(row.get('ops'), dict) else {}
+    bad = 0
+    for info in ops.values():
+        if not isinstance(info, dict):
+            bad += 1
+        elif (info.get('err') and info.get('dispatching', True)) or info.get(
+            'desync'
+        ):
+            bad += 1
+    loaded = row.get('loadedOk')
+    return (
+        1 if row.get('incomplete') else 0,
+        loaded if isinstance(loaded, int) else 0,
+        len(load),
+        sum(1 for v in load.values() if v == 'OK'),
+        len(row.get('hookErrors') or []),
+        bad,
+    )
+
+
+def _lock_values(pack_id: str, entry: dict) -> tuple:
+    return (
+        pack_id,
+        entry.get('status'),
+        entry.get('etag'),
+        entry.get('ref'),
+        json.dumps(entry, sort_keys=True),
+    )
+
+
+class CensusStore:
+    def __init__(self, path: str = STORE) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> CensusStore:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    # ---- writers ---------------------------------------------------------
+
+    def begin_run(self, run: str, kind: str) -> None:
+        with self.db:
+            self.db.execute(
+                'INSERT OR IGNORE INTO runs VALUES (?, ?, ?)',
+                (run, kind, time.time()),
+            )
+
+    def replace_registry(self, entries: list[dict]) -> None:
+        """The snapshot is replaced whole, exactly as registry.json is."""
+        with self.db:
+            self.db.execute('DELETE FROM registry')
+            self.db.executemany(
+                'INSERT INTO registry VALUES (?, ?, ?, ?)',
+                (
+                    (
+                        e['id'],
+                        e.get('repo') or '',
+                        e.get('downloads') or 0,
+                        json.dumps(e, sort_keys=True),
+                    )
+                    for e in entries
+                ),
+            )
+
+    def replace_lock(self, packs: dict[str, dict]) -> None:
+        with self.db:
+            self.db.execute('DELETE FROM lock')
+            self.db.executemany(
+                'INSERT INTO lock VALUES (?, ?, ?, ?, ?)',
+                (_lock_values(k, v) for k, v in packs.items()),
+            )
+
+    def record_fetch(
+        self,
+        run: str,
+        pack_id: str,
+        status: str,
+        detail: str,
+        etag: str | None,
+        ref: str,
+        seconds: float,
+        lock_entry: dict | None = None,
+    ) -> None:
+        """One fetch result and, with it, that pack's new lock entry.
+
+        Both land in one transaction, so the telemetry and the identity
+        record can never disagree about a pack.
+        """
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO fetches VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (run, pack_id, status, detail, etag, ref, seconds),
+            )
+            if lock_entry is not None:
+                self.db.execute(
+                    'INSERT OR REPLACE INTO lock VALUES (?, ?, ?, ?, ?)',
+                    _lock_values(pack_id, lock_entry),
+                )
+
+    def put_meta(self, key: str, value: object | None) -> None:
+        with self.db:
+            if value is None:
+                self.db.execute('DELETE FROM meta WHERE key = ?', (key,))
+            else:
+                self.db.execute(
+                    'INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                    (key, json.dumps(value, sort_keys=True)),
+                )
+
+    def upsert_row(self, run: str, name: str, text: str) -> bool:
+        """Store one row file's exact text; False if it is not a row."""
+        try:
+            row = json.loads(text)
+        except ValueError:
+            return False
+        return self.upsert_parsed_row(run, name, row, text)
+
+    def upsert_parsed_row(self, run: str, name: str, row: object, text: str) -> bool:
+        """upsert_row() for a row already parsed from text."""
+        if not isinstance(row, dict) or not isinstance(row.get('pack'), str):
+            return False
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO rows VALUES'
+                ' (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (run, row['pack'], name, *row_counters(row), text),
+            )
+        return True
+
+    def record_metrics(
+        self, metrics: dict, run: str = '', recorded: float | None = None
+    ) -> bool:
+        """Append one run's Verdict.metrics; False if that run is already in.
+
+        Append-only: a re-run of a recorded run keeps its first metrics, as
+        the baseline cache would have. PER_PACK_KEYS are not kept.
+        """
+        kept = {k: v for k, v in metrics.items() if k not in PER_PACK_KEYS}
+        values = [
+            metrics.get(key) if isinstance(metrics.get(key), (int, float)) else None
+            for key in METRIC_COLUMNS
+        ]
+        with self.db:
+            cur = self.db.execute(
+                'INSERT OR IGNORE INTO metrics VALUES'
+                ' (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    run or str(metrics.get('runId') or '') or default_run(),
+                    time.time() if recorded is None else recorded,
+                    str(metrics.get('verdict') or ''),
+                    *values,
+                    json.dumps(kept, sort_keys=True),
+                ),
+            )
+        return cur.rowcount == 1
+
+    # ---- readers ---------------------------------------------------------
+
+    def lock(self) -> dict[str, dict]:
+        return {
+            pack_id: json.loads(data)
+            for pack_id, data in self.db.execute(
+                'SELECT id, data FROM lock ORDER BY id'
+            )
+        }
+
+    def meta(self, key: str) -> object | None:
+        found = self.db.execute(
+            'SELECT data FROM meta WHERE key = ?', (key,)
+        ).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def runs(self, kind: str) -> list[str]:
+        return [
+            run
+            for (run,) in self.db.execute(
+                'SELECT run FROM runs WHERE kind = ? ORDER BY started, run',
+                (kind,),
+            )
+        ]
+
+    def run_metrics(self, run: str) -> dict | None:
+        found = self.db.execute(
+            'SELECT data FROM metrics WHERE run = ?', (run,)
+        ).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def recent_metrics(self, limit: int, before: float | None = None) -> list[dict]:
+        """The newest limit passing runs' metrics, newest first."""
+        return [
+            json.loads(data)
+            for (data,) in self.db.execute(
+                "SELECT data FROM metrics WHERE verdict = 'PASS' AND recorded < ?"
+                ' ORDER BY recorded DESC, run DESC LIMIT ?',
+                (float('inf') if before is None else before, limit),
+            )
+        ]
+
+    def trend(
+        self, key: str, since: float = 0.0, until: float | None = None
+    ) -> list[tuple[str, float, float | None]]:
+        """(run, recorded, value) of one metric over a time range, oldest
+        first; key is a METRIC_COLUMNS key."""
+        return list(
+            self.db.execute(
+                f'SELECT run, recorded, {METRIC_COLUMNS[key]} FROM metrics'
+                ' WHERE recorded >= ? AND recorded < ? ORDER BY recorded, run',
+                (since, float('inf') if until is None else until),
+            )
+        )
+
+    def regressed(self, run: str, since: str) -> list[tuple]:
+        """Packs whose row got worse between two matrix runs, by downloads.
+
+        Worse means any of: the row stopped completing, fewer entry files
+        load clean, more contained hook errors, or more unclean operations.
+        """
+        return list(
+            self.db.execute(
+                """
+                SELECT now.pack, COALESCE(reg.downloads, 0),
+                       was.entries_ok, now.entries_ok,
+                       was.hook_errors, now.hook_errors,
+                       was.bad_ops, now.bad_ops, now.incomplete
+                FROM rows AS now
+                JOIN rows AS was ON was.pack = now.pack AND was.run = ?
+                LEFT JOIN registry AS reg ON reg.id = now.pack
+                WHERE now.run = ?
+                  AND (now.incomplete > was.incomplete
+                       OR now.entries_ok < was.entries_ok
+                       OR now.hook_errors > was.hook_errors
+                       OR now.bad_ops > was.bad_ops)
+                ORDER BY COALESCE(reg.downloads, 0) DESC, now.pack
+                """,
+                (since, run),
+            )
+        )
+
+    # ---- exporters -------------------------------------------------------
+    # Each mirrors the writer of its artifact exactly: same key order, same
+    # indent, same separators. test_census_store.py holds them to that.
+
+    def export_registry(self, path: str) -> None:
+        out = [
+            json.loads(data)
+            for (data,) in self.db.execute(
+                'SELECT data FROM registry ORDER BY id'
+            )
+        ]
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(out, fh, indent=0, sort_keys=True)
+
+    def export_lock(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump({'packs': self.lock()}, fh, indent=1, sort_keys=True)
+
+    def export_markers(self, ready_path: str, stale_path: str) -> None:
+        ready = self.meta(READY_KEY)
+        if ready is not None:
+            with open(ready_path, 'w', encoding='utf-8') as fh:
+                json.dump(ready, fh, indent=1, sort_keys=True)
+        stale = self.meta(STALE_KEY)
+        if stale is not None:
+            with open(stale_path, 'w', encoding='utf-8') as fh:
+                json.dump(stale, fh)
+
+    def export_rows(self, run: str, out_dir: str) -> int:
+        os.makedirs(out_dir, exist_ok=True)
+        n = 0
+        for name, data in self.db.execute(
+            'SELECT name, data FROM rows WHERE run = ? ORDER BY name', (run,)
+        ):
+            with open(os.path.join(out_dir, name), 'w', encoding='utf-8') as fh:
+                fh.write(data)
+            n += 1
+        return n
+
+
+def _read(path: str) -> object | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def import_json(store: CensusStore) -> None:
+    """Mirror the JSON artifacts under CENSUS_ROOT into the store.
+
+    Markers are mirrored by presence as well as content: an absent stale
+    marker clears the stored one, as refresh_registry.py removes the file.
+    """
+    snapshot = _read(registry_snapshot())
+    if isinstance(snapshot, list):
+        store.replace_registry(snapshot)
+    lock = _read(LOCKFILE)
+    if isinstance(lock, dict):
+        store.replace_lock(lock.get('packs') or {})
+    store.put_meta(READY_KEY, _read(READY_MARKER))
+    store.put_meta(STALE_KEY, _read(STALE_MARKER))
+
+
+def import_rows(store: CensusStore, run: str, out_dir: str) -> tuple[int, int]:
+    """(stored, skipped) for out_dir's rows, loose or packed.
+
+    Each row is stored as pack_rows() packs it, compact JSON, so a run reads
+    back the same whichever way its rows were written.
+    """
+    store.begin_run(run, 'matrix')
+    stored = skipped = 0
+    unreadable: list[str] = []
+    for name, row in matrix_rows.read_rows(out_dir, unreadable):
+        text = json.dumps(row, separators=(',', ':'))
+        if store.upsert_parsed_row(run, name, row, text):
+            stored += 1
+        else:
+            skipped += 1
+    return stored, skipped + len(unreadable)
+
+
+def _day(text: str) -> float:
+    """A YYYY-MM-DD as epoch seconds at its UTC midnight."""
+    return float(calendar.timegm(time.strptime(text, '%Y-%m-%d')))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--db', default=STORE, help='store path')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    sub.add_parser('import', help='load the JSON artifacts under CENSUS_ROOT')
+    rows = sub.add_parser('rows', help='load a directory of matrix rows')
+    rows.add_argument('out_dir')
+    rows.add_argument('--run', default='')
+    export = sub.add_parser('export', help='write the JSON artifacts back out')
+    export.add_argument('dest')
+    export.add_argument('--run', default='', help='also export this run\'s rows')
+    reg = sub.add_parser('regressed', help='packs worse than the previous run')
+    reg.add_argument('--run', default='', help='default: the latest matrix run')
+    reg.add_argument('--since', default='', help='default: the run before it')
+    reg.add_argument('--limit', type=int, default=50)
+    met = sub.add_parser('metrics', help='append a run\'s metrics.json to the history')
+    met.add_argument('path')
+    met.add_argument('--run', default='', help='default: the metrics\' runId')
+    tr = sub.add_parser('trend', help='one metric over the recorded runs')
+    tr.add_argument('--metric', default='entryPct', choices=sorted(METRIC_COLUMNS))
+    tr.add_argument('--since', type=_day, default=0.0, help='YYYY-MM-DD, UTC')
+    tr.add_argument(
+        '--until', type=_day, default=None, help='YYYY-MM-DD, UTC, exclusive'
+    )
+    args = ap.parse_args()
+
+    with CensusStore(args.db) as store:
+        if args.cmd == 'import':
+            import_json(store)
+            print(f'imported census state -> {args.db}', file=sys.stderr)
+            return 0
+        if args.cmd == 'rows':
+            run = args.run or default_run()
+            stored, skipped = import_rows(store, run, args.out_dir)
+            print(
+                f'{stored} rows stored as run {run}'
+                + (f', {skipped} unreadable' if skipped else ''),
+                file=sys.stderr,
+            )
+            return 0 if stored else 2
+        if args.cmd == 'export':
+            os.makedirs(os.path.join(args.dest, 'data'), exist_ok=True)
+            store.export_registry(os.path.join(args.dest, 'data', 'registry.json'))
+            store.export_lock(os.path.join(args.dest, 'corpus.lock.json'))
+            store.export_markers(
+                os.path.join(args.dest, 'corpus.ready.json'),
+                os.path.join(args.dest, 'registry-stale.json'),
+            )
+            if args.run:
+                store.export_rows(args.run, os.path.join(args.dest, 'rows'))
+            return 0
+
+        if args.cmd == 'metrics':
+            metrics = _read(args.path) if args.path else None
+            if not isinstance(metrics, dict):
+                print(f'no metrics in {args.path}', file=sys.stderr)
+                return 2
+            added = store.record_metrics(metrics, args.run)
+            print(
+                f'metrics {"recorded" if added else "already recorded"} -> {args.db}',
+                file=sys.stderr,
+            )
+            return 0
+        if args.cmd == 'trend':
+            found = store.trend(args.metric, args.since, args.until)
+            for run, recorded, value in found:
+                when = time.strftime('%Y-%m-%d %H:%M', time.gmtime(recorded))
+                print(f'  {run:14s} {when}  {"-" if value is None else value}')
+            print(f'{len(found)} runs with {args.metric}', file=sys.stderr)
+            return 0
+
+        runs = store.runs('matrix')
+        run = args.run or (runs[-1] if runs else '')
+        earlier = runs[: runs.index(run)] if run in runs else []
+        since = args.since or (earlier[-1] if earlier else '')
+        if not run or not since:
+            print('need two matrix runs in the store to compare', file=sys.stderr)
+            return 2
+        found = store.regressed(run, since)
+        print(f'{len(found)} packs regressed from run {since} to run {run}')
+        for pack, downloads, e0, e1, h0, h1, b0, b1, stub in found[: args.limit]:
+            print(
+                f'  {pack:40s} {int(downloads):9d} downloads'
+                f'  entries {e0}->{e1}  hooks {h0}->{h1}  ops {b0}->{b1}'
+                + ('  INCOMPLETE' if stub else '')
+            )
+        return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -45,6 +45,7 @@ from typing import NamedTuple
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import pins  # noqa: E402
+from census_store import CensusStore, default_run, import_json  # noqa: E402
 from paths import CORPUS, LOCKFILE, READY_MARKER, registry_snapshot  # noqa: E402
 
 # ComfyUI serves plain browser ES modules out of a pack's web directory, so
@@ -233,6 +234,31 @@ def write_ready_marker(
         )
 
 
+def lock_entry(prev: dict | None, result: Fetched) -> dict:
+    """A pack's lock entry after this run's fetch result.
+
+    A cached or drifted result carries no new status; the recorded one
+    stands, so the lockfile keeps describing the bytes actually on disk.
+    """
+    entry = dict(prev or {})
+    if result.etag:
+        entry['etag'] = result.etag
+    if result.ref:
+        entry['ref'] = result.ref
+    if result.status not in ('cached', 'drifted'):
+        entry['status'] = result.status
+        if result.detail:
+            entry['detail'] = result.detail
+        else:
+            entry.pop('detail', None)
+    return entry
+
+
+def write_lockfile(lock: dict) -> None:
+    with open(LOCKFILE, 'w', encoding='utf-8') as fh:
+        json.dump({'packs': lock}, fh, indent=1, sort_keys=True)
+
+
 def _archive_root(extracted: str) -> str:
     """The archive's single top-level directory.
 
@@ -467,23 +493,7 @@ def fetch_one(
     return Fetched(pack_id, status, etag, '', ref)
 
 
-def main() -> int:
-    ap = argparse.ArgumentParser(description=__doc__)
-    ap.add_argument('--frozen', action='store_true', help='fail on corpus drift')
-    ap.add_argument(
-        '--revalidate',
-        action='store_true',
-        help='HEAD-check cached packs against lockfile ETags; refetch drifted ones',
-    )
-    ap.add_argument('--limit', type=int, default=0, help='only N packs (smoke test)')
-    ap.add_argument('--workers', type=int, default=int(os.environ.get('WORKERS', 16)))
-    ap.add_argument(
-        '--write-pins',
-        action='store_true',
-        help='resolve every pack to a commit and rewrite corpus.pins.json',
-    )
-    args = ap.parse_args()
-
+def fetch(args: argparse.Namespace, store: CensusStore | None = None) -> int:
     snapshot = registry_snapshot()
     if not os.path.exists(snapshot):
         print(f'missing registry snapshot: {snapshot}', file=sys.stderr)
@@ -519,36 +529,44 @@ def main() -> int:
     os.makedirs(CORPUS, exist_ok=True)
     print(f'{len(targets)} packs -> {CORPUS}', file=sys.stderr, flush=True)
 
+    run = default_run()
+    if store is not None:
+        store.begin_run(run, 'fetch')
+
     t0 = time.time()
+    elapsed: dict[str, float] = {}
+
     # One pack's unexpected exception must degrade to that pack's 'failed'
     # (feeding the mass-failure gate), never kill the other 5,000 fetches.
     def fetch_guarded(entry: dict) -> Fetched:
+        started = time.monotonic()
         try:
             return fetch_one(entry, lock, args.frozen, args.revalidate)
         except Exception as exc:  # noqa: BLE001
             pack_id = str(entry.get('id') or '?')
             print(f'  {pack_id}: {exc!r}', file=sys.stderr)
             return Fetched(pack_id, 'failed', None, type(exc).__name__)
+        finally:
+            elapsed[str(entry.get('id'))] = time.monotonic() - started
 
+    results: list[Fetched] = []
     with ThreadPoolExecutor(max_workers=args.workers) as ex:
-        results = list(ex.map(fetch_guarded, targets))
+        # map() yields in submission order as each fetch completes, so the
+        # store commits every pack while the rest are still downloading.
+        for r in ex.map(fetch_guarded, targets):
+            results.append(r)
+            if store is not None:
+                store.record_fetch(
+                    run, r.pack_id, r.status, r.detail, r.etag, r.ref,
+                    elapsed.get(r.pack_id, 0.0),
+                    lock_entry(lock.get(r.pack_id), r),
+                )
 
     counts = Counter(r.status for r in results)
     for r in results:
-        entry = lock.setdefault(r.pack_id, {})
-        if r.etag:
-            entry['etag'] = r.etag
-        if r.ref:
-            entry['ref'] = r.ref
-        if r.status not in ('cached', 'drifted'):
-            entry['status'] = r.status
-            if r.detail:
-                entry['detail'] = r.detail
-            else:
-                entry.pop('detail', None)
+        lock[r.pack_id] = lock_entry(lock.get(r.pack_id), r)
 
-    with open(LOCKFILE, 'w', encoding='utf-8') as fh:
-        json.dump({'packs': lock}, fh, indent=1, sort_keys=True)
+    write_lockfile(lock)
 
     print(f'done in {time.time() - t0:.0f}s', file=sys.stderr)
     for status, n in counts.most_common():
@@ -643,5 +661,40 @@ def main() -> int:
     return 0
 
 
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('--frozen', action='store_true', help='fail on corpus drift')
+    ap.add_argument(
+        '--revalidate',
+        action='store_true',
+        help='HEAD-check cached packs against lockfile ETags; refetch drifted ones',
+    )
+    ap.add_argument('--limit', type=int, default=0, help='only N packs (smoke test)')
+    ap.add_argument('--workers', type=int, default=int(os.environ.get('WORKERS', 16)))
+    ap.add_argument(
+        '--write-pins',
+        action='store_true',
+        help='resolve every pack to a commit and rewrite corpus.pins.json',
+    )
+    ap.add_argument(
+        '--store',
+        action='store_true',
+        help='also record per-pack results in the census SQLite store',
+    )
+    args = ap.parse_args()
+    if not args.store:
+        return fetch(args)
+
+    with CensusStore() as store:
+        import_json(store)
+        try:
+            return fetch(args, store)
+        finally:
+            # The lockfile and ready marker are written, or removed, on
+            # several exit paths in fetch(); mirroring the files once on the
+            # way out covers every one of them.
+            import_json(store)
+
+
 if __name__ == '__main__':
     raise SystemExit(main())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""Row storage for the ecosystem matrix: one JSONL file per shard, indexed.
+
+The runner writes one <safe>.json row per pack, and every consumer after it -
+artifact upload, artifact download, the verdict, the detection proof - pays
+per file for thousands of tiny ones. Once vitest is done, a shard packs its
+rows into
+
+    _rows-<name>.jsonl        one row per line, appended in file-name order
+    _rows-<name>.index.json   {"version": 1, "rows": {"<safe>.json": [offset,
+                              length]}, "unreadable": ["<safe>.json", ...]}
+
+and removes the row files. The file is append-only: packing again appends
+and the index points at each row's newest line. A row file that does not
+parse as an object is named in the index's unreadable list rather than
+dropped, so the verdict still counts it against the population.
+
+Readers take either layout, and both at once: row_names() and read_rows()
+see a packed row under the file name it was packed from, so a verdict over
+packed rows is the verdict over the directory they came from. read_row()
+fetches any one row with a single seek. A loose row file beside an index
+that also lists it wins: it was written after the packing.
+
+Loose row files are read through a small thread pool (READ_WORKERS), a
+bounded window ahead of the consumer, so the verdict still holds one row at
+a time; a file that cannot be opened or parsed is one unreadable row, never
+an exception. Indexes are memoised by (inode, mtime, size): row_names(),
+read_rows() and every read_row() share one parse per index until it is
+rewritten. scan_run() reads the side files beside the rows - shard
+manifests, plans, aggregates, samples, stop markers - into one RunFiles.
+
+    python3 scripts/registry-census/matrix_rows.py pack matrix-rows --name shard-1
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+INDEX_VERSION = 1
+PREFIX = '_rows-'
+INDEX_SUFFIX = '.index.json'
+READ_WORKERS = 8
+# Side files by name prefix: the RunFiles field each is read into, and what
+# an unreadable one is reported as.
+SIDE_FILES = {
+    '_manifest': ('manifests', 'shard manifest'),
+    '_plan': ('plans', 'shard plan'),
+    '_aggregate': ('aggregates', 'shard aggregate'),
+    '_sample': ('samples', 'sample'),
+}
+
+_index_memo: dict[str, tuple[tuple[int, int, int], dict | None]] = {}
+
+
+@dataclass
+class RunFiles:
+    """A row directory's side files, each parsed (None when unreadable) and
+    filed by kind. Manifests that parse to anything but an object are left
+    out; stopped names the _stopped-* markers, which are not read."""
+
+    manifests: dict[str, dict] = field(default_factory=dict)
+    plans: dict[str, object] = field(default_factory=dict)
+    aggregates: dict[str, object] = field(default_factory=dict)
+    samples: dict[str, object] = field(default_factory=dict)
+    stopped: list[str] = field(default_factory=list)
+
+
+def is_row_file(name: str) -> bool:
+    return name.endswith('.json') and not name.startswith('_')
+
+
+def is_index(name: str) -> bool:
+    return name.startswith(PREFIX) and name.endswith(INDEX_SUFFIX)
+
+
+def jsonl_for(index_path: str) -> str:
+    return index_path[: -len(INDEX_SUFFIX)] + '.jsonl'
+
+
+def _read_index(path: str) -> dict | None:
+    try:
+        with open(path, encoding='utf-8') as fh:
+            index = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(index, dict)
+        or index.get('version') != INDEX_VERSION
+        or not isinstance(index.get('rows'), dict)
+        or not isinstance(index.get('unreadable'), list)
+    ):
+        return None
+    return index
+
+
+def load_index(path: str) -> dict | None:
+    """A row index, or None when it is unreadable or not one.
+
+    Shared between callers until the file changes: treat it as read-only.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    memo = _index_memo.get(path)
+    if memo is not None and memo[0] == stamp:
+        return memo[1]
+    index = _read_index(path)
+    _index_memo[path] = (stamp, index)
+    return index
+
+
+def _locations(out_dir: str) -> tuple[dict[str, tuple], list[str]]:
+    """Row file name -> (jsonl path, offset, length) or (row file path,),
+    and the indexes that could not be read."""
+    found: dict[str, tuple] = {}
+    broken = []
+    names = sorted(os.listdir(out_dir)) if os.path.isdir(out_dir) else []
+    for name in names:
+        if not is_index(name):
+            continue
+        path = os.path.join(out_dir, name)
+        index = load_index(path)
+        if index is None:
+            broken.append(name)
+            continue
+        jsonl = jsonl_for(path)
+        for row, (offset, length) in index['rows'].items():
+            found[row] = (jsonl, offset, length)
+        for row in index['unreadable']:
+            found[row] = (jsonl, -1, 0)
+    for name in names:
+        if is_row_file(name):
+            found[name] = (os.path.join(out_dir, name),)
+    return found, broken
+
+
+def row_names(out_dir: str) -> list[str]:
+    """Every row's file name, packed or not, sorted."""
+    return sorted(_locations(out_dir)[0])
+
+
+def _parse(data: bytes) -> dict | None:
+    try:
+        row = json.loads(data)
+    except (ValueError, RecursionError):
+        return None
+    return row if isinstance(row, dict) else None
+
+
+def _read_packed(jsonl: str, entries: list[tuple[str, int, int]]):
+    """(name, row or None) over one JSONL file, in name order.
+
+    Packed in name order, so this reads the file front to back.
+    """
+    try:
+        fh = open(jsonl, 'rb')
+    except OSError:
+        for name, _offset, _length in entries:
+            yield name, None
+        return
+    with fh:
+        for name, offset, length in entries:
+            if offset < 0:
+                yield name, None
+                continue
+            fh.seek(offset)
+            yield name, _parse(fh.read(length))
+
+
+def _load(path: str) -> bytes | None:
+    try:
+        with open(path, 'rb') as fh:
+            return fh.read()
+    except OSError:
+        return None
+
+
+def _read_loose(entries: list[tuple[str, str]], workers: int = 1):
+    """(name, row or None) over row files, in the order given.
+
+    With workers > 1, up to four files per worker are read ahead. Parsing
+    holds the GIL whichever thread does it, so the pool only reads and the
+    rows are parsed here, as they are consumed.
+    """
+    if workers <= 1 or len(entries) < 2:
+        for name, path in entries:
+            data = _load(path)
+            yield name, None if data is None else _parse(data)
+        return
+    with ThreadPoolExecutor(workers) as pool:
+        pending = iter(entries)
+        window = deque(
+            (name, pool.submit(_load, path))
+            for name, path in itertools.islice(pending, 4 * workers)
+        )
+        while window:
+            name, future = window.popleft()
+            for ahead, path in itertools.islice(pending, 1):
+                window.append((ahead, pool.submit(_load, path)))
+            data = future.result()
+            yield name, None if data is None else _parse(data)
+
+
+def read_rows(
+    out_dir: str, unreadable: list[str], workers: int = READ_WORKERS
+) -> Iterator[tuple[str, dict]]:
+    """(file name, row) for every readable row in file-name order, one row in
+    memory at a time; the names of the rest are appended to unreadable."""
+    found, broken = _locations(out_dir)
+    for name in broken:
+        # Its rows cannot even be named: the index itself stands in for them.
+        print(f'unreadable row index: {os.path.join(out_dir, name)}', file=sys.stderr)
+        unreadable.append(name)
+    packed: dict[str, list] = {}
+    loose = []
+    for name in sorted(found):
+        where = found[name]
+        if len(where) == 1:
+            loose.append((name, where[0]))
+        else:
+            packed.setdefault(where[0], []).append((name, *where[1:]))
+    sources = [_read_packed(jsonl, entries) for jsonl, entries in sorted(packed.items())]
+    sources.append(_read_loose(loose, workers))
+    for name, row in heapq.merge(*sources, key=lambda item: item[0]):
+        if row is None:
+            print(f'unreadable row: {os.path.join(out_dir, name)}', file=sys.stderr)
+            unreadable.append(name)
+            continue
+        yield name, row
+
+
+def read_row(out_dir: str, name: str) -> dict | None:
+    """One row by file name, with one seek into its shard's JSONL file."""
+    where = _locations(out_dir)[0].get(name)
+    if where is None:
+        return None
+    source = _read_loose([(name, where[0])]) if len(where) == 1 else _read_packed(
+        where[0], [(name, *where[1:])]
+    )
+    return next(source)[1]
+
+
+_UNREADABLE = object()
+
+
+def _read_json(path: str) -> object:
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError, RecursionError):
+        return _UNREADABLE
+
+
+def scan_run(out_dir: str, skip: tuple[str, ...] = ()) -> RunFiles:
+    """The side files in out_dir, read in parallel; prefixes in skip are
+    not read at all."""
+    names = sorted(os.listdir(out_dir)) if os.path.isdir(out_dir) else []
+    files = RunFiles(
+        stopped=[n for n in names if n.startswith('_stopped') and n.endswith('.json')]
+    )
+    wanted = [
+        (name, prefix)
+        for name in names
+        if name.endswith('.json')
+        for prefix in SIDE_FILES
+        if name.startswith(prefix) and prefix not in skip
+    ]
+    with ThreadPoolExecutor(READ_WORKERS) as pool:
+        docs = list(pool.map(
+            lambda item: _read_json(os.path.join(out_dir, item[0])), wanted
+        ))
+    for (name, prefix), doc in zip(wanted, docs):
+        kind, label = SIDE_FILES[prefix]
+        if doc is _UNREADABLE:
+            print(f'unreadable {label}: {os.path.join(out_dir, name)}', file=sys.stderr)
+            doc = None
+        if kind == 'manifests' and not isinstance(doc, dict):
+            if doc is not None:
+                print(f'malformed shard manifest: {name}', file=sys.stderr)
+            continue
+        getattr(files, kind)[name] = doc
+    return files
+
+
+def pack_rows(out_dir: str, name: str) -> tuple[int, int]:
+    """Append out_dir's row files to _rows-<name>.jsonl, index them and
+    remove them; returns (rows packed, rows unreadable)."""
+    index_path = os.path.join(out_dir, f'{PREFIX}{name}{INDEX_SUFFIX}')
+    jsonl = jsonl_for(index_path)
+    index = _read_index(index_path) or {
+        'version': INDEX_VERSION, 'rows': {}, 'unreadable': []
+    }
+    files = sorted(n for n in os.listdir(out_dir) if is_row_file(n))
+    unreadable = set(index['unreadable'])
+    with open(jsonl, 'ab') as fh:
+        for row_name in files:
+            with open(os.path.join(out_dir, row_name), 'rb') as rf:
+                row = _parse(rf.read())
+            if row is None:
+                unreadable.add(row_name)
+                index['rows'].pop(row_name, None)
+                continue
+            unreadable.discard(row_name)
+            line = json.dumps(row, separators=(',', ':')).encode() + b'\n'
+            index['rows'][row_name] = [fh.tell(), len(line) - 1]
+            fh.write(line)
+    index['rows'] = dict(sorted(index['rows'].items()))
+    index['unreadable'] = sorted(unreadable)
+    # The index last: a reader never finds an index ahead of its rows.
+    tmp = index_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(index, fh, separators=(',', ':'))
+    os.replace(tmp, index_path)
+    for row_name in files:
+        os.remove(os.path.join(out_dir, row_name))
+    return len(files) - len(unreadable & set(files)), len(unreadable & set(files))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    sub = ap.add_subparsers(dest='command', required=True)
+    pk = sub.add_parser('pack', help='pack a directory of row files into JSONL')
+    pk.add_argument('out_dir')
+    pk.add_argument('--name', required=True, help='file stem, e.g. shard-1')
+    args = ap.parse_args()
+    if not os.path.isdir(args.out_dir):
+        sys.exit(f'no row directory: {args.out_dir}')
+    packed, unreadable = pack_rows(args.out_dir, args.name)
+    print(
+        f'packed {packed} rows ({unreadable} unreadable) into'
+        f' {PREFIX}{args.name}.jsonl',
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
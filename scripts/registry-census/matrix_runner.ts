@@ -147,7 +147,11 @@ async function installGlobals() {
       const st = new Error().stack ?? ''
       const frame = st
         .split('\n')
-        .find((l) => l.includes('__ecs_matrix__/packs'))
+        .find(
+          (l) =>
+            l.includes('__ecs_matrix__/packs') ||
+            (!!process.env.MATRIX_CORPUS && l.includes(process.env.MATRIX_CORPUS))
+        )
       DEPR.push(m.slice(0, 30) + (frame ? ' @pack' : ' @core'))
     }
   ]
@@ -229,8 +233,9 @@ export async function runPack(
   safe: string
 ) {
   // Write-ahead stub: a pack that hangs past the test timeout or kills the
-  // worker leaves this row behind, so the shard's rows==specs check reads
+  // worker leaves this row behind, so the shard's rows==packs check reads
   // it as pack noise (counted, reported) instead of a harness failure.
+  const started = performance.now()
   const dir = process.env.MATRIX_OUT ?? '/tmp/matrix'
   fs.mkdirSync(dir, { recursive: true })
   const rowPath = `${dir}/${safe}.json`
@@ -637,6 +642,8 @@ export async function runPack(
   row.ops = ops
   row.storeReadErrors = storeReadErrors
   row.hookErrors = [...new Set(hookErrors)].slice(0, 20)
+  // Wall time for the shard planner's cost model; telemetry, never gated.
+  row.elapsedMs = Math.round(performance.now() - started)
 
   fs.writeFileSync(rowPath, JSON.stringify(row))
 }
@@ -7,7 +7,9 @@
  *
  * build_matrix.py substitutes the four placeholder constants below and
  * repoints the runner import at the copy it makes; it aborts the build if a
- * placeholder is missing, duplicated, or left behind.
+ * placeholder is missing, duplicated, or left behind. With --batch-ms it
+ * repeats everything from `const PACK` on, each copy in its own block, to run
+ * several packs from one file: keep what follows it per-pack.
  */
 import { describe, it } from 'vitest'
 
@@ -10,6 +10,9 @@ unit and the whole tree stays gitignored:
       corpus.lock.json      per-pack tarball ETag + tree - the identity record
       corpus.ready.json     written only after the corpus meets its size floor
       registry-stale.json   present only when the snapshot is a fallback
+      census.sqlite         optional indexed mirror of all of the above
+                            (census_store.py; the JSON stays authoritative)
+      rewrite-cache.json.gz matrix build rewrite results (rewrite_cache.py)
       results/              scan outputs
 
 CENSUS_ROOT defaults to `.census` under the current working directory; the CI
@@ -29,6 +32,8 @@ CORPUS = os.path.join(CORPUS_ROOT, 'registry_js')
 LOCKFILE = os.path.join(ROOT, 'corpus.lock.json')
 READY_MARKER = os.path.join(ROOT, 'corpus.ready.json')
 STALE_MARKER = os.path.join(ROOT, 'registry-stale.json')
+STORE = os.path.join(ROOT, 'census.sqlite')
+REWRITE_CACHE = os.path.join(ROOT, 'rewrite-cache.json.gz')
 
 
 def registry_snapshot() -> str:
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Rewrite results shared across matrix builds, keyed by source content.
+
+Most of a build's CPU goes to two passes over every JS file: the import
+rewrite and the entry lexer (build_matrix.entry_sites()). Both are pure
+functions of the file's bytes and of the rules, and the corpus changes by a
+few packs per pin bump, so nearly every file a build scans was scanned, byte
+for byte, by the build before it - in another shard, another run, or another
+pack that ships the same file.
+
+The cache keeps each scanned file's edits and entry sites under the sha1 of
+its bytes, in one gzipped JSON file stamped with the digest of the rules
+that produced them (build_matrix.rewrite_digest()):
+
+    {"version": 1, "rules": "<digest>", "files": {"<sha1>": [edits, sites]}}
+
+edits are [start, end, replacement, label, rule] lists before any per-pack
+path substitution; sites is entry_sites()' list, or null for a file that
+never names the extension API. A cache stamped with other rules reads as
+empty, so a rule change can cost a cold build but never a wrong one. The
+digest covers the lexer's code only through build_matrix.LEXER_VERSION,
+which every change to entry detection must bump.
+
+The file is read-only while packs build; build_matrix.py writes it back
+once, whole, after they all have.
+"""
+
+from __future__ import annotations
+
+import functools
+import gzip
+import json
+import os
+
+CACHE_VERSION = 1
+
+
+@functools.lru_cache(maxsize=None)
+def load_cache(path: str, rules: str) -> dict[str, list]:
+    """The cached results for these rules; empty when there are none.
+
+    Never fatal: an unreadable or foreign cache only means a cold build.
+    Cached per process, as every pack a build worker stages consults it.
+    """
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as fh:
+            cache = json.load(fh)
+    except (OSError, EOFError, ValueError):
+        return {}
+    if (
+        not isinstance(cache, dict)
+        or cache.get('version') != CACHE_VERSION
+        or cache.get('rules') != rules
+        or not isinstance(cache.get('files'), dict)
+    ):
+        return {}
+    return cache['files']
+
+
+def write_cache(path: str, rules: str, files: dict[str, list]) -> int:
+    """Replace the cache at path with files; returns its size in bytes.
+
+    Sorted and without a gzip timestamp, so the same results write the same
+    bytes, and written aside then renamed, so a reader never sees half.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    doc = {'version': CACHE_VERSION, 'rules': rules, 'files': dict(sorted(files.items()))}
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as raw, gzip.GzipFile(
+        filename='', fileobj=raw, mode='wb', mtime=0
+    ) as fh:
+        fh.write(json.dumps(doc, separators=(',', ':')).encode())
+    os.replace(tmp, path)
+    load_cache.cache_clear()
+    return os.path.getsize(path)
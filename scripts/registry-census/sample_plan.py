@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Stratified sample of the ecosystem matrix, and its confidence intervals.
+
+A PR that breaks pack integration breaks it everywhere, and a few hundred
+packs show that as clearly as all of them. A sample is a plan for that
+few hundred, drawn so its verdict predicts the full population's:
+
+  strata     packs are stratified by entry-file count (ENTRY_BUCKETS), and
+             within each bucket the most-downloaded fifth (POPULAR) apart
+             from the rest. Each stratum gets its share of the sample, and
+             at least one pack.
+
+  coverage   every frontend module any pack imports (@/scripts/app,
+             @/extensions/core/..., as the build rewrites them) is imported
+             by at least one sampled pack, the rarest modules first. A
+             regression in a module the sample never loads cannot move it.
+             Those picks are not random, so they form a stratum of their own
+             (COVERED) that stands for itself alone.
+
+  drawing    within a stratum, every pack is equally likely: packs are drawn
+             in order of a u fixed per pack by the seed. Downloads only
+             choose the stratum, so a popular pack counts for no more than
+             its stratum's share even if popular packs fare differently.
+
+The sample is a pure function of the features (per pack: entry count,
+downloads, imported modules), the size and the seed. It carries the
+features of the whole population, so a full run can re-draw samples from
+its own rows and measure how often they would have got the verdict wrong
+(summarize_matrix.py's calibration).
+
+Each stratum is then a simple random sample of its packs, estimated on its
+own and combined with the others by their population shares. The interval
+is Wilson's, over the effective sample size of that weighting (wilson(),
+stratified()).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+
+SAMPLE_VERSION = 2
+# Upper bounds, inclusive, of the entry-count strata; the last is open.
+ENTRY_BUCKETS = (1, 3, 9)
+# Share of the packs with any downloads, most downloaded first, that are
+# stratified apart as popular.
+POPULAR = 0.2
+COVERED = 'covered'
+Z = 1.96  # two-sided 95%
+
+
+def bucket(entries: int) -> str:
+    lower = 1
+    for upper in ENTRY_BUCKETS:
+        if entries <= upper:
+            return str(lower) if lower == upper else f'{lower}-{upper}'
+        lower = upper + 1
+    return f'{lower}+'
+
+
+def draw_key(pack: str, seed: int) -> float:
+    """u in (0, 1), uniform and fixed per pack by the seed: the smaller,
+    the earlier the pack is drawn."""
+    digest = hashlib.sha1(f'{seed}:{pack}'.encode()).digest()
+    return (int.from_bytes(digest[:8], 'big') + 1) / (2**64 + 2)
+
+
+def popular(features: dict[str, list]) -> set[str]:
+    """The POPULAR share of the packs with any downloads, most first."""
+    ranked = sorted(
+        (p for p, (_entries, downloads, _modules) in features.items() if downloads > 0),
+        key=lambda p: (-features[p][1], p),
+    )
+    return set(ranked[: math.ceil(len(ranked) * POPULAR)])
+
+
+def sample_digest(packs: dict[str, str]) -> str:
+    return hashlib.sha1(json.dumps(packs, sort_keys=True).encode()).hexdigest()
+
+
+def make_sample(features: dict[str, list], size: int, seed: int = 0) -> dict:
+    """A sample of at least size packs (more only when coverage needs them).
+
+    features maps every JS-shipping pack to [entries, downloads, modules].
+    """
+    importers: dict[str, list[str]] = {}
+    for pack in sorted(features):
+        for module in features[pack][2]:
+            importers.setdefault(module, []).append(pack)
+    keys = {pack: draw_key(pack, seed) for pack in features}
+
+    def first(packs: list[str]) -> str:
+        return min(packs, key=lambda p: (keys[p], p))
+
+    certain: set[str] = set()
+    covered: set[str] = set()
+    for module in sorted(importers, key=lambda m: (len(importers[m]), m)):
+        if module not in covered:
+            pack = first(importers[module])
+            certain.add(pack)
+            covered.update(features[pack][2])
+
+    top = popular(features)
+    strata: dict[str, list[str]] = {}
+    for pack in sorted(set(features) - certain):
+        name = bucket(features[pack][0]) + (' popular' if pack in top else '')
+        strata.setdefault(name, []).append(pack)
+    chosen: set[str] = set()
+    for name in sorted(strata):
+        chosen.add(first(strata[name]))
+
+    total = len(features) - len(certain)
+    by_stratum = {
+        name: sorted(set(packs) - chosen, key=lambda p: (keys[p], p))
+        for name, packs in strata.items()
+    }
+    counts = {name: len(set(packs) & chosen) for name, packs in strata.items()}
+    while len(chosen) + len(certain) < min(size, len(features)):
+        # The stratum furthest below its proportional share draws next.
+        name = max(
+            (n for n in sorted(strata) if by_stratum[n]),
+            key=lambda n: len(strata[n]) / total * size - counts[n],
+        )
+        chosen.add(by_stratum[name].pop(0))
+        counts[name] += 1
+    if certain:
+        strata[COVERED] = sorted(certain)
+        counts[COVERED] = len(certain)
+
+    packs = dict(
+        sorted(
+            (pack, name)
+            for name, members in strata.items()
+            for pack in members
+            if pack in chosen or name == COVERED
+        )
+    )
+    return {
+        'version': SAMPLE_VERSION,
+        'size': size,
+        'seed': seed,
+        'digest': sample_digest(packs),
+        'strata': {
+            name: {
+                'population': len(strata[name]),
+                'entries': sum(features[p][0] for p in strata[name]),
+                'sampled': counts[name],
+            }
+            for name in sorted(strata)
+        },
+        'modules': {
+            module: [len(importers[module]), sum(p in packs for p in importers[module])]
+            for module in sorted(importers)
+        },
+        'packs': packs,
+        'features': {pack: features[pack] for pack in sorted(features)},
+    }
+
+
+def check_sample(sample: object) -> str:
+    """Why this is not an intact sample; '' when it is."""
+    if not isinstance(sample, dict) or sample.get('version') != SAMPLE_VERSION:
+        return f'not a version {SAMPLE_VERSION} sample'
+    if not isinstance(sample.get('packs'), dict) or not isinstance(
+        sample.get('strata'), dict
+    ):
+        return 'not a sample'
+    if sample.get('digest') != sample_digest(sample['packs']):
+        return 'sample digest does not match its packs'
+    return ''
+
+
+def wilson(p: float, n: float, z: float = Z) -> tuple[float, float]:
+    """Wilson score interval for a proportion p observed over n units."""
+    if n <= 0:
+        return 0.0, 1.0
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def stratified(parts: list[tuple[float, int, int]]) -> tuple[float, float, float]:
+    """(estimate, low, high) from per-stratum (population share, ok, units).
+
+    Strata with no units drop out and the rest are reweighted. The interval
+    is Wilson's over Kish's effective n for those weights, 1 / sum(W^2 / n):
+    the sample size that would give a simple random sample the same spread.
+    """
+    used = [(share, ok, units) for share, ok, units in parts if units and share]
+    weight = sum(share for share, _ok, _units in used)
+    if not weight:
+        return 0.0, 0.0, 1.0
+    estimate = sum(share / weight * ok / units for share, ok, units in used)
+    n_eff = 1 / sum((share / weight) ** 2 / units for share, _ok, units in used)
+    low, high = wilson(estimate, n_eff)
+    return estimate, low, high
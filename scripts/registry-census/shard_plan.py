@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Cost-balanced shard plan for the ecosystem matrix.
+
+Taking every N-th pack by sorted id ignores that one pack has sixty entry
+files and 2MB of JS while the next has one tiny file, and the verdict waits
+for the slowest shard. A plan predicts each pack's wall time and bin-packs
+the packs into N shards of near-equal predicted time: longest first, each
+onto the least-loaded shard, ties broken by pack id and shard number.
+
+A pack's predicted cost, in milliseconds, is its measured elapsedMs from
+the last green run when there is one, else
+
+    BASE_MS + ENTRY_MS * entry files + MB_MS * MB of JS
+
+scaled by measured / estimated over the packs that have both, so the two
+kinds of cost share one unit.
+
+The plan is a pure function of the corpus and the runtimes, and it is
+written out whole - every pack with its shard, plus a digest - so all shards
+build from one assignment and the verdict can check that they did.
+build_matrix.py writes (--write-plan) and reads (--plan) plan files.
+
+The same costs size spec files (batch()): vitest pays its per-file setup once
+per spec, so cheap packs share a file up to a predicted-time budget while an
+expensive pack keeps a file of its own.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+
+BASE_MS = 1500
+ENTRY_MS = 800
+MB_MS = 2000
+BATCH_MAX = 16
+
+
+def estimate_ms(entries: int, js_bytes: int) -> float:
+    if not entries:
+        return 0.0  # skipped at build time: no spec, nothing runs
+    return BASE_MS + ENTRY_MS * entries + MB_MS * js_bytes / 1e6
+
+
+def load_runtimes(path: str) -> dict[str, int]:
+    """Per-pack elapsedMs from a metrics.json; empty when there is none."""
+    try:
+        with open(path, encoding='utf-8') as fh:
+            metrics = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    runtimes = metrics.get('packMs') if isinstance(metrics, dict) else None
+    if not isinstance(runtimes, dict):
+        return {}
+    return {
+        str(pack): int(ms)
+        for pack, ms in runtimes.items()
+        if isinstance(ms, (int, float)) and not isinstance(ms, bool) and ms >= 0
+    }
+
+
+def predict(
+    estimates: dict[str, tuple[int, int]], runtimes: dict[str, int]
+) -> dict[str, int]:
+    """Predicted ms per pack from (entries, js bytes) and measured runtimes."""
+    estimated = {pack: estimate_ms(*e) for pack, e in estimates.items()}
+    both = [p for p in estimated if p in runtimes and estimated[p]]
+    scale = 1.0
+    if both and sum(estimated[p] for p in both):
+        scale = sum(runtimes[p] for p in both) / sum(estimated[p] for p in both)
+    return {
+        pack: runtimes[pack]
+        if pack in runtimes and estimated[pack]
+        else round(estimated[pack] * scale)
+        for pack in sorted(estimated)
+    }
+
+
+def assign(costs: dict[str, int], shards: int) -> dict[str, int]:
+    """LPT bin-packing: pack -> shard number, 1-based."""
+    heap = [(0, shard) for shard in range(1, shards + 1)]
+    out = {}
+    for pack in sorted(costs, key=lambda p: (-costs[p], p)):
+        load, shard = heapq.heappop(heap)
+        out[pack] = shard
+        heapq.heappush(heap, (load + costs[pack], shard))
+    return dict(sorted(out.items()))
+
+
+def batch(
+    costs: dict[str, int], budget_ms: int, most: int = BATCH_MAX
+) -> list[list[str]]:
+    """Packs grouped into spec files of at most budget_ms predicted time.
+
+    Cheapest first, so the long tail of one-entry packs fills the shared
+    files and a pack over budget is alone; no budget keeps every pack alone.
+    """
+    if budget_ms <= 0:
+        return [[pack] for pack in sorted(costs)]
+    out: list[list[str]] = []
+    current: list[str] = []
+    load = 0
+    for pack in sorted(costs, key=lambda p: (costs[p], p)):
+        if current and (load + costs[pack] > budget_ms or len(current) == most):
+            out.append(current)
+            current, load = [], 0
+        current.append(pack)
+        load += costs[pack]
+    if current:
+        out.append(current)
+    return out
+
+
+def plan_digest(shards: int, packs: dict[str, int]) -> str:
+    return hashlib.sha1(
+        json.dumps({'shards': shards, 'packs': packs}, sort_keys=True).encode()
+    ).hexdigest()
+
+
+def make_plan(
+    estimates: dict[str, tuple[int, int]],
+    runtimes: dict[str, int],
+    shards: int,
+) -> dict:
+    costs = predict(estimates, runtimes)
+    packs = assign(costs, shards)
+    predicted = [0] * shards
+    for pack, shard in packs.items():
+        predicted[shard - 1] += costs[pack]
+    return {
+        'shards': shards,
+        'digest': plan_digest(shards, packs),
+        'measured': sum(1 for p in costs if p in runtimes and costs[p]),
+        'predictedMs': predicted,
+        'packs': packs,
+        'costMs': costs,
+    }
+
+
+def check_plan(plan: object, shards: int, packs: list[str]) -> str:
+    """Why this plan cannot drive a build of these packs; '' when it can."""
+    if not isinstance(plan, dict) or not isinstance(plan.get('packs'), dict):
+        return 'not a shard plan'
+    if plan.get('shards') != shards:
+        return f'plan is for {plan.get("shards")} shards, not {shards}'
+    if plan.get('digest') != plan_digest(shards, plan['packs']):
+        return 'plan digest does not match its assignment'
+    planned = set(plan['packs'])
+    if planned != set(packs):
+        extra, missing = sorted(planned - set(packs)), sorted(set(packs) - planned)
+        return (
+            f'plan and corpus disagree: {len(missing)} pack(s) unplanned'
+            f' {missing[:5]}, {len(extra)} planned but absent {extra[:5]}'
+        )
+    return ''
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""Which operations' signatures moved since the baseline, and what moved.
+
+A signature is the JSON graph snapshot the runner takes after each operation
+(matrix_runner.ts signature()): node and link counts, then per node its id,
+type, mode, collapse, widget list (wn), widget-store rows (r, st) and slot
+connections (in, out). The verdict reports moved signatures by operation;
+this names every moved (pack, op) and diffs its two snapshots structurally,
+node by node, instead of leaving two JSON blobs to eyeball.
+
+Moved pairs come from hashing the head rows against the baseline's per-op
+hash table (metrics.json opSigs), so only the moved packs' baseline rows
+are read - one seek each from a packed shard (matrix_rows.read_row()).
+Without a table, every baseline row is hashed instead.
+
+    python3 scripts/registry-census/sig_diff.py matrix-rows \\
+        --baseline matrix-metrics/metrics.json --base base-rows
+    python3 scripts/registry-census/sig_diff.py matrix-rows \\
+        --baseline matrix-metrics/metrics.json --fetch --op graphToPrompt
+
+--fetch downloads the baseline run's combined rows (the
+ecosystem-matrix-combined artifact of the metrics' runId) with `gh`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from matrix_rows import read_row, read_rows  # noqa: E402
+from summarize_matrix import moved_ops, op_hash  # noqa: E402
+
+COMBINED_ARTIFACT = 'ecosystem-matrix-combined'
+
+
+def op_hashes(row: dict) -> dict[str, str]:
+    ops = row.get('ops') if isinstance(row.get('ops'), dict) else {}
+    return {op: op_hash(info) for op, info in ops.items() if isinstance(info, dict)}
+
+
+def _parse_sig(sig: object) -> dict | None:
+    try:
+        data = json.loads(sig) if isinstance(sig, str) else None
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _short(value: object, width: int = 80) -> str:
+    text = value if isinstance(value, str) else json.dumps(value)
+    return text if len(text) <= width else text[: width - 3] + '...'
+
+
+def _field_diff(was: object, now: object) -> str:
+    """One node field's change: added and removed items of a name=type
+    list, otherwise both values."""
+    if isinstance(was, str) and isinstance(now, str) and '=' in was + now:
+        before, after = was.split(','), now.split(',')
+        gone = [f'-{item}' for item in before if item and item not in after]
+        new = [f'+{item}' for item in after if item and item not in before]
+        if gone or new:
+            return ' '.join(gone + new)
+        return 'reordered: ' + _short(now)
+    return f'{_short(was)} -> {_short(now)}'
+
+
+def _id_order(node_id: str) -> tuple[int, str]:
+    return (int(node_id), '') if node_id.isdigit() else (sys.maxsize, node_id)
+
+
+def diff_sig(before: object, after: object) -> list[str]:
+    """What changed between two signatures, one line per change."""
+    if before == after:
+        return []
+    was, now = _parse_sig(before), _parse_sig(after)
+    if was is None or now is None:
+        # SIGFAIL or a missing op: nothing structural to compare.
+        return [f'{_short(before)} -> {_short(after)}']
+    out = []
+    for key, label in (('n', 'nodes'), ('l', 'links')):
+        if was.get(key) != now.get(key):
+            out.append(f'{label} {was.get(key)} -> {now.get(key)}')
+    nodes = [
+        {str(n.get('id')): n for n in side.get('nodes') or [] if isinstance(n, dict)}
+        for side in (was, now)
+    ]
+    for node_id in sorted(nodes[0].keys() | nodes[1].keys(), key=_id_order):
+        a, b = nodes[0].get(node_id), nodes[1].get(node_id)
+        if a is None or b is None:
+            node = a or b
+            out.append(
+                f'node {node_id} ({node.get("type")}) '
+                + ('removed' if b is None else 'added')
+            )
+            continue
+        for name in sorted(a.keys() | b.keys()):
+            if name != 'id' and a.get(name) != b.get(name):
+                out.append(
+                    f'node {node_id} ({b.get("type")}) {name}:'
+                    f' {_field_diff(a.get(name), b.get(name))}'
+                )
+    return out or ['same structure, different text']
+
+
+def moved_rows(
+    head_dir: str, table: object, base_dir: str = ''
+) -> tuple[dict[str, list[str]], dict[str, tuple[str, dict]]] | None:
+    """(moved packs by op, {pack: (row file name, head row)} for just those
+    packs); None when there is neither a table nor base rows to compare to.
+    """
+    if not isinstance(table, dict) or not isinstance(table.get('ops'), list):
+        if not base_dir:
+            return None
+        # No table: build the baseline's from its rows.
+        base_hashes = {
+            str(r.get('pack')): op_hashes(r) for _name, r in read_rows(base_dir, [])
+        }
+        ops = sorted({op for h in base_hashes.values() for op in h})
+        table = {
+            'ops': ops,
+            'packs': {
+                pack: ' '.join(h.get(op, '-') for op in ops)
+                for pack, h in base_hashes.items()
+            },
+        }
+    prev_ops = table['ops']
+    prev_packs = table.get('packs') if isinstance(table.get('packs'), dict) else {}
+    kept: dict[str, tuple[str, dict]] = {}
+    by_op: dict[str, list[str]] = {}
+    for name, row in read_rows(head_dir, []):
+        pack = str(row.get('pack'))
+        if pack not in prev_packs:
+            continue
+        hashes = op_hashes(row)
+        ops = sorted(set(hashes) | set(prev_ops))
+        mine = {'ops': ops, 'packs': {pack: ' '.join(hashes.get(op, '-') for op in ops)}}
+        moved = moved_ops(mine, {'ops': prev_ops, 'packs': {pack: prev_packs[pack]}})
+        for op in moved or {}:
+            by_op.setdefault(op, []).append(pack)
+            kept[pack] = (name, row)
+    return by_op, kept
+
+
+def report(
+    by_op: dict[str, list[str]],
+    kept: dict[str, tuple[str, dict]],
+    base_dir: str,
+    only_op: str = '',
+    limit: int = 10,
+) -> list[str]:
+    lines = [
+        f'{sum(len(p) for p in by_op.values())} moved signatures in'
+        f' {len(kept)} packs, {len(by_op)} operations'
+    ]
+    for op, packs in sorted(by_op.items(), key=lambda kv: (-len(kv[1]), kv[0])):
+        if only_op and op != only_op:
+            continue
+        lines.append('')
+        lines.append(f'{op}: {len(packs)} packs moved')
+        for pack in packs[:limit]:
+            name, row = kept[pack]
+            lines.append(f'  {pack}')
+            if not base_dir:
+                lines.append('    (no baseline rows to diff: pass --base or --fetch)')
+                continue
+            base = read_row(base_dir, name)
+            if base is None:
+                lines.append(f'    no baseline row {name}')
+                continue
+            before = (base.get('ops') or {}).get(op) or {}
+            after = (row.get('ops') or {}).get(op) or {}
+            for change in diff_sig(before.get('sig'), after.get('sig')):
+                lines.append(f'    {change}')
+        if len(packs) > limit:
+            lines.append(f'  (+{len(packs) - limit} more; --limit to see them)')
+    return lines
+
+
+def fetch_rows(run_id: str, dest: str) -> None:
+    """The combined rows of a workflow run, downloaded with gh."""
+    try:
+        subprocess.run(
+            ['gh', 'run', 'download', run_id, '--name', COMBINED_ARTIFACT,
+             '--dir', dest],
+            check=True,
+            stdout=sys.stderr,
+        )
+    except (OSError, subprocess.CalledProcessError) as exc:
+        sys.exit(f'could not download {COMBINED_ARTIFACT} of run {run_id}: {exc}')
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    ap.add_argument('head', help='row directory of the run to explain')
+    ap.add_argument('--baseline', default='', help='baseline metrics.json (opSigs)')
+    ap.add_argument('--base', default='', help='baseline row directory')
+    ap.add_argument(
+        '--fetch', action='store_true',
+        help="download the baseline's rows from its run (needs gh)",
+    )
+    ap.add_argument('--op', default='', help='only this operation')
+    ap.add_argument('--limit', type=int, default=10, help='packs shown per op')
+    args = ap.parse_args()
+
+    table = None
+    run_id = ''
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding='utf-8') as fh:
+                metrics = json.load(fh)
+        except (OSError, ValueError) as exc:
+            sys.exit(f'unreadable baseline {args.baseline}: {exc}')
+        if isinstance(metrics, dict):
+            table = metrics.get('opSigs')
+            run_id = str(metrics.get('runId') or '')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_dir = args.base
+        if args.fetch:
+            if not run_id:
+                sys.exit('--fetch needs a --baseline that names its runId')
+            base_dir = tmp
+            fetch_rows(run_id, tmp)
+        found = moved_rows(args.head, table, base_dir)
+        if found is None:
+            print(
+                'nothing to compare against: the baseline has no opSigs table'
+                ' and no baseline rows were given',
+                file=sys.stderr,
+            )
+            return 2
+        print('\n'.join(report(*found, base_dir, args.op, args.limit)))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
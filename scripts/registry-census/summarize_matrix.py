@@ -8,7 +8,10 @@ into one directory by the verdict job) and applies, in order:
                  must be present and the packs they built specs for must
                  match the rows exactly. A dead shard otherwise yields a
                  PASS over a partial corpus, which then becomes the
-                 baseline the next run is measured against.
+                 baseline the next run is measured against. When shards
+                 left their shard plans (_plan-shard-N.json), every plan
+                 must be the same assignment and cover exactly the packs
+                 the manifests account for.
 
   harness gate   a majority of stub rows, or < 50% of packs passing the
                  runner's self-check (the default workflow materialized),
@@ -28,23 +31,62 @@ into one directory by the verdict job) and applies, in order:
                  the previous run's value ($MATRIX_PREV, written each run to
                  $MATRIX_METRICS_OUT and carried between runs by the actions
                  cache). Catches gradual erosion the absolute floors ignore.
+                 With $MATRIX_ROLLING=K and a metrics history in
+                 $MATRIX_HISTORY_DB (census_store.py), the previous value is
+                 the median over the last K passing runs instead.
 
 Floors sit under the measured baselines (run 31624366070, 1,879 packs) so a
 handful of broken pack HEADs cannot flip the verdict, while a frontend
 regression that breaks pack integration craters them all at once. Exit
 codes: 0 PASS, 1 FAIL, 2 harness failure / no rows. Row fields listed in
 TELEMETRY are recorded and printed but deliberately never gated.
+
+The verdict reads counters, not rows: aggregate() reduces rows to what the
+report needs and merge() combines aggregates in any grouping. Each shard
+writes its own (MATRIX_AGGREGATE_OUT=<dir>/_aggregate-shard-N.json), and
+when every shard manifest has an intact aggregate accounting for every row
+file present, the verdict merges those instead of parsing the rows again;
+otherwise it reads the rows itself, streaming them through aggregate() one
+at a time (evaluate_stream() is the same for any row iterator). Rows are
+read through matrix_rows, so a shard's rows packed into _rows-shard-N.jsonl
+count under the file names they were packed from, beside any loose ones.
+Rows that are kept to be regrouped (a sample's strata, calibration) are kept
+parsed (parse_row()), a fraction of the size of their dicts.
+
+With $MATRIX_PARTIAL_OUT set, the rows so far are judged incrementally
+(render_partial()): stubs are packs still to run, and a criterion whose best
+case - every remaining pack perfect - is below its floor makes a PASS
+impossible. That outcome is written to $MATRIX_PARTIAL_OUT, which a shard
+names _stopped-shard-N.json before stopping early. The verdict job judges
+the merged rows of a run with such a marker the same way, and decides FAIL
+or withheld with the harness gate over the packs that ran.
+
+`summarize_matrix.py --simulate RUN_DIR... --labels labels.json` replays
+stored runs against a sweep of floors and delta tolerances instead
+(simulate_main()): false alarms and misses against each run's PASS/FAIL label.
 """
 
 from __future__ import annotations
 
+import argparse
 import hashlib
+import heapq
+import itertools
 import json
+import math
 import os
+import statistics
 import sys
-from collections import Counter
+import time
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass, field
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from census_store import CensusStore  # noqa: E402
+from matrix_rows import read_rows, row_names, scan_run  # noqa: E402
+from sample_plan import check_sample, make_sample, stratified  # noqa: E402
+from shard_plan import plan_digest  # noqa: E402
+
 STATUS_STAGES = ('registerNodeDef', 'registerCustomNodes')
 DELTA_TOLERANCE = 1.5
 
@@ -68,6 +110,7 @@ CRITERION_LABELS = {
     'rows_complete': 'rows complete (no hang or crash)',
 }
 DELTA_CRITERION_LABEL = 'entry-clean delta vs previous run'
+CRITERIA_HEADER = 'PASS criteria - all must hold, all shards combined:'
 
 EXPECTED_ROW_KEYS = (
     'selfCheck',
@@ -82,8 +125,20 @@ EXPECTED_ROW_KEYS = (
     'driveTypes',
 )
 
+# Scalar counters merge() adds up; the rest of an aggregate merges by kind.
+AGGREGATE_SUMS = (
+    'rows', 'stubs', 'indeterminate', 'measured', 'selfOk', 'anyLoaded',
+    'entries', 'entriesOk', 'hookPacks',
+)
+OP_COUNTS = ('seen', 'err', 'desync', 'bad', 'static')
+AGGREGATE_VERSION = 2
+# Bump when a pack's signature hash is computed differently, so the first
+# run after the change does not report every pack's signature as moved.
+SIG_SCHEME = 2
+
 TELEMETRY = (
-    'newTypes, driveTypes, per-op sig/depr, extension counts, no-JS skips'
+    'newTypes, driveTypes, per-op sig/depr, extension counts, no-JS skips,'
+    ' elapsedMs'
 )
 
 
@@ -95,6 +150,41 @@ class Verdict:
     metrics: dict | None = None
 
 
+@dataclass(frozen=True, slots=True)
+class OpResult:
+    """One operation's outcome. parse_row() makes one per distinct outcome
+    and shares it: nearly every operation of nearly every pack is clean."""
+
+    err: str  # cut to the 90 characters the report shows; '' if none
+    desync: bool
+    dispatching: bool
+
+
+@dataclass(slots=True)
+class Row:
+    """What aggregate() reads of a row, parsed once (parse_row()).
+
+    Signatures are kept as their hashes only, and operation outcomes and
+    the tuple of operation names are shared between rows, so a population
+    held for regrouping - a sample's strata, calibration's re-drawn samples -
+    costs a fraction of its dicts.
+    """
+
+    pack: object
+    incomplete: bool
+    missing: tuple[str, ...] = ()  # EXPECTED_ROW_KEYS the row lacks
+    self_ok: bool = False
+    loaded: bool = False
+    entries: int = 0
+    entries_ok: int = 0
+    stages: tuple[tuple[bool, bool], ...] = ()  # (OK, present) per STATUS_STAGES
+    hooked: bool = False
+    op_names: tuple[str, ...] = ()  # sorted
+    op_results: tuple[OpResult | None, ...] = ()  # per op_names; None: not an object
+    sigs: str = ''  # 'op=hash ...', as the aggregate keeps it
+    elapsed_ms: float | None = None
+
+
 def _manifest_packs(manifests: dict[str, dict], key: str) -> set[str]:
     return {
         pack
@@ -104,21 +194,355 @@ def _manifest_packs(manifests: dict[str, dict], key: str) -> set[str]:
     }
 
 
+def _plan_problem(plans: dict[str, dict], manifests: dict[str, dict]) -> str:
+    """Why the shards' plans do not vouch for the manifests; '' if they do."""
+    if not plans:
+        return ''
+    if len(plans) != len(manifests):
+        return f'{len(plans)} shard plans for {len(manifests)} shard manifests'
+    digests = set()
+    for name, plan in sorted(plans.items()):
+        packs = plan.get('packs')
+        if not isinstance(packs, dict) or plan.get('digest') != plan_digest(
+            plan.get('shards'), packs
+        ):
+            return f'{name} is not an intact shard plan'
+        digests.add(plan['digest'])
+    if len(digests) > 1:
+        return f'shards built from {len(digests)} different plans'
+    planned = set(next(iter(plans.values()))['packs'])
+    accounted = {pack for manifest in manifests.values() for pack in manifest}
+    if planned != accounted:
+        return (
+            f'the plan names {len(planned)} packs, the manifests account for'
+            f' {len(accounted)}'
+        )
+    return ''
+
+
 def _named(packs: list[str], limit: int = 10) -> str:
     shown = ', '.join(packs[:limit])
     return shown + (f' (+{len(packs) - limit} more)'
                     if len(packs) > limit else '')
 
 
+def op_hash(info: dict) -> str:
+    return hashlib.sha1(str(info.get('sig', '')).encode()).hexdigest()[:12]
+
+
+def op_sig_table(agg: dict) -> dict:
+    """Every pack's per-operation signature hashes, as a baseline keeps them:
+    {"ops": [op, ...], "packs": {pack: "hash hash ..."}}, one hash per op in
+    that order, '-' where the pack has no such op."""
+    ops = sorted(agg['ops'])
+    packs = {}
+    for _key, pack, sigs in agg['sigs']:
+        present = dict(sig.split('=') for sig in sigs.split())
+        packs[pack] = ' '.join(present.get(op, '-') for op in ops)
+    return {'ops': ops, 'packs': packs}
+
+
+def moved_ops(table: dict, prev_table: object) -> dict[str, list[str]] | None:
+    """Packs whose signature moved since prev_table, by operation; None
+    when prev_table is not a table. An operation either side never ran is
+    new or retired, not moved."""
+    if not isinstance(prev_table, dict):
+        return None
+    prev_ops, prev_packs = prev_table.get('ops'), prev_table.get('packs')
+    if not isinstance(prev_ops, list) or not isinstance(prev_packs, dict):
+        return None
+    shared_ops = [op for op in table['ops'] if op in prev_ops]
+    now_at = {op: i for i, op in enumerate(table['ops'])}
+    was_at = {op: i for i, op in enumerate(prev_ops)}
+    moved: dict[str, list[str]] = {}
+    for pack in sorted(table['packs'].keys() & prev_packs.keys()):
+        now = table['packs'][pack].split()
+        was = str(prev_packs[pack]).split()
+        if len(was) != len(prev_ops):
+            continue
+        for op in shared_ops:
+            if now[now_at[op]] != was[was_at[op]]:
+                moved.setdefault(op, []).append(pack)
+    return moved
+
+
+_op_results: dict[tuple[str, bool, bool], OpResult] = {}
+_op_names: dict[tuple[str, ...], tuple[str, ...]] = {}
+
+
+def parse_row(r: dict) -> Row:
+    """r as a Row. A row missing any EXPECTED_ROW_KEYS keeps only the list
+    of what it lacks: the verdict is withheld over it, nothing else is read.
+    """
+    elapsed = r.get('elapsedMs')
+    row = Row(
+        r.get('pack'),
+        bool(r.get('incomplete')),
+        elapsed_ms=elapsed if isinstance(elapsed, (int, float)) else None,
+    )
+    if row.incomplete:
+        return row
+    row.missing = tuple(k for k in EXPECTED_ROW_KEYS if k not in r)
+    if row.missing:
+        return row
+    row.self_ok = r.get('selfCheck') == 'OK'
+    row.loaded = bool(r.get('loadedOk'))
+    load = r.get('load') or {}
+    row.entries = len(load)
+    row.entries_ok = sum(1 for v in load.values() if v == 'OK')
+    row.stages = tuple((r.get(stage) == 'OK', stage in r) for stage in STATUS_STAGES)
+    row.hooked = bool(r.get('hookErrors'))
+    ops = r['ops'] if isinstance(r['ops'], dict) else {}
+    names = tuple(sorted(ops))
+    row.op_names = _op_names.setdefault(names, names)
+    results = []
+    sigs = []
+    for op in names:
+        info = ops[op]
+        if not isinstance(info, dict):
+            results.append(None)
+            continue
+        err = info.get('err')
+        outcome = (
+            str(err)[:90] if err else '',
+            bool(info.get('desync')),
+            bool(info.get('dispatching', True)),
+        )
+        result = _op_results.get(outcome)
+        if result is None:
+            result = _op_results[outcome] = OpResult(*outcome)
+        results.append(result)
+        sigs.append(f'{op}={op_hash(info)}')
+    row.op_results = tuple(results)
+    row.sigs = ' '.join(sigs)
+    return row
+
+
+def _empty_aggregate() -> dict:
+    return {
+        'version': AGGREGATE_VERSION,
+        'rows': 0,
+        'stubs': 0,
+        'packs': [],
+        'unreadable': [],
+        'missing': {},
+        'indeterminate': 0,
+        'measured': 0,
+        'selfOk': 0,
+        'anyLoaded': 0,
+        'entries': 0,
+        'entriesOk': 0,
+        'stages': {stage: [0, 0] for stage in STATUS_STAGES},
+        'hookPacks': 0,
+        'ops': {},
+        'errors': {},
+        'sigs': [],
+        'packMs': {},
+    }
+
+
+def aggregate(
+    rows: Iterable[dict | Row],
+    manifests: dict[str, dict],
+    keys: Iterable[str] | None = None,
+) -> dict:
+    """The counters render() reads, from rows and their shard's manifests.
+
+    keys order the rows wherever order shows in the report - first-seen
+    error messages, the packs named by a schema drift, the signature table -
+    and must sort the same way across shards: main() passes the row file
+    names. By default a row's position in rows.
+    """
+    if keys is None:
+        keys = (f'{i:09d}' for i in itertools.count())
+    return aggregate_keyed(zip(keys, rows), manifests)
+
+
+def aggregate_keyed(
+    keyed_rows: Iterable[tuple[str, dict | Row]], manifests: dict[str, dict]
+) -> dict:
+    """aggregate() over (key, row) pairs, in one pass.
+
+    Each row is read once and dropped: the counters grow with the operations
+    the battery runs, and only what the report names per pack - its row,
+    signature and elapsed time - grows with the population.
+
+    Counts are kept per operation the row carries; an operation some other
+    row carries is missing from this one, which only the union of all the
+    shards can tell, so render() charges it then.
+
+    A row may come as its dict or already parsed (parse_row()); rows judged
+    more than once are cheaper parsed once.
+    """
+    unresolved = _manifest_packs(manifests, 'indeterminate')
+    agg = _empty_aggregate()
+    stages = agg['stages']
+    for key, r in keyed_rows:
+        row = r if isinstance(r, Row) else parse_row(r)
+        agg['rows'] += 1
+        agg['packs'].append(row.pack)
+        if row.elapsed_ms is not None:
+            agg['packMs'][str(row.pack)] = row.elapsed_ms
+        if row.incomplete:
+            agg['stubs'] += 1
+            continue
+        for k in row.missing:
+            agg['missing'].setdefault(k, []).append(
+                [key, '?' if row.pack is None else str(row.pack)]
+            )
+        if row.missing:
+            continue  # the verdict is withheld; nothing else is read
+        if row.pack in unresolved:
+            agg['indeterminate'] += 1
+            continue
+        agg['measured'] += 1
+        agg['selfOk'] += row.self_ok
+        agg['anyLoaded'] += row.loaded
+        agg['entries'] += row.entries
+        agg['entriesOk'] += row.entries_ok
+        for stage, (ok, present) in zip(STATUS_STAGES, row.stages):
+            stages[stage][0] += ok
+            stages[stage][1] += present
+        agg['hookPacks'] += row.hooked
+        for op, result in zip(row.op_names, row.op_results):
+            counts = agg['ops'].get(op)
+            if counts is None:
+                counts = agg['ops'][op] = dict.fromkeys(OP_COUNTS, 0)
+            if result is None:
+                continue
+            counts['seen'] += 1
+            # A bare property write calls nothing into the app, so its error
+            # arm cannot fail and must not be read as evidence of health. Its
+            # desync arm still can - widget-array surgery shows up there.
+            if not result.dispatching:
+                counts['static'] += 1
+            if result.err:
+                counts['err'] += 1
+                seen = agg['errors'].setdefault(f'{op}: {result.err}', [0, key, op])
+                seen[0] += 1
+            if result.desync:
+                counts['desync'] += 1
+            if (result.err and result.dispatching) or result.desync:
+                counts['bad'] += 1
+        # one string per pack, not a dict: at 10x today's population the
+        # dicts were most of what the verdict held in memory
+        agg['sigs'].append([key, str(row.pack), row.sigs])
+    return agg
+
+
+def merge(aggregates: list[dict]) -> dict:
+    """One aggregate of all the given ones, in any order or grouping."""
+    out = _empty_aggregate()
+    for agg in aggregates:
+        for name in AGGREGATE_SUMS:
+            out[name] += agg[name]
+        out['packs'] += agg['packs']
+        out['unreadable'] += agg['unreadable']
+        out['sigs'] += agg['sigs']
+        out['packMs'].update(agg['packMs'])
+        for key, packs in agg['missing'].items():
+            out['missing'][key] = out['missing'].get(key, []) + packs
+        for stage, (ok, measured) in agg['stages'].items():
+            out['stages'][stage][0] += ok
+            out['stages'][stage][1] += measured
+        for op, counts in agg['ops'].items():
+            into = out['ops'].setdefault(op, dict.fromkeys(OP_COUNTS, 0))
+            for name, n in counts.items():
+                into[name] += n
+        for msg, (n, key, op) in agg['errors'].items():
+            seen = out['errors'].get(msg)
+            out['errors'][msg] = (
+                [n, key, op] if seen is None
+                else [seen[0] + n, *min(seen[1:], [key, op])]
+            )
+    out['unreadable'].sort()
+    out['sigs'].sort()
+    for packs in out['missing'].values():
+        packs.sort()
+    return out
+
+
+def evaluate_stream(
+    rows: Iterable[dict | Row],
+    manifests: dict[str, dict],
+    prev: object = None,
+    run_id: str = '',
+    expect_shards: int | None = None,
+    stale: dict | None = None,
+    plans: dict[str, dict] | None = None,
+    rolling: int = 0,
+) -> Verdict:
+    """The verdict over rows consumed once, from any iterable."""
+    return render(
+        aggregate(rows, manifests),
+        manifests,
+        prev,
+        run_id,
+        expect_shards,
+        stale,
+        plans,
+        rolling,
+    )
+
+
 def evaluate(
-    rows: list[dict],
+    rows: list[dict | Row],
+    manifests: dict[str, dict],
+    prev: object = None,
+    run_id: str = '',
+    expect_shards: int | None = None,
+    stale: dict | None = None,
+    plans: dict[str, dict] | None = None,
+    rolling: int = 0,
+) -> Verdict:
+    """evaluate_stream() over rows already in memory.
+
+    With rolling set, prev is the metrics history, newest first, and the
+    delta gate compares against rolling_baseline() over it.
+    """
+    return evaluate_stream(
+        rows, manifests, prev, run_id, expect_shards, stale, plans, rolling
+    )
+
+
+def rolling_baseline(history: object, window: int, run_id: str = '') -> dict | None:
+    """The baseline of the last window passing runs in history (newest
+    first): the newest run's metrics with entryPct their median.
+
+    One lucky or unlucky run moves a median of five by at most one rank, so
+    it no longer sets the bar for every PR after it. This run's own earlier
+    attempt is left out. None when no passing run is left.
+    """
+    runs = [
+        m
+        for m in (history if isinstance(history, list) else [])
+        if isinstance(m, dict)
+        and m.get('verdict') == 'PASS'
+        and isinstance(m.get('entryPct'), (int, float))
+        and not (run_id and m.get('runId') == run_id)
+    ][:window]
+    if not runs:
+        return None
+    return {
+        **runs[0],
+        'entryPct': statistics.median(m['entryPct'] for m in runs),
+        'baselineRuns': [str(m.get('runId') or '') for m in runs],
+    }
+
+
+def render(
+    agg: dict,
     manifests: dict[str, dict],
     prev: object = None,
     run_id: str = '',
     expect_shards: int | None = None,
     stale: dict | None = None,
+    plans: dict[str, dict] | None = None,
+    rolling: int = 0,
 ) -> Verdict:
-    if not rows:
+    if rolling:
+        prev = rolling_baseline(prev, rolling, run_id)
+    if not agg['rows']:
         return Verdict(2, ['no matrix rows to summarize'])
 
     lines: list[str] = []
@@ -134,30 +558,23 @@ def evaluate(
         )
         lines.append('')
 
-    stubs = [r for r in rows if r.get('incomplete')]
-    done = [r for r in rows if not r.get('incomplete')]
-
-    if not done:
+    rows, stubs = agg['rows'], agg['stubs']
+    if stubs == rows:
         lines.append(
-            f'all {len(stubs)} rows are incomplete stubs - every pack hung'
+            f'all {stubs} rows are incomplete stubs - every pack hung'
             ' or crashed before measuring'
         )
         return Verdict(2, lines)
 
-    missing_by_key = {
-        key: [str(row.get('pack', '?')) for row in done if key not in row]
-        for key in EXPECTED_ROW_KEYS
-    }
-    missing_by_key = {
-        key: packs for key, packs in missing_by_key.items() if packs
-    }
-    if missing_by_key:
+    if agg['missing']:
         lines.append(
             'ROW SCHEMA DRIFT: completed rows are missing fields this verdict'
             ' reads, so their rates would be vacuous rather than clean.'
         )
-        for key, packs in missing_by_key.items():
-            lines.append(f'  {key}: {len(packs)} row(s): {_named(packs)}')
+        for key in EXPECTED_ROW_KEYS:
+            if key in agg['missing']:
+                packs = [pack for _key, pack in agg['missing'][key]]
+                lines.append(f'  {key}: {len(packs)} row(s): {_named(packs)}')
         lines.append('')
         return Verdict(2, lines)
 
@@ -165,12 +582,10 @@ def evaluate(
     # files ComfyUI would actually serve. Those packs still run - the row is
     # kept for the artifact - but folding a guess into a compatibility rate
     # is how a measurement acquires a number it has not earned.
-    unresolved = _manifest_packs(manifests, 'indeterminate')
-    indeterminate = [r for r in done if r.get('pack') in unresolved]
-    done = [r for r in done if r.get('pack') not in unresolved]
+    done, indeterminate = agg['measured'], agg['indeterminate']
     if not done:
         lines.append(
-            f'every one of {len(indeterminate)} completed packs is'
+            f'every one of {indeterminate} completed packs is'
             ' indeterminate - nothing is left to measure'
         )
         return Verdict(2, lines)
@@ -178,28 +593,21 @@ def evaluate(
     assisted = len(_manifest_packs(manifests, 'packSpecificRewrites'))
     skipped = len(_manifest_packs(manifests, 'skipped'))
     lines.append(
-        f'packs with extension JS executed: {len(done)}'
+        f'packs with extension JS executed: {done}'
         + (f' (no-JS packs ignored: {skipped})' if skipped else '')
-        + (f' (hung or crashed: {len(stubs)})' if stubs else '')
-        + (f' (indeterminate, excluded: {len(indeterminate)})'
+        + (f' (hung or crashed: {stubs})' if stubs else '')
+        + (f' (indeterminate, excluded: {indeterminate})'
            if indeterminate else '')
         + (f' (needed a pack-specific rewrite: {assisted})' if assisted else '')
     )
 
-    self_ok = sum(1 for r in done if r.get('selfCheck') == 'OK')
-    any_loaded = sum(1 for r in done if r.get('loadedOk'))
-    total_entries = sum(len(r.get('load') or {}) for r in done)
-    ok_entries = sum(
-        1
-        for r in done
-        for v in (r.get('load') or {}).values()
-        if v == 'OK'
-    )
-    any_pct = any_loaded / len(done) * 100
+    self_ok, any_loaded = agg['selfOk'], agg['anyLoaded']
+    total_entries, ok_entries = agg['entries'], agg['entriesOk']
+    any_pct = any_loaded / done * 100
     entry_pct = ok_entries / total_entries * 100 if total_entries else 0.0
     # Indeterminate packs completed; they are excluded from compatibility
     # rates, not counted as hangs.
-    complete_pct = (len(done) + len(indeterminate)) / len(rows) * 100
+    complete_pct = (done + indeterminate) / rows * 100
 
     lines.append(
         f'{"packs with >=1 entry loaded":28s} {any_loaded:5d} ({any_pct:5.1f}%)'
@@ -210,77 +618,47 @@ def evaluate(
     )
     stage_pct = {}
     for stage in STATUS_STAGES:
-        ok = sum(1 for r in done if r.get(stage) == 'OK')
-        measured = sum(1 for r in done if stage in r)
+        ok, measured = agg['stages'][stage]
         stage_pct[stage] = ok / measured * 100 if measured else 0.0
         lines.append(f'{stage:28s} {ok:5d} of {measured} OK')
-    hook_packs = sum(1 for r in done if r.get('hookErrors'))
-    hook_free_pct = (len(done) - hook_packs) / len(done) * 100
+    hook_packs = agg['hookPacks']
+    hook_free_pct = (done - hook_packs) / done * 100
     lines.append(f'{"contained hook errors":28s} {hook_packs:5d} pack(s)')
     lines.append(
-        f'{"harness self-check OK":28s} {self_ok:5d} of {len(done)}'
+        f'{"harness self-check OK":28s} {self_ok:5d} of {done}'
     )
 
-    op_total: Counter = Counter()
-    op_err: Counter = Counter()
-    op_desync: Counter = Counter()
-    op_bad: Counter = Counter()
-    op_static: Counter = Counter()
-    err_msgs: Counter = Counter()
-    sig_hashes: dict[str, str] = {}
-    op_names = sorted(
-        {
-            op
-            for row in done
-            for op in (row['ops'] if isinstance(row['ops'], dict) else {})
-        }
-    )
-    for r in done:
-        digest = hashlib.sha1()
-        ops = r['ops'] if isinstance(r['ops'], dict) else {}
-        for op in op_names:
-            info = ops.get(op)
-            op_total[op] += 1
-            if not isinstance(info, dict):
-                digest.update(f'{op}=<missing>'.encode())
-                op_bad[op] += 1
-                continue
-            digest.update(f'{op}={info.get("sig", "")}'.encode())
-            # A bare property write calls nothing into the app, so its error
-            # arm cannot fail and must not be read as evidence of health. Its
-            # desync arm still can - widget-array surgery shows up there.
-            dispatching = info.get('dispatching', True)
-            if not dispatching:
-                op_static[op] += 1
-            if info.get('err'):
-                op_err[op] += 1
-                err_msgs[f'{op}: {str(info["err"])[:90]}'] += 1
-            if info.get('desync'):
-                op_desync[op] += 1
-            if (info.get('err') and dispatching) or info.get('desync'):
-                op_bad[op] += 1
-        sig_hashes[str(r.get('pack'))] = digest.hexdigest()[:12]
+    # Every measured pack is charged every operation any pack ran: one that
+    # is absent from a row, or not an object, counts against it.
+    op_names = sorted(agg['ops'])
+    op_bad = {
+        op: agg['ops'][op]['bad'] + done - agg['ops'][op]['seen'] for op in op_names
+    }
     lines.append('')
     lines.append('operation battery (packs with an error / widget desync):')
-    for op in op_total:
+    for op in op_names:
+        counts = agg['ops'][op]
         lines.append(
-            f'  {op:18s} {op_total[op] - op_bad[op]:5d} of {op_total[op]} clean'
-            + (f'   errors {op_err[op]}' if op_err[op] else '')
-            + (f'   desync {op_desync[op]}' if op_desync[op] else '')
+            f'  {op:18s} {done - op_bad[op]:5d} of {done} clean'
+            + (f'   errors {counts["err"]}' if counts['err'] else '')
+            + (f'   desync {counts["desync"]}' if counts['desync'] else '')
             + ('   [no dispatch: desync only]'
-               if op_static[op] == op_total[op] else '')
+               if counts['static'] == done else '')
         )
-    if err_msgs:
+    if agg['errors']:
         lines.append('')
         lines.append('most common operation errors:')
-        for msg, n in err_msgs.most_common(8):
+        common = sorted(
+            agg['errors'].items(), key=lambda kv: (-kv[1][0], kv[1][1], kv[1][2])
+        )
+        for msg, (n, _key, _op) in common[:8]:
             lines.append(f'  {n:4d}x {msg}')
     lines.append('')
     lines.append(f'telemetry only - recorded, never gated: {TELEMETRY}')
 
     if expect_shards is not None:
         expected = _manifest_packs(manifests, 'entries')
-        measured = {r.get('pack') for r in rows}
+        measured = set(agg['packs'])
         unmeasured = sorted(expected - measured)
         unclaimed = sorted(measured - expected)
         if len(manifests) != expect_shards or unmeasured or unclaimed:
@@ -288,7 +666,7 @@ def evaluate(
             lines.append(
                 f'PARTIAL POPULATION: {len(manifests)} of {expect_shards}'
                 f' shard manifests present, {len(expected)} packs expected,'
-                f' {len(rows)} rows written.'
+                f' {rows} rows written.'
             )
             if unmeasured:
                 lines.append(f'  no row for: {_named(unmeasured)}')
@@ -300,17 +678,27 @@ def evaluate(
                 ' run is measured against. Verdict withheld.'
             )
             return Verdict(2, lines)
+        problem = _plan_problem(plans or {}, manifests)
+        if problem:
+            lines.append('')
+            lines.append(f'SHARD PLAN MISMATCH: {problem}.')
+            lines.append(
+                '  Shards that built from different plans can each be'
+                ' internally consistent while together measuring some packs'
+                ' twice and others not at all. Verdict withheld.'
+            )
+            return Verdict(2, lines)
 
-    if len(stubs) > len(done):
+    if stubs > done:
         lines.append('')
         lines.append(
-            f'HARNESS FAILURE: {len(stubs)} of {len(rows)} packs left'
+            f'HARNESS FAILURE: {stubs} of {rows} packs left'
             ' incomplete stub rows (hung or crashed) - a majority-hang'
             ' points at the harness, not the ecosystem. Verdict withheld.'
         )
         return Verdict(2, lines)
 
-    self_pct = self_ok / len(done) * 100
+    self_pct = self_ok / done * 100
     if self_pct < 50:
         lines.append('')
         lines.append(
@@ -322,9 +710,9 @@ def evaluate(
         return Verdict(2, lines)
 
     worst_op = '-'
-    worst_pct = 100.0 if op_total else 0.0
-    for op in op_total:
-        pct = (op_total[op] - op_bad[op]) / op_total[op] * 100
+    worst_pct = 100.0 if op_names else 0.0
+    for op in op_names:
+        pct = (done - op_bad[op]) / done * 100
         if pct < worst_pct:
             worst_op, worst_pct = op, pct
 
@@ -366,7 +754,7 @@ def evaluate(
         ),
     )
     lines.append('')
-    lines.append('PASS criteria - all must hold, all shards combined:')
+    lines.append(CRITERIA_HEADER)
     breaches = []
     for label, measured_pct, floor in criteria:
         held = measured_pct >= floor
@@ -394,14 +782,16 @@ def evaluate(
     elif isinstance(prev_entry, (int, float)):
         delta = entry_pct - prev_entry
         held = delta >= -DELTA_TOLERANCE
+        window = prev.get('baselineRuns')
+        against = f', median of {len(window)} runs' if isinstance(window, list) else ''
         lines.append(
             f'  {DELTA_CRITERION_LABEL:42s} {delta:+5.1f}pp'
-            f'  (floor -{DELTA_TOLERANCE}pp)  {"OK" if held else "BREACH"}'
+            f'  (floor -{DELTA_TOLERANCE}pp{against})  {"OK" if held else "BREACH"}'
         )
         if not held:
             breaches.append(
                 f'entry files clean dropped {-delta:.1f}pp'
-                f' (from {prev_entry:.1f}% to {entry_pct:.1f}%)'
+                f' (from {prev_entry:.1f}%{against} to {entry_pct:.1f}%)'
             )
     else:
         lines.append(
@@ -415,7 +805,17 @@ def evaluate(
     # widget rows, say - moves the signature and nothing else. Reported, not
     # gated: a legitimate frontend change moves these too, so a floor here
     # would cry wolf on the diffs it is supposed to be measuring.
+    sig_hashes = {}
+    for _key, pack, sigs in agg['sigs']:
+        present = dict(sig.split('=') for sig in sigs.split())
+        sig_hashes[pack] = hashlib.sha1(
+            '\n'.join(f'{op}={present.get(op, "<missing>")}' for op in op_names).encode()
+        ).hexdigest()[:12]
     prev_sigs = prev.get('sigHashes') if isinstance(prev, dict) else None
+    if isinstance(prev, dict) and prev.get('sigScheme') != SIG_SCHEME:
+        prev_sigs = None  # hashed another way: every pack would read as moved
+    op_sigs = op_sig_table(agg)
+    by_op = moved_ops(op_sigs, prev.get('opSigs')) if prev_sigs is not None else None
     if isinstance(prev_sigs, dict):
         shared = sig_hashes.keys() & prev_sigs.keys()
         moved = sorted(p for p in shared if sig_hashes[p] != prev_sigs[p])
@@ -423,7 +823,13 @@ def evaluate(
             f'  {"packs whose op signature moved":42s} {len(moved):5d}'
             f' of {len(shared)}  (telemetry)'
         )
-        if moved:
+        if by_op:
+            # Largest first: a frontend change tends to move one operation
+            # across many packs, and that operation is where to look.
+            for op, packs in sorted(by_op.items(), key=lambda kv: (-len(kv[1]), kv[0])):
+                lines.append(f'    {op:20s} {len(packs):5d}  {_named(packs, 5)}')
+            lines.append('    diff them: sig_diff.py <rows> --baseline <metrics.json>')
+        elif moved:
             lines.append(f'    {_named(moved)}')
 
     lines.append(
@@ -440,8 +846,8 @@ def evaluate(
         lines,
         [],
         {
-            'packs': len(done),
-            'incomplete': len(stubs),
+            'packs': done,
+            'incomplete': stubs,
             'anyPct': round(any_pct, 3),
             'entryPct': round(entry_pct, 3),
             'regPct': round(stage_pct['registerNodeDef'], 3),
@@ -451,7 +857,10 @@ def evaluate(
             'worstOp': worst_op,
             'worstOpPct': round(worst_pct, 3),
             'shardManifests': len(manifests),
+            'sigScheme': SIG_SCHEME,
             'sigHashes': sig_hashes,
+            'opSigs': op_sigs,
+            'packMs': dict(sorted(agg['packMs'].items())),
             'staleRegistry': (
                 str(stale.get('reason', 'unspecified')) if stale else None
             ),
@@ -461,6 +870,471 @@ def evaluate(
     )
 
 
+def _criterion_counts(agg: dict, ops: list[str]) -> dict[str, object]:
+    """(ok, units) per PASS criterion; op_clean is one pair per operation.
+
+    An operation in ops this aggregate's rows never ran counts against every
+    one of them, as render() charges a missing operation.
+    """
+    done = agg['measured']
+    counts: dict[str, object] = {
+        'any_loaded': (agg['anyLoaded'], done),
+        'entry_clean': (agg['entriesOk'], agg['entries']),
+        'register_node_def': tuple(agg['stages']['registerNodeDef']),
+        'register_custom_nodes': tuple(agg['stages']['registerCustomNodes']),
+        'hook_free': (done - agg['hookPacks'], done),
+        'op_clean': {
+            op: (
+                agg['ops'][op]['seen'] - agg['ops'][op]['bad'] if op in agg['ops'] else 0,
+                done,
+            )
+            for op in ops
+        },
+        'rows_complete': (done + agg['indeterminate'], agg['rows']),
+    }
+    return counts
+
+
+def sample_estimates(
+    strata: dict[str, dict], sample: dict
+) -> dict[str, tuple[float, float, float, str]]:
+    """(estimate, low, high, operation) per PASS criterion, as fractions.
+
+    Each stratum weighs in by its share of the population's packs, or of
+    its entry files for entry-files-clean. Of the operations, the one with
+    the lowest lower bound stands for op_clean and is named.
+    """
+    shares = sample['strata']
+    packs = sum(s['population'] for s in shares.values()) or 1
+    entries = sum(s['entries'] for s in shares.values()) or 1
+    ops = sorted({op for agg in strata.values() for op in agg['ops']})
+    counts = {name: _criterion_counts(agg, ops) for name, agg in strata.items()}
+
+    def estimate(criterion: str, op: str = '') -> tuple[float, float, float]:
+        parts = []
+        for name, by in counts.items():
+            share = shares.get(name, {})
+            weight = (
+                share.get('entries', 0) / entries
+                if criterion == 'entry_clean'
+                else share.get('population', 0) / packs
+            )
+            ok, units = by[criterion][op] if op else by[criterion]
+            parts.append((weight, ok, units))
+        return stratified(parts)
+
+    out = {name: (*estimate(name), '') for name in FLOORS if name != 'op_clean'}
+    worst = (0.0, 0.0, 0.0, '-')
+    for op in ops:
+        found = estimate('op_clean', op)
+        if worst[3] == '-' or found[1] < worst[1]:
+            worst = (*found, op)
+    out['op_clean'] = worst
+    return {name: out[name] for name in FLOORS}
+
+
+def render_sample(
+    strata: dict[str, dict],
+    sample: dict,
+    manifests: dict[str, dict],
+    expect_shards: int | None = None,
+    stale: dict | None = None,
+    plans: dict[str, dict] | None = None,
+    prev: object = None,
+    run_id: str = '',
+    rolling: int = 0,
+) -> Verdict:
+    """The verdict a stratified sample predicts for the full population.
+
+    strata maps each stratum of the sample to the aggregate of its rows. The
+    sample's own counts pass through render()'s gates - population, schema
+    drift, harness - unchanged. Each criterion is then estimated for the
+    whole population with a 95% interval (sample_plan.stratified()), and so
+    is the delta: the entry-clean interval against prev, as render() takes
+    it. Every interval clear of its floor is a provisional PASS, code 0. One
+    wholly below its floor is a sample FAIL, code 1. Anything else is
+    undecided, code 2 - with no baseline to rule out a drop, too. Only the
+    full run sets a baseline, so this writes no metrics.
+    """
+    if rolling:
+        prev = rolling_baseline(prev, rolling, run_id)
+    total = merge(list(strata.values()))
+    full = render(total, manifests, None, '', expect_shards, stale, plans)
+    if full.code == 2:
+        return Verdict(2, full.lines)
+    lines = full.lines[: full.lines.index(CRITERIA_HEADER) - 1]
+    estimates = sample_estimates(strata, sample)
+    population = sum(s['population'] for s in sample['strata'].values())
+
+    lines.append('')
+    lines.append(
+        f'SAMPLE ESTIMATE - {total["rows"]} of {population} JS packs'
+        f' ({len(sample["strata"])} strata), 95% intervals:'
+    )
+    clear, below = [], []
+    for name in FLOORS:
+        point, low, high, op = estimates[name]
+        point, low, high = point * 100, low * 100, high * 100
+        label = CRITERION_LABELS[name] + (f' (worst: {op})' if op else '')
+        floor = FLOORS[name]
+        state = 'CLEAR' if low >= floor else 'BELOW' if high < floor else 'UNSURE'
+        lines.append(
+            f'  {label:42s} {point:5.1f}% [{low:5.1f}, {high:5.1f}]'
+            f'  (floor {floor:.0f}%)  {state}'
+        )
+        if state == 'CLEAR':
+            clear.append(name)
+        elif state == 'BELOW':
+            below.append(f'{label} at most {high:.1f}% < {floor:.0f}%')
+
+    prev_entry = prev.get('entryPct') if isinstance(prev, dict) else None
+    if isinstance(prev, dict) and run_id and prev.get('runId') == run_id:
+        prev_entry = None  # this run's own earlier attempt: no baseline
+    if isinstance(prev_entry, (int, float)):
+        point, low, high, _op = estimates['entry_clean']
+        point, low, high = (v * 100 - prev_entry for v in (point, low, high))
+        window = prev.get('baselineRuns')
+        against = f', median of {len(window)} runs' if isinstance(window, list) else ''
+        floor = -DELTA_TOLERANCE
+        state = 'CLEAR' if low >= floor else 'BELOW' if high < floor else 'UNSURE'
+        lines.append(
+            f'  {DELTA_CRITERION_LABEL:42s} {point:+5.1f}pp [{low:+5.1f}, {high:+5.1f}]'
+            f'  (floor {floor}pp{against})  {state}'
+        )
+        if state == 'CLEAR':
+            clear.append('delta')
+        elif state == 'BELOW':
+            below.append(
+                f'entry files clean dropped at least {-high:.1f}pp'
+                f' (from {prev_entry:.1f}%{against})'
+            )
+    else:
+        lines.append(
+            f'  {DELTA_CRITERION_LABEL:42s}   n/a'
+            '  (no baseline to rule out a drop)'
+        )
+    if below:
+        lines.append(
+            'VERDICT: SAMPLE FAIL - ' + '; '.join(below)
+            + ' (provisional: the full run decides)'
+        )
+        return Verdict(1, lines, below)
+    if len(clear) == len(FLOORS) + 1:
+        lines.append('VERDICT: PROVISIONAL PASS - every interval clears its floor')
+        return Verdict(0, lines)
+    unsure = [CRITERION_LABELS[n] for n in FLOORS if n not in clear]
+    reasons = []
+    if isinstance(prev_entry, (int, float)) and 'delta' not in clear:
+        unsure.append(DELTA_CRITERION_LABEL)
+    if unsure:
+        reasons.append(', '.join(unsure) + ' too close to call on a sample')
+    if not isinstance(prev_entry, (int, float)):
+        reasons.append('no baseline to rule out an entry-clean drop')
+    lines.append('VERDICT: UNDECIDED - ' + '; '.join(reasons) + '; run the full matrix')
+    return Verdict(2, lines)
+
+
+def calibrate(
+    rows: dict[str, tuple[str, Row]],
+    manifests: dict[str, dict],
+    sample: dict,
+    seeds: int = 20,
+) -> list[str]:
+    """How often samples of this run's rows predict its full verdict.
+
+    rows maps each pack to its (key, row). Each seed draws the sample a PR
+    would have run (make_sample(), same size, seed 0 being the PR's own) and
+    judges it as render_sample() does. A provisional PASS over a full FAIL is
+    the disagreement that matters: it is a PR let through. A sample FAIL
+    over a full PASS costs a full run. Each sample's delta is taken against
+    this run's own entry-clean value, the baseline of a PR that changed
+    nothing. Each interval is also checked against the full population's
+    value.
+    """
+    everything = aggregate_keyed(sorted(rows.values()), manifests)
+    full = render(everything, manifests)
+    ops = sorted(everything['ops'])
+    pooled = _criterion_counts(everything, ops)
+
+    def value(name: str, op: str) -> float:
+        ok, units = pooled[name].get(op, (0, 0)) if name == 'op_clean' else pooled[name]
+        return ok / units if units else 0.0
+
+    baseline = {'entryPct': value('entry_clean', '') * 100}
+    outcomes = {0: 0, 1: 0, 2: 0}
+    covered = dict.fromkeys(FLOORS, 0)
+    judged = 0
+    for seed in range(seeds):
+        drawn = make_sample(sample['features'], sample['size'], seed)
+        strata: dict[str, list] = {}
+        for pack, stratum in drawn['packs'].items():
+            if pack in rows:
+                strata.setdefault(stratum, []).append(rows[pack])
+        by_stratum = {
+            name: aggregate_keyed(sorted(keyed), manifests)
+            for name, keyed in strata.items()
+        }
+        verdict = render_sample(
+            by_stratum, drawn, manifests, prev=baseline
+        )
+        outcomes[verdict.code] += 1
+        if not any(line.startswith('SAMPLE ESTIMATE') for line in verdict.lines):
+            continue  # withheld by a gate: no intervals to check
+        judged += 1
+        for name, (_point, low, high, op) in sample_estimates(by_stratum, drawn).items():
+            covered[name] += low - 1e-9 <= value(name, op) <= high + 1e-9
+    verdict = 'PASS' if full.code == 0 else 'FAIL' if full.code == 1 else 'withheld'
+    lines = [
+        f'sample calibration: {seeds} samples of {sample["size"]} from'
+        f' {len(sample["features"])} JS packs, against this run\'s full verdict'
+        f' ({verdict})',
+        f'  provisional PASS {outcomes[0]}, sample FAIL {outcomes[1]},'
+        f' undecided or withheld {outcomes[2]}',
+        f'  disagreements: {outcomes[0] if full.code else 0} provisional PASS'
+        f' over a full FAIL or withheld, {0 if full.code else outcomes[1]}'
+        ' sample FAIL over a full PASS',
+        '  intervals covering the full value: '
+        + ', '.join(f'{name} {covered[name]}/{judged}' for name in FLOORS),
+    ]
+    return lines
+
+
+def criterion_values(agg: dict) -> dict[str, float]:
+    """Each PASS criterion's percentage as render() measures it; op_clean is
+    the worst operation's."""
+    counts = _criterion_counts(agg, sorted(agg['ops']))
+    values = {}
+    for name in FLOORS:
+        pairs = counts[name].values() if name == 'op_clean' else [counts[name]]
+        pcts = [ok / units * 100 if units else 0.0 for ok, units in pairs]
+        values[name] = min(pcts, default=0.0)
+    return values
+
+
+def simulate(
+    runs: list[tuple[dict[str, float], bool]],
+    grid: dict[str, list[float]],
+) -> Iterator[tuple[dict[str, float], int, int]]:
+    """(configuration, false alarms, misses) for every configuration in grid.
+
+    runs holds (criterion_values() plus 'delta', healthy) per labelled run;
+    delta is the entry-clean change against the previous healthy run, None
+    for the first. grid lists candidate values per FLOORS name and for
+    'tolerance'; a name left out keeps its current value.
+
+    Which runs clear a candidate is worked out once, as a bitset over the
+    runs. A configuration then costs one AND per criterion and two
+    popcounts: a false alarm is a healthy run it fails, a miss a broken
+    run it passes.
+    """
+    names = [*FLOORS, 'tolerance']
+    current = {**FLOORS, 'tolerance': DELTA_TOLERANCE}
+    candidates = [grid.get(name) or [current[name]] for name in names]
+    masks = []
+    for name, values in zip(names, candidates):
+        masks.append([])
+        for value in values:
+            mask = 0
+            for i, (measured, _healthy) in enumerate(runs):
+                if name == 'tolerance':
+                    held = measured['delta'] is None or measured['delta'] >= -value
+                else:
+                    held = measured[name] >= value
+                mask |= held << i
+            masks[-1].append(mask)
+    everyone = (1 << len(runs)) - 1
+    healthy = sum(1 << i for i, (_measured, ok) in enumerate(runs) if ok)
+    broken = everyone & ~healthy
+    for picks in itertools.product(*(range(len(values)) for values in candidates)):
+        passed = everyone
+        for mask, j in zip(masks, picks):
+            passed &= mask[j]
+        yield (
+            {name: values[j] for name, values, j in zip(names, candidates, picks)},
+            (healthy & ~passed).bit_count(),
+            (broken & passed).bit_count(),
+        )
+
+
+def _planned_packs(plans: dict[str, dict]) -> set[str] | None:
+    """Every pack the shards' one intact plan assigns; None without one."""
+    digests = set()
+    for plan in plans.values():
+        packs = plan.get('packs')
+        if not isinstance(packs, dict) or plan.get('digest') != plan_digest(
+            plan.get('shards'), packs
+        ):
+            return None
+        digests.add(plan['digest'])
+    if len(digests) != 1:
+        return None
+    return set(next(iter(plans.values()))['packs'])
+
+
+def render_partial(
+    agg: dict,
+    manifests: dict[str, dict],
+    completed: set[str],
+    expect_shards: int | None = None,
+    plans: dict[str, dict] | None = None,
+    stopped: bool = False,
+) -> Verdict:
+    """Whether the rows so far already decide the run, whatever the rest do.
+
+    completed names the packs with a finished row; every other pack of the
+    population is still to run. A stub is a pack still running, not a hang.
+    Each criterion gets its best case, the value it would reach if every
+    remaining pack came back perfect. When even that is below the floor, a
+    PASS is impossible and code is 1: a shard stops there. The FAIL is
+    certain when the harness gates are too - at least half the packs pass
+    the self-check even if every remaining one fails it, and the remaining
+    packs cannot outnumber the measured ones if they all hang. In a shard,
+    whose plan counts every other shard's packs as remaining, they rarely
+    are, so FAIL or withheld is left to the verdict job: with stopped set,
+    the remaining packs will never run, and the self-check gate reads only
+    the packs that did. When the best case cannot reach the harness gate,
+    or rows already drift from the schema, the verdict is certain to be
+    withheld and code is 2. Otherwise the run is still open and code is 0.
+
+    The population comes from the shard manifests once all expect_shards
+    are present. Before that it comes from the shard plan. A planned pack
+    with no manifest yet counts as measured, with an unknown number of entry
+    files, so entry-files-clean stays open until its shard has built. Every
+    guess errs toward PASS, so a certain breach holds for the finished run.
+    The delta gate needs the previous run and is left to the full verdict.
+    """
+    lines = []
+    if agg['missing']:
+        lines.append(
+            'ROW SCHEMA DRIFT: completed rows are missing fields this verdict'
+            ' reads, so the verdict is certain to be withheld:'
+        )
+        for key in EXPECTED_ROW_KEYS:
+            if key in agg['missing']:
+                packs = [pack for _key, pack in agg['missing'][key]]
+                lines.append(f'  {key}: {len(packs)} row(s): {_named(packs)}')
+        return Verdict(2, lines)
+
+    planned = _planned_packs(plans or {})
+    if expect_shards is not None and len(manifests) == expect_shards:
+        unbuilt: set[str] = set()
+    elif planned is not None:
+        accounted = {pack for manifest in manifests.values() for pack in manifest}
+        unbuilt = planned - accounted
+    else:
+        return Verdict(0, [
+            f'population not yet known: {len(manifests)} shard manifests'
+            f' of {expect_shards if expect_shards is not None else "?"},'
+            ' and no intact shard plan'
+        ])
+
+    built = {
+        pack: entry
+        for manifest in manifests.values()
+        for pack, entry in manifest.items()
+        if isinstance(entry, dict) and 'entries' in entry
+    }
+    remaining = [pack for pack in built if pack not in completed]
+    to_measure = [pack for pack in remaining if 'indeterminate' not in built[pack]]
+    left = len(remaining) + len(unbuilt)
+    left_measured = len(to_measure) + len(unbuilt)
+    left_entries = sum(
+        built[pack]['entries'] for pack in to_measure
+        if isinstance(built[pack]['entries'], int)
+    )
+
+    done = agg['measured']
+    best_done = done + left_measured
+    if not best_done:
+        return Verdict(0, [f'nothing measured yet, {left} packs to run'])
+
+    def best(ok: int, of: int, more: int = left_measured) -> float:
+        return (ok + more) / (of + more) * 100 if of + more else 0.0
+
+    def so_far(ok: int, of: int) -> str:
+        return f'{ok / of * 100:5.1f}%' if of else '    -'
+
+    self_best = best(agg['selfOk'], done)
+    worst_op, worst_pct, worst_now = '-', 100.0, (0, 0)
+    for op, counts in sorted(agg['ops'].items()):
+        clean = counts['seen'] - counts['bad']  # a missing op counts as bad
+        if best(clean, done) < worst_pct:
+            worst_op, worst_pct, worst_now = op, best(clean, done), (clean, done)
+    if not agg['ops'] and not left_measured:
+        worst_pct = 0.0
+    finished = agg['rows'] - agg['stubs']
+    criteria = [
+        ('any_loaded', CRITERION_LABELS['any_loaded'],
+         (agg['anyLoaded'], done), best(agg['anyLoaded'], done)),
+        ('entry_clean', CRITERION_LABELS['entry_clean'],
+         (agg['entriesOk'], agg['entries']),
+         100.0 if unbuilt else best(agg['entriesOk'], agg['entries'], left_entries)),
+    ]
+    for name, stage in (
+        ('register_node_def', 'registerNodeDef'),
+        ('register_custom_nodes', 'registerCustomNodes'),
+    ):
+        ok, measured = agg['stages'][stage]
+        criteria.append(
+            (name, CRITERION_LABELS[name], (ok, measured), best(ok, measured))
+        )
+    criteria += [
+        ('hook_free', CRITERION_LABELS['hook_free'],
+         (done - agg['hookPacks'], done), best(done - agg['hookPacks'], done)),
+        ('op_clean', f'{CRITERION_LABELS["op_clean"]} (worst: {worst_op})',
+         worst_now, worst_pct),
+        ('rows_complete', CRITERION_LABELS['rows_complete'],
+         (done + agg['indeterminate'], finished),
+         best(done + agg['indeterminate'], finished, left)),
+    ]
+
+    lines.append(
+        f'incremental verdict: {finished} rows finished, {left} packs still to'
+        ' run' + (f' ({len(unbuilt)} in shards not built yet)' if unbuilt else '')
+    )
+    lines.append(f'  {"criterion":42s} so far  best case')
+    breaches = []
+    for name, label, (ok, of), best_pct in criteria:
+        held = best_pct >= FLOORS[name]
+        lines.append(
+            f'  {label:42s} {so_far(ok, of)}  {best_pct:5.1f}%'
+            f'  (floor {FLOORS[name]:.0f}%)  {"open" if held else "BREACH CERTAIN"}'
+        )
+        if not held:
+            breaches.append(
+                f'{label} at most {best_pct:.1f}% < {FLOORS[name]:.0f}%'
+            )
+    if self_best < 50:
+        lines.append(
+            f'HARNESS FAILURE CERTAIN: at most {self_best:.1f}% of packs can'
+            ' pass the runner self-check. Verdict withheld.'
+        )
+        return Verdict(2, lines)
+    if not breaches:
+        lines.append('VERDICT: open - every criterion can still reach its floor')
+        return Verdict(0, lines)
+    self_worst = agg['selfOk'] / best_done * 100
+    if stopped:
+        # The packs left will never run: only the ones that did are judged.
+        self_ran = agg['selfOk'] / done * 100 if done else 0.0
+        if self_ran < 50:
+            lines.append(
+                f'HARNESS FAILURE: only {self_ran:.1f}% of the packs that ran'
+                ' pass the runner self-check. Verdict withheld.'
+            )
+            return Verdict(2, lines)
+    elif self_worst < 50 or left > done:
+        lines.append(
+            'VERDICT: PASS IMPOSSIBLE - ' + '; '.join(breaches)
+            + ' (FAIL or withheld is left to the verdict job: self-check at'
+            f' worst {self_worst:.1f}%, {left} packs could still hang against'
+            f' {done} measured)'
+        )
+        return Verdict(1, lines, breaches)
+    lines.append('VERDICT: FAIL CERTAIN - ' + '; '.join(breaches))
+    return Verdict(1, lines, breaches)
+
+
 def _read_json(path: str, label: str) -> object:
     try:
         with open(path, encoding='utf-8') as fh:
@@ -470,38 +1344,309 @@ def _read_json(path: str, label: str) -> object:
         return None
 
 
-def main() -> int:
-    out_dir = os.environ.get('MATRIX_OUT', '/tmp/matrix')
-    rows: list[dict] = []
-    manifests: dict[str, dict] = {}
-    unreadable_rows: list[str] = []
-    for name in sorted(os.listdir(out_dir) if os.path.isdir(out_dir) else []):
-        if not name.endswith('.json'):
-            continue
-        manifest = name.startswith('_manifest')
-        if name.startswith('_') and not manifest:
+def _note_completed(
+    keyed_rows: Iterable[tuple[str, dict]], completed: set[str]
+) -> Iterator[tuple[str, dict]]:
+    """keyed_rows as they come, adding each finished row's pack to completed."""
+    for key, r in keyed_rows:
+        if not r.get('incomplete'):
+            completed.add(r.get('pack'))
+        yield key, r
+
+
+def _keep_rows(
+    keyed_rows: Iterable[tuple[str, dict]], kept: dict[str, tuple[str, Row]]
+) -> Iterator[tuple[str, Row]]:
+    """keyed_rows as they come, parsed, keeping each in kept under its pack."""
+    for key, r in keyed_rows:
+        row = parse_row(r)
+        kept[str(row.pack)] = (key, row)
+        yield key, row
+
+
+def _one_sample(samples: dict[str, object]) -> dict | None:
+    """The sample every _sample file carries, or None when they are not one."""
+    digests = set()
+    for name, sample in sorted(samples.items()):
+        problem = check_sample(sample)
+        if problem:
+            print(f'{name}: {problem}', file=sys.stderr)
+            return None
+        digests.add(sample['digest'])
+    if len(digests) > 1:
+        print(f'{len(samples)} sample files name {len(digests)} samples', file=sys.stderr)
+        return None
+    return next(iter(samples.values()))
+
+
+def _judge_partial(verdict: Verdict, partial_out: str, stopped: list[str]) -> int:
+    """Report an incremental verdict; the exit code for main().
+
+    Polled (partial_out), a decided outcome is recorded there for the shard
+    to stop on and the verdict job to find. Over the merged rows of a run
+    that stopped early, only a decided outcome is a verdict.
+    """
+    lines = verdict.lines
+    code = verdict.code
+    if stopped:
+        lines = [
+            f'STOPPED EARLY: {_named(sorted(stopped))} - the packs left'
+            ' unrun are judged by their best case, not as hangs.',
+            '',
+            *lines,
+        ]
+        if not code:
+            lines.append(
+                '  A shard stopped on an outcome the merged rows do not'
+                ' confirm. Verdict withheld.'
+            )
+            code = 2
+    report = '\n'.join(lines)
+    print(report)
+    if partial_out and not stopped:
+        if code:
+            os.makedirs(os.path.dirname(partial_out) or '.', exist_ok=True)
+            with open(partial_out, 'w', encoding='utf-8') as fh:
+                json.dump(
+                    {'code': code, 'breaches': verdict.breaches, 'lines': lines},
+                    fh,
+                    indent=1,
+                )
+        return code
+    summary = os.environ.get('GITHUB_STEP_SUMMARY')
+    if summary:
+        with open(summary, 'a', encoding='utf-8') as fh:
+            fh.write('## Ecosystem matrix\n\n```\n' + report + '\n```\n')
+    return code
+
+
+def _shard_aggregates(
+    aggregates: dict[str, object], manifests: dict[str, dict], row_files: int
+) -> dict | None:
+    """The merged shard aggregates, or None when the rows must be read.
+
+    Every shard that left a manifest must have left an intact aggregate,
+    and between them they must account for every row file present.
+    """
+    if not aggregates:
+        return None
+    usable = [
+        agg
+        for agg in aggregates.values()
+        if isinstance(agg, dict) and agg.get('version') == AGGREGATE_VERSION
+    ]
+    problem = ''
+    if len(usable) != len(aggregates):
+        problem = 'unreadable or from another version'
+    elif len(usable) != len(manifests):
+        problem = f'{len(usable)} for {len(manifests)} shard manifests'
+    else:
+        try:
+            merged = merge(usable)
+        except (KeyError, TypeError, ValueError):
+            problem = 'malformed'
+        else:
+            counted = merged['rows'] + len(merged['unreadable'])
+            if counted == row_files:
+                return merged
+            problem = f'they count {counted} row files, {row_files} are present'
+    print(f'shard aggregates not used ({problem}): reading rows', file=sys.stderr)
+    return None
+
+
+def _run_aggregate(run_dir: str) -> tuple[dict, dict[str, dict]]:
+    """One stored run's aggregate and shard manifests, read as main() reads
+    a run: its shard aggregates when they account for every row file."""
+    files = scan_run(run_dir, skip=('_plan', '_sample'))
+    agg = _shard_aggregates(files.aggregates, files.manifests, len(row_names(run_dir)))
+    if agg is None:
+        unreadable: list[str] = []
+        agg = aggregate_keyed(read_rows(run_dir, unreadable), files.manifests)
+        agg['unreadable'] = unreadable
+    return agg, files.manifests
+
+
+def _sweep(text: str) -> tuple[str, list[float]]:
+    """NAME=LO:HI:STEP (or NAME=VALUE) as the candidate values it names."""
+    name, _, spec = text.partition('=')
+    if name not in FLOORS and name != 'tolerance':
+        raise argparse.ArgumentTypeError(f'no criterion {name!r}')
+    try:
+        parts = [float(part) for part in spec.split(':')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'not LO:HI:STEP: {spec!r}') from None
+    if len(parts) == 1:
+        return name, parts
+    if len(parts) != 3 or parts[2] <= 0 or parts[1] < parts[0]:
+        raise argparse.ArgumentTypeError(f'not LO:HI:STEP: {spec!r}')
+    low, high, step = parts
+    count = int((high - low) / step + 1e-9) + 1
+    return name, [round(low + i * step, 6) for i in range(count)]
+
+
+def simulate_main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(
+        prog='summarize_matrix.py --simulate',
+        description='False alarms and misses of floor configurations over'
+        ' labelled stored runs, each run aggregated once.',
+    )
+    ap.add_argument('runs', nargs='+', help='row directories, oldest first')
+    ap.add_argument(
+        '--labels', required=True,
+        help='JSON object: run directory (or its basename) -> PASS or FAIL',
+    )
+    ap.add_argument(
+        '--vary', action='append', type=_sweep, default=[], metavar='NAME=LO:HI:STEP',
+        help='candidate values for a criterion or tolerance (repeatable);'
+        ' default: every one from 1 below its current value to 0.5 above',
+    )
+    ap.add_argument('--top', type=int, default=10, help='configurations listed')
+    args = ap.parse_args(argv)
+
+    labels = _read_json(args.labels, 'run labels')
+    if not isinstance(labels, dict):
+        print(f'{args.labels} is not a JSON object of run labels', file=sys.stderr)
+        return 2
+    current = {**FLOORS, 'tolerance': DELTA_TOLERANCE}
+    grid = dict(args.vary) or {
+        name: [value - 1, value - 0.5, value, value + 0.5]
+        for name, value in current.items()
+    }
+
+    runs: list[tuple[dict[str, float], bool]] = []
+    names: list[str] = []
+    unlabelled, withheld = [], []
+    prev_entry = None
+    for run_dir in args.runs:
+        label = labels.get(run_dir) or labels.get(
+            os.path.basename(os.path.normpath(run_dir))
+        )
+        if label not in ('PASS', 'FAIL'):
+            unlabelled.append(run_dir)
             continue
-        label = 'shard manifest' if manifest else 'row'
-        data = _read_json(os.path.join(out_dir, name), label)
-        if not isinstance(data, dict):
-            if data is not None:
-                print(f'malformed {label}: {name}', file=sys.stderr)
-            if not manifest:
-                unreadable_rows.append(name)
+        agg, manifests = _run_aggregate(run_dir)
+        if agg['unreadable'] or render(agg, manifests).code == 2:
+            withheld.append(run_dir)
             continue
-        if manifest:
-            manifests[name] = data
-        else:
-            rows.append(data)
-    if unreadable_rows:
+        values: dict = criterion_values(agg)
+        values['delta'] = (
+            None if prev_entry is None else values['entry_clean'] - prev_entry
+        )
+        if label == 'PASS':
+            prev_entry = values['entry_clean']
+        runs.append((values, label == 'PASS'))
+        names.append(run_dir)
+    good = sum(ok for _values, ok in runs)
+    bad = len(runs) - good
+    lines = [f'floor simulation: {len(runs)} labelled runs ({good} PASS, {bad} FAIL)']
+    if withheld:
+        lines.append(f'  left out, withheld at the current floors: {_named(withheld)}')
+    if unlabelled:
+        lines.append(f'  left out, unlabelled: {_named(unlabelled)}')
+    if not runs:
+        print('\n'.join(lines))
+        return 2
+
+    def rate(count: int, of: int) -> str:
+        return f'{count} ({count / of * 100:.1f}%)' if of else str(count)
+
+    def distance(config: dict[str, float]) -> float:
+        return sum(abs(config[name] - current[name]) for name in current)
+
+    _config, alarms, misses = next(simulate(runs, {}))
+    configs = math.prod(len(grid.get(name) or [0]) for name in current)
+    started = time.perf_counter()
+    best = heapq.nsmallest(
+        args.top,
+        (
+            (fp + fn, distance(config), fp, fn, config)
+            for config, fp, fn in simulate(runs, grid)
+        ),
+        key=lambda b: b[:2],
+    )
+    elapsed = time.perf_counter() - started
+    lines.append(
+        f'{configs:,} configurations in {elapsed * 1000:.1f} ms'
+        f' ({elapsed / configs * 1e6:.2f} us each)'
+    )
+    lines.append(
+        f'current floors: false alarms {rate(alarms, good)} of {good} PASS runs,'
+        f' misses {rate(misses, bad)} of {bad} FAIL runs'
+    )
+    lines.append('best configurations (false alarms, misses; changes from current):')
+    for _errors, _distance, fp, fn, config in best:
+        changed = ', '.join(
+            f'{name} {config[name]:g}'
+            for name in current
+            if config[name] != current[name]
+        )
+        lines.append(f'  {fp:3d} {fn:3d}  {changed or "current"}')
+    print('\n'.join(lines))
+    return 0
+
+
+def main() -> int:
+    out_dir = os.environ.get('MATRIX_OUT', '/tmp/matrix')
+    aggregate_out = os.environ.get('MATRIX_AGGREGATE_OUT', '')
+    partial_out = os.environ.get('MATRIX_PARTIAL_OUT', '')
+    files = scan_run(out_dir, skip=('_aggregate',) if aggregate_out else ())
+    manifests = files.manifests
+    # An unreadable plan still counts: it must not read as absent.
+    plans = {
+        name: plan if isinstance(plan, dict) else {}
+        for name, plan in files.plans.items()
+    }
+    aggregates, samples, stopped = files.aggregates, files.samples, files.stopped
+
+    # A shard that stopped early left stubs for the packs it never ran, so
+    # the merged rows are judged the way that shard judged its own.
+    incremental = bool(partial_out or stopped) and not aggregate_out
+    calibrate_from = os.environ.get('MATRIX_CALIBRATE', '')
+    sample = None
+    if samples and not aggregate_out and not incremental:
+        sample = _one_sample(samples)
+        if sample is None:
+            return 2
+    # The sample's strata and calibration's re-drawn samples regroup rows by
+    # pack, so both read every row and keep it.
+    keep = sample is not None or bool(calibrate_from)
+    agg = None if aggregate_out or incremental or keep else _shard_aggregates(
+        aggregates, manifests, len(row_names(out_dir))
+    )
+    completed: set[str] = set()
+    kept: dict[str, tuple[str, Row]] = {}
+    if agg is None:
+        unreadable_rows: list[str] = []
+        keyed_rows = _note_completed(read_rows(out_dir, unreadable_rows), completed)
+        if keep:
+            keyed_rows = _keep_rows(keyed_rows, kept)
+        agg = aggregate_keyed(keyed_rows, manifests)
+        agg['unreadable'] = unreadable_rows
+
+    if aggregate_out:
+        # A shard's share of the verdict: its rows reduced to counters the
+        # verdict job merges instead of parsing every row again.
+        os.makedirs(os.path.dirname(aggregate_out) or '.', exist_ok=True)
+        with open(aggregate_out, 'w', encoding='utf-8') as fh:
+            json.dump(agg, fh, separators=(',', ':'))
         print(
-            f'{len(unreadable_rows)} row file(s) unreadable, so every rate'
+            f'aggregated {agg["rows"]} rows ({len(agg["unreadable"])} unreadable)'
+            f' into {aggregate_out}',
+            file=sys.stderr,
+        )
+        return 0
+
+    # Judged incrementally, a row that does not parse may still be being
+    # written: it is one more pack to run, not a short denominator.
+    if agg['unreadable'] and not incremental:
+        print(
+            f'{len(agg["unreadable"])} row file(s) unreadable, so every rate'
             ' would be measured over a short denominator:'
-            f' {unreadable_rows[:10]}',
+            f' {agg["unreadable"][:10]}',
             file=sys.stderr,
         )
         return 2
-    if not rows:
+    if not agg['rows']:
         print(f'no matrix rows in {out_dir}', file=sys.stderr)
         return 2
 
@@ -513,12 +1658,63 @@ def main() -> int:
         )
         return 2
 
+    if calibrate_from:
+        drawn = _read_json(calibrate_from, 'sample')
+        problem = check_sample(drawn)
+        if problem:
+            print(f'sample {calibrate_from}: {problem}', file=sys.stderr)
+            return 2
+        seeds_raw = os.environ.get('MATRIX_CALIBRATE_SEEDS', '20')
+        if not seeds_raw.isdigit():
+            print(
+                f'MATRIX_CALIBRATE_SEEDS is not a count: {seeds_raw!r}',
+                file=sys.stderr,
+            )
+            return 2
+        report = '\n'.join(calibrate(kept, manifests, drawn, int(seeds_raw)))
+        print(report)
+        summary = os.environ.get('GITHUB_STEP_SUMMARY')
+        if summary:
+            with open(summary, 'a', encoding='utf-8') as fh:
+                fh.write('## Sample calibration\n\n```\n' + report + '\n```\n')
+        return 0
+
+    if incremental:
+        return _judge_partial(
+            render_partial(
+                agg, manifests, completed,
+                int(expect_raw) if expect_raw else None, plans, bool(stopped),
+            ),
+            partial_out,
+            stopped,
+        )
+
     prev_path = os.environ.get('MATRIX_PREV', '')
     prev = (
         _read_json(prev_path, 'previous metrics')
         if prev_path and os.path.exists(prev_path)
         else None
     )
+    rolling_raw = os.environ.get('MATRIX_ROLLING', '')
+    if rolling_raw and not rolling_raw.isdigit():
+        print(f'MATRIX_ROLLING is not a run count: {rolling_raw!r}', file=sys.stderr)
+        return 2
+    rolling = int(rolling_raw or 0)
+    history_db = os.environ.get('MATRIX_HISTORY_DB', '')
+    if rolling and history_db and os.path.exists(history_db):
+        # One extra: this run's earlier attempt may be the newest.
+        with CensusStore(history_db) as store:
+            history = store.recent_metrics(rolling + 1)
+        if history:
+            if isinstance(prev, dict) and prev.get('runId') == history[0].get('runId'):
+                # The history keeps no per-pack tables; the newest run's
+                # signatures come from its own metrics file.
+                history[0] = {**prev, **history[0]}
+            prev = history
+        else:
+            rolling = 0  # nothing recorded yet: MATRIX_PREV alone
+    else:
+        rolling = 0
 
     marker = os.environ.get('MATRIX_STALE_MARKER', '')
     stale = (
@@ -529,14 +1725,35 @@ def main() -> int:
     if marker and os.path.exists(marker) and not isinstance(stale, dict):
         stale = {'reason': 'marker present but unreadable'}
 
-    verdict = evaluate(
-        rows,
-        manifests,
-        prev,
-        os.environ.get('MATRIX_RUN_ID', ''),
-        int(expect_raw) if expect_raw else None,
-        stale,
-    )
+    if sample is not None:
+        strata: dict[str, list] = {}
+        for pack, keyed in kept.items():
+            strata.setdefault(sample['packs'].get(pack, '?'), []).append(keyed)
+        verdict = render_sample(
+            {
+                name: aggregate_keyed(sorted(rows), manifests)
+                for name, rows in strata.items()
+            },
+            sample,
+            manifests,
+            int(expect_raw) if expect_raw else None,
+            stale,
+            plans,
+            prev,
+            os.environ.get('MATRIX_RUN_ID', ''),
+            rolling,
+        )
+    else:
+        verdict = render(
+            agg,
+            manifests,
+            prev,
+            os.environ.get('MATRIX_RUN_ID', ''),
+            int(expect_raw) if expect_raw else None,
+            stale,
+            plans,
+            rolling,
+        )
 
     report = '\n'.join(verdict.lines)
     print(report)
@@ -555,4 +1772,6 @@ def main() -> int:
 
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['--simulate']:
+        raise SystemExit(simulate_main(sys.argv[2:]))
     raise SystemExit(main())
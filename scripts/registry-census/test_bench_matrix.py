@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Unit tests for the sensitivity bench.
+
+    python3 -m unittest discover -s scripts/registry-census
+
+bench_matrix.py sensitivity is the evidence that each criterion can breach at
+all. A mutation that stopped damaging what it claims to, or a bisection that
+found the wrong point, would print a reassuring table over a blind gate.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bench_matrix as bm
+import summarize_matrix as sm
+
+
+def clean_rows(n: int) -> list[dict]:
+    """n rows with nothing wrong: every rate is 100%."""
+    rnd = random.Random(0)
+    rows = []
+    for i in range(n):
+        r = bm.synthetic_row(rnd, f'pack-{i:04d}')
+        while r.get('incomplete'):
+            r = bm.synthetic_row(rnd, f'pack-{i:04d}')
+        r['load'] = dict.fromkeys(r['load'], 'OK')
+        r['loadedOk'] = len(r['load'])
+        for info in r['ops'].values():
+            info['err'] = info['desync'] = ''
+        rows.append(r)
+    return rows
+
+
+def mutate_all(rows: list[dict], mutate, op: str = 'bypass') -> dict[int, dict]:
+    mutated = {}
+    for i, r in enumerate(rows):
+        changed = mutate(r, op)
+        if changed is not None:
+            mutated[i] = sm.parse_row(changed)
+    return mutated
+
+
+def no_sig_table(lines: list[str]) -> list[str]:
+    return [line for line in lines if 'signature' not in line]
+
+
+class DamagedAggregates(unittest.TestCase):
+    def test_a_merged_population_judges_like_the_whole(self):
+        rows = clean_rows(40)
+        mutated = mutate_all(rows, bm._stub)
+        order = sorted(mutated)
+        random.Random(1).shuffle(order)
+        population = bm.damaged_aggregates(rows, mutated, order)
+        for k in (0, 1, 5, 6, 7, 23, 40):
+            damaged = list(rows)
+            for i in order[:k]:
+                damaged[i] = mutated[i]
+            whole = sm.evaluate(damaged, {})
+            merged = sm.render(population(k), {})
+            self.assertEqual(merged.code, whole.code, k)
+            self.assertEqual(merged.breaches, whole.breaches, k)
+            self.assertEqual(no_sig_table(merged.lines), no_sig_table(whole.lines), k)
+
+    def test_signatures_are_not_carried(self):
+        rows = clean_rows(9)
+        population = bm.damaged_aggregates(rows, mutate_all(rows, bm._stub), [2, 4])
+        self.assertEqual(population(1)['sigs'], [])
+        self.assertEqual(population(1)['rows'], 9)
+
+
+class FlipPoint(unittest.TestCase):
+    def test_the_fewest_packs_that_breach(self):
+        # hook_free floors at 98%: 3 packs of 100 with a hook error breach.
+        rows = clean_rows(100)
+        mutated = mutate_all(rows, bm._hook_error)
+        order = list(range(100))
+        random.Random(0).shuffle(order)
+        flip = bm.flip_point(rows, mutated, order, bm.judge('hook_free', {}))
+        self.assertEqual(flip, (3, 'breach'))
+
+    def test_a_withheld_verdict_is_reported_as_such(self):
+        # Failing the self-check breaches nothing the judge looks for; past
+        # half the packs the verdict is withheld instead.
+        rows = clean_rows(100)
+        mutated = {
+            i: sm.parse_row({**r, 'selfCheck': 'FAIL'}) for i, r in enumerate(rows)
+        }
+        flip = bm.flip_point(rows, mutated, list(range(100)), bm.judge('hook_free', {}))
+        self.assertEqual(flip, (51, 'withheld'))
+
+    def test_damage_that_never_stops_the_pass(self):
+        rows = clean_rows(100)
+        mutated = mutate_all(rows, bm._hook_error)
+        self.assertIsNone(
+            bm.flip_point(rows, mutated, [0, 1], bm.judge('hook_free', {}))
+        )
+        self.assertIsNone(bm.flip_point(rows, mutated, [], bm.judge('hook_free', {})))
+
+
+class Mutations(unittest.TestCase):
+    def test_each_mutation_breaches_the_criterion_it_targets(self):
+        rows = clean_rows(200)
+        clean = sm.evaluate(rows, {})
+        self.assertEqual(clean.code, 0)
+        for name, criterion, mutate in bm.MUTATIONS:
+            with self.subTest(name=name, criterion=criterion):
+                mutated = mutate_all(rows, mutate)
+                order = sorted(mutated)
+                outcome = bm.judge(criterion, clean.metrics)
+                flip = bm.flip_point(rows, mutated, order, outcome)
+                self.assertIsNotNone(flip)
+                k, how = flip
+                self.assertEqual(how, 'breach')
+                # One pack fewer still passes: the damage, not the noise,
+                # breached.
+                self.assertEqual(
+                    outcome(bm.damaged_aggregates(rows, mutated, order)(k - 1)), ''
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,10 +5,60 @@ from __future__ import annotations
 import os
 import tempfile
 import unittest
+from contextlib import redirect_stderr
+from io import StringIO
+from unittest import mock
 
 import build_matrix
 
 
+def write(path: str, text: str = '') -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as fh:
+        fh.write(text)
+
+
+def read(path: str) -> str:
+    with open(path, encoding='utf-8') as fh:
+        return fh.read()
+
+
+def tree(root: str) -> dict[str, str]:
+    """Every file under root but the build profile, which carries timings."""
+    return {
+        os.path.relpath(os.path.join(d, f), root): read(os.path.join(d, f))
+        for d, _dirs, files in os.walk(root)
+        for f in files
+        if f != build_matrix.BUILD_PROFILE
+    }
+
+
+class Fixture:
+    """A throwaway corpus plus a DEST to build it into."""
+
+    def __init__(self, tmp: str) -> None:
+        self.corpus = os.path.join(tmp, 'corpus')
+        self.dest = os.path.join(tmp, 'dest')
+        os.makedirs(self.corpus)
+
+    def pack(self, pack: str, files: dict[str, str]) -> None:
+        for rel, text in files.items():
+            write(os.path.join(self.corpus, pack, rel), text)
+
+    def build(self, **kwargs: object) -> dict:
+        with (
+            mock.patch.object(build_matrix, 'REPOS', self.corpus),
+            mock.patch.object(build_matrix, 'DEST', self.dest),
+            mock.patch.object(build_matrix, 'assert_runner_copy_depth'),
+            redirect_stderr(StringIO()),
+        ):
+            build_matrix.build(**kwargs)
+        return build_matrix.json.loads(read(os.path.join(self.dest, 'manifest.json')))
+
+
+ENTRY = 'import { app } from "../../scripts/app.js"\napp.registerExtension({})\n'
+
+
 class PackRootAnchor(unittest.TestCase):
     def test_source_web_directory_does_not_depend_on_copy_order(self) -> None:
         with tempfile.TemporaryDirectory() as tmp:
@@ -35,5 +85,564 @@ class PackRootAnchor(unittest.TestCase):
             self.assertEqual(build_matrix.packroot_anchor(src, dst, entry), dst)
 
 
+class Rewrite(unittest.TestCase):
+    SOURCES = [
+        'import { app } from "../../scripts/app.js"\n'
+        "import { $el } from '../../../scripts/ui.js'\n"
+        'import { ComfyDialog } from "/scripts/ui/dialog.js"\n'
+        'import "./../../extensions/core/widgetInputs.js"\n'
+        'const m = await import("../../scripts/lib/x.y.js")\n',
+        'import { rgthreeConfig } from "../../rgthree/config.js"\n'
+        "import { x } from '../../../rgthree/common/utils.js'\n"
+        'import { app } from "../../scripts/app.js"\n',
+        # quote kinds must agree; an unterminated or relative path is left alone
+        'import a from "../../scripts/app.js\'\nimport b from "./scripts/app.js"\n',
+        '"scripts/app.js" and extensions/core/ mentioned in prose, no import',
+        'nothing to rewrite here',
+    ]
+
+    def test_fused_rewrite_matches_applying_rules_in_sequence(self) -> None:
+        rewriter = build_matrix.Rewriter()
+        for text in self.SOURCES:
+            with self.subTest(text=text[:40]):
+                self.assertEqual(
+                    rewriter.rewrite(text), build_matrix.rewrite_sequential(text)
+                )
+
+    def test_assisted_counts_only_packs_whose_rule_fired(self) -> None:
+        rewriter = build_matrix.Rewriter()
+        _text, fired = rewriter.rewrite(self.SOURCES[1])
+        _text, quiet = rewriter.rewrite(self.SOURCES[0])
+
+        self.assertEqual(fired, {'rgthree'})
+        self.assertEqual(quiet, set())
+
+    def test_edits_reproduce_the_rewrite_and_map_in_utf16_units(self) -> None:
+        rewriter = build_matrix.Rewriter()
+        for text in self.SOURCES:
+            with self.subTest(text=text[:40]):
+                edits = rewriter.edits(text)
+                self.assertEqual(
+                    build_matrix.apply_edits(text, edits), rewriter.rewrite(text)[0]
+                )
+
+        text = '// \U0001f680 launch\nimport { app } from "../../scripts/app.js"\n'
+        [[offset, old, new]] = build_matrix.rewrite_map(text, rewriter.edits(text))
+
+        utf16 = text.encode('utf-16-le')
+        self.assertEqual(utf16[offset * 2 :].decode('utf-16-le')[: len(old)], old)
+        self.assertEqual((old, new), ('"../../scripts/app.js"', '"@/scripts/app"'))
+
+    def test_rules_must_start_at_a_quote(self) -> None:
+        with self.assertRaises(ValueError):
+            build_matrix.Rewriter([(build_matrix.re.compile('scripts/'), '')], [])
+
+
+class EntrySites(unittest.TestCase):
+    CASES = {
+        'app.registerExtension({ name: "x" })': ['call registerExtension'],
+        'LiteGraph.registerNodeType("a", B)': ['call registerNodeType'],
+        '({ async beforeRegisterNodeDef(nodeType) { } })': [
+            'method beforeRegisterNodeDef'
+        ],
+        '({ beforeRegisterNodeDef: async function (n) {} })': [
+            'key beforeRegisterNodeDef'
+        ],
+        'ext.beforeRegisterNodeDef = f': ['property beforeRegisterNodeDef'],
+        '`${app.registerExtension({})}`': ['call registerExtension'],
+        '`a${ { b: `c${d}` }.b }e`; app.registerExtension({})': [
+            'call registerExtension'
+        ],
+        'x = a / registerExtension / b\nrs.registerExtension(e)': [
+            'call registerExtension'
+        ],
+        '// app.registerExtension({})': [],
+        '/* registerExtension */ x()': [],
+        'const s = "app.registerExtension(x)"': [],
+        'const t = `app.registerExtension(${a})`': [],
+        'if (/registerExtension\\(/.test(s)) return /registerNodeType/': [],
+        'function registerExtension(e) {}': [],
+        'import { registerExtension } from "./a.js"': [],
+        'import app, { x, registerNodeType as r } from "./a.js"': [],
+        'import type { registerExtension } from "./a"\nexport { registerNodeType }': [],
+        'f({ a, registerExtension })': ['key registerExtension'],
+        'export default { registerExtension, b }': ['key registerExtension'],
+        'x = { a: 1, registerExtension: f }': ['key registerExtension'],
+        'const { registerExtension } = app': [],
+        'let { a: b, registerExtension: r } = app': [],
+        '({ registerExtension } = app)': [],
+        'c ? registerExtension : x': [],
+        # A regex literal after the ')' of an if or a loop, not a division.
+        'if (x) /"/.test(s); app.registerExtension({})': ['call registerExtension'],
+        'while (a(b)) /\'/.test(s) && app.registerExtension({})': [
+            'call registerExtension'
+        ],
+        'x = f(a) / 2 / "registerExtension"': [],
+        # A quote the lexer mis-read loses nothing past it.
+        'x = f(a) /"/.test(s); app.registerExtension({})': ['call registerExtension'],
+    }
+
+    def test_only_uses_as_code_count(self) -> None:
+        for text, sites in self.CASES.items():
+            with self.subTest(text=text):
+                self.assertEqual(build_matrix.entry_sites(text), sites)
+
+    def test_a_file_naming_the_api_only_in_prose_is_not_an_entry(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            fx.pack(
+                'p',
+                {
+                    'web/main.js': ENTRY,
+                    'web/notes.js': '// call app.registerExtension() from main.js\n',
+                },
+            )
+
+            entry = fx.build(workers=1)['p']
+
+        self.assertEqual(entry['entries'], 1)
+        self.assertEqual(entry['entryReasons'], {'web/main.js': ['call registerExtension']})
+        self.assertEqual(entry['entryMentionsOnly'], 1)
+
+
+class Reachable(unittest.TestCase):
+    def test_only_files_the_entries_can_load_are_kept(self) -> None:
+        js = {
+            'web/main.js': (
+                "import { a } from './lib/a.js'\n"
+                "export * from './lib/b'\n"
+                "import './style.css'\n"
+                "const c = await import('./lazy.mjs')\n"
+                "const icon = new URL('../assets/icon.svg', import.meta.url)\n"
+                "import { app } from '@/scripts/app'\n"
+            ),
+            'web/lib/a.js': "import data from './data.json'\n",
+            'web/lib/b/index.js': '',
+            'web/lazy.mjs': '',
+            'web/unused.js': "import './lib/a.js'\n",
+        }
+        assets = {
+            'web/style.css': 'x', 'web/lib/data.json': 'x',
+            'assets/icon.svg': 'x', 'web/unused.css': 'x',
+        }
+
+        keep, unresolved, whole = build_matrix.reachable(['web/main.js'], js, assets)
+
+        self.assertEqual(
+            keep,
+            set(js) - {'web/unused.js'} | set(assets) - {'web/unused.css'},
+        )
+        self.assertEqual((unresolved, whole), ([], ''))
+
+    def test_unresolvable_specifiers_are_reported(self) -> None:
+        js = {
+            'web/main.js': (
+                "import './missing.js'\n"
+                "import '/extensions/other/x.js'\n"
+                "import '../../../outside.js'\n"
+            )
+        }
+        keep, unresolved, _whole = build_matrix.reachable(['web/main.js'], js, {})
+
+        self.assertEqual(keep, {'web/main.js'})
+        self.assertEqual(
+            unresolved,
+            [
+                "web/main.js: ../../../outside.js",
+                "web/main.js: ./missing.js",
+                "web/main.js: /extensions/other/x.js",
+            ],
+        )
+
+    def test_a_computed_dynamic_import_stages_the_whole_pack(self) -> None:
+        js = {
+            'web/main.js': "import './router.js'\n",
+            'web/router.js': 'export const load = (n) => import(`./views/${n}.js`)\n',
+            'web/views/a.js': '',
+        }
+        keep, _unresolved, whole = build_matrix.reachable(
+            ['web/main.js'], js, {'web/x.png': 'x'}
+        )
+
+        self.assertEqual(keep, set(js) | {'web/x.png'})
+        self.assertEqual(whole, 'web/router.js')
+
+
+class StageAsset(unittest.TestCase):
+    def test_asset_bytes_arrive_whichever_mode_works(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'style.css')
+            write(src, 'body { color: red }')
+            out = os.path.join(tmp, 'staged.css')
+            with mock.patch.object(
+                build_matrix, '_share_modes', ['reflink', 'hardlink']
+            ):
+                mode = build_matrix.stage_asset(src, out)
+
+            self.assertIn(mode, ('reflink', 'hardlink', 'copy'))
+            self.assertEqual(read(out), 'body { color: red }')
+
+    def test_unshareable_filesystem_falls_back_to_a_copy_once(self) -> None:
+        cross_device = OSError(build_matrix.errno.EXDEV, 'cross-device link')
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, 'a.svg')
+            write(src, '<svg/>')
+            modes = ['reflink', 'hardlink']
+            with (
+                mock.patch.object(build_matrix, '_share_modes', modes),
+                mock.patch.object(build_matrix, '_reflink', side_effect=cross_device),
+                mock.patch.object(build_matrix.os, 'link', side_effect=cross_device),
+            ):
+                first = build_matrix.stage_asset(src, os.path.join(tmp, 'b.svg'))
+                second = build_matrix.stage_asset(src, os.path.join(tmp, 'c.svg'))
+
+            self.assertEqual((first, second), ('copy', 'copy'))
+            self.assertEqual(modes, [])
+            self.assertEqual(read(os.path.join(tmp, 'c.svg')), '<svg/>')
+
+
+class Build(unittest.TestCase):
+    def test_pooled_build_matches_a_serial_build(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            for i in range(12):
+                fx.pack(f'pack-{i}', {'web/main.js': ENTRY, 'web/util.js': 'x'})
+            fx.pack('no-js', {'web/readme.json': '{}'})
+
+            serial = fx.build(workers=1)
+            serial_tree = tree(fx.dest)
+            pooled = fx.build(workers=3, clean=True)
+
+            self.assertEqual(list(pooled), list(serial))
+            self.assertEqual(pooled, serial)
+            self.assertEqual(tree(fx.dest), serial_tree)
+            self.assertEqual(serial['no-js'], {'skipped': 'no extension-shaped JS'})
+            staged = os.path.join(
+                fx.dest, 'packs', build_matrix.safe_name('pack-0'), 'web', 'main.js'
+            )
+            self.assertIn('"@/scripts/app"', read(staged))
+
+    def test_shards_of_one_plan_partition_the_corpus(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            for i in range(6):
+                fx.pack(f'pack-{i}', {'web/main.js': ENTRY + 'x' * 1000 * i})
+            fx.pack('no-js', {'web/readme.json': '{}'})
+            plan_path = os.path.join(tmp, 'plan.json')
+            first = fx.build(workers=1, shard='1/2')
+            build_matrix.shutil.copy(os.path.join(fx.dest, 'plan.json'), plan_path)
+            second = fx.build(workers=1, shard='2/2', plan_path=plan_path)
+
+            self.assertEqual(set(first) | set(second), {
+                *(f'pack-{i}' for i in range(6)), 'no-js'
+            })
+            self.assertFalse(set(first) & set(second))
+            with self.assertRaises(SystemExit):
+                fx.build(workers=1, shard='1/3', plan_path=plan_path)
+
+    def test_a_sample_builds_its_packs_and_covers_every_module(self) -> None:
+        rare = 'import "../../extensions/core/widgetInputs.js"\n'
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            for i in range(8):
+                fx.pack(f'pack-{i}', {'web/main.js': ENTRY + (rare if i == 5 else '')})
+            fx.pack('no-js', {'web/readme.json': '{}'})
+            sample_path = os.path.join(tmp, 'sample.json')
+            with mock.patch.object(build_matrix, 'registry_downloads', return_value={}):
+                drawn = fx.build(workers=1, sample=3)
+                build_matrix.shutil.copy(
+                    os.path.join(fx.dest, 'sample.json'), sample_path
+                )
+                again = fx.build(workers=1, sample=3, sample_path=sample_path)
+                with self.assertRaises(SystemExit):
+                    fx.build(workers=1, sample=4, sample_path=sample_path)
+                with self.assertRaises(SystemExit):
+                    fx.build(workers=1, sample=3, shard='1/2')
+
+            sample = build_matrix.json.loads(read(sample_path))
+            self.assertEqual(sorted(drawn), sorted(sample['packs']))
+            self.assertEqual(len(drawn), 3)
+            self.assertIn('pack-5', drawn)
+            self.assertEqual(sample['modules']['@/extensions/core/widgetInputs'], [1, 1])
+            self.assertNotIn('no-js', sample['features'])
+            self.assertEqual(again, drawn)
+
+    def test_rebuild_restages_only_changed_packs_and_drops_orphans(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            for name in ('same', 'edited', 'gone'):
+                fx.pack(name, {'web/main.js': ENTRY, 'web/old.js': 'x'})
+            first = fx.build(workers=1)
+            staged = os.path.join(fx.dest, 'packs', build_matrix.safe_name('same'))
+            marker = os.path.join(staged, 'web', 'marker.txt')
+            write(marker, 'a reused pack is left as staged')
+
+            os.remove(os.path.join(fx.corpus, 'edited', 'web', 'old.js'))
+            fx.pack(
+                'edited',
+                {'web/main.js': ENTRY + 'import "./new.js"\n', 'web/new.js': 'y'},
+            )
+            build_matrix.shutil.rmtree(os.path.join(fx.corpus, 'gone'))
+            second = fx.build(workers=1)
+            incremental = tree(fx.dest)
+            fx.build(workers=1, clean=True)
+
+            self.assertEqual(second['same'], first['same'])
+            self.assertIn(os.path.relpath(marker, fx.dest), incremental)
+            edited = os.path.join(fx.dest, 'packs', build_matrix.safe_name('edited'))
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(edited, 'web'))), ['main.js', 'new.js']
+            )
+            self.assertNotIn('gone', second)
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(fx.dest, 'packs'))),
+                sorted(build_matrix.safe_name(p) for p in ('same', 'edited')),
+            )
+            incremental.pop(os.path.relpath(marker, fx.dest))
+            self.assertEqual(incremental, tree(fx.dest))
+
+    def test_corpus_serve_stages_maps_instead_of_pack_files(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            fx.pack('a', {'web/main.js': ENTRY, 'web/util.js': 'x', 'web/a.png': 'p'})
+            copied = fx.build(workers=1)
+            served = fx.build(workers=1, serve='corpus')
+            safe = build_matrix.safe_name('a')
+
+            self.assertEqual(served['a']['entries'], copied['a']['entries'])
+            self.assertFalse(os.listdir(os.path.join(fx.dest, 'packs')))
+            index = build_matrix.json.loads(
+                read(os.path.join(fx.dest, build_matrix.SERVE_INDEX))
+            )
+            self.assertEqual(index['packs'][safe]['root'], os.path.join(fx.corpus, 'a'))
+            files = build_matrix.json.loads(
+                read(os.path.join(fx.dest, index['packs'][safe]['map']))
+            )['files']
+            self.assertEqual(
+                files['web/main.js'], [[20, '"../../scripts/app.js"', '"@/scripts/app"']]
+            )
+            spec = read(os.path.join(fx.dest, f'{safe}.matrix.test.ts'))
+            self.assertIn(f'{build_matrix.SERVE_PREFIX}{safe}/web/main.js', spec)
+
+            fx.build(workers=1)
+            self.assertFalse(os.path.exists(os.path.join(fx.dest, 'serve.json')))
+
+    def test_batched_specs_run_every_pack_once_with_an_unchanged_manifest(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            for i in range(5):
+                fx.pack(f'tiny-{i}', {'web/main.js': ENTRY})
+            fx.pack('big', {f'web/m{i}.js': ENTRY for i in range(30)})
+            single = fx.build(workers=1)
+            batched = fx.build(workers=1, batch_ms=20_000)
+            specs = sorted(
+                f for f in os.listdir(fx.dest) if f.endswith('.matrix.test.ts')
+            )
+            batch_text = read(os.path.join(fx.dest, 'batch-001.matrix.test.ts'))
+            shared = build_matrix.json.loads(read(os.path.join(fx.dest, 'batches.json')))
+            fx.build(workers=1)
+
+            self.assertEqual(batched, single)
+            self.assertEqual(
+                specs, ['batch-001.matrix.test.ts', 'big.matrix.test.ts']
+            )
+            self.assertEqual(
+                sorted(shared['batch-001']),
+                [build_matrix.safe_name(f'tiny-{i}') for i in range(5)],
+            )
+            self.assertEqual(batch_text.count('await runPack('), 5)
+            self.assertEqual(batch_text.count('vi.resetModules()'), 1)
+            self.assertFalse(os.path.exists(os.path.join(fx.dest, 'batches.json')))
+            self.assertNotIn('batch-001.matrix.test.ts', os.listdir(fx.dest))
+
+    def test_a_pack_defining_a_custom_element_is_never_batched(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            for i in range(3):
+                fx.pack(f'tiny-{i}', {'web/main.js': ENTRY})
+            fx.pack(
+                'widget',
+                {
+                    'web/main.js': ENTRY + 'import "./el.js"\n',
+                    'web/el.js': "customElements.define('x-w', class {})\n",
+                },
+            )
+            manifest = fx.build(workers=1, batch_ms=20_000)
+            specs = sorted(
+                f for f in os.listdir(fx.dest) if f.endswith('.matrix.test.ts')
+            )
+            batch_text = read(os.path.join(fx.dest, 'batch-001.matrix.test.ts'))
+
+        self.assertEqual(manifest['widget']['unbatchable'], 'customElements.define')
+        self.assertNotIn('unbatchable', manifest['tiny-0'])
+        self.assertEqual(specs, ['batch-001.matrix.test.ts', 'widget.matrix.test.ts'])
+        self.assertEqual(batch_text.count('await runPack('), 3)
+        # Between packs: timers, listeners, globals and prototypes, head.
+        for reset in (
+            'happyDOM?.abort()',
+            'removeEventListener',
+            'restore(owner, was)',
+            'document.head.replaceChildren(...head)',
+        ):
+            self.assertIn(reset, batch_text)
+
+    def test_vendor_index_decides_by_content_not_by_name(self) -> None:
+        library = '/*! lib */\n' + 'var x = 1;\n' * 200
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            for i in range(3):
+                fx.pack(
+                    f'pack-{i}',
+                    {
+                        'web/main.js': ENTRY
+                        + f'import "./lib/renamed{i}.js"\nimport "./jquery-helpers.js"\n',
+                        f'web/lib/renamed{i}.js': library,
+                        'web/jquery-helpers.js': ENTRY,
+                    },
+                )
+            index_path = os.path.join(tmp, 'vendor-index.json')
+            with mock.patch.object(build_matrix, 'REPOS', fx.corpus):
+                index = build_matrix.write_vendor_index(index_path, workers=1)
+            by_name = fx.build(workers=1)
+            by_content = fx.build(workers=1, vendor_index=index_path)
+
+            self.assertEqual(
+                [lib['name'] for lib in index['libraries'].values()], ['renamed0.js']
+            )
+            self.assertEqual(by_name['pack-0']['entries'], 1)
+            self.assertEqual(by_content['pack-0']['entries'], 2)
+            self.assertEqual(by_content['pack-0']['files'], 2)
+            staged = os.path.join(
+                fx.dest, 'packs', build_matrix.safe_name('pack-0'), 'web', 'lib'
+            )
+            self.assertEqual(os.listdir(staged), ['renamed0.js'])
+
+    def test_bundles_that_mention_the_api_stay_libraries(self) -> None:
+        litegraph = (
+            '/*! litegraph */\nvar LiteGraph = {};\n'
+            'LiteGraph.registerNodeType = function (t, c) {};\n'
+            + 'var x = 1;\n' * 200
+            + 'LiteGraph.registerNodeType("graph/subgraph", Subgraph);\n'
+        )
+        # One pack's own build: too few copies to index, named as a bundle.
+        chunks = (
+            'var f = (n) => import("./chunk-" + n + ".js");\nregisterNodeType(a, b)\n'
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            for i in range(4):
+                fx.pack(
+                    f'pack-{i}',
+                    {
+                        'web/main.js': ENTRY + 'import "./lib/litegraph.core.js"\n',
+                        'web/lib/litegraph.core.js': litegraph,
+                        'web/vendor/bundle.min.js': chunks + f'// {i}\n',
+                        'web/ext.min.js': ENTRY,
+                    },
+                )
+            index_path = os.path.join(tmp, 'vendor-index.json')
+            with mock.patch.object(build_matrix, 'REPOS', fx.corpus):
+                index = build_matrix.write_vendor_index(index_path, workers=1)
+            built = fx.build(workers=1, vendor_index=index_path)
+
+            self.assertEqual(
+                [lib['name'] for lib in index['libraries'].values()],
+                ['litegraph.core.js'],
+            )
+            self.assertEqual(built['pack-0']['entries'], 2)  # main.js, ext.min.js
+            self.assertEqual(
+                sorted(built['pack-0']['entryReasons']), ['web/ext.min.js', 'web/main.js']
+            )
+
+    def test_profile_accounts_for_bytes_and_rule_hits(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            for i in range(3):
+                fx.pack(f'p{i}', {'web/main.js': ENTRY, 'web/a.png': 'png'})
+            fx.pack('no-js', {'web/x.js': 'plain'})
+            fx.build(workers=1)
+            fx.build(workers=1)  # everything reused
+            reused = build_matrix.json.loads(
+                read(os.path.join(fx.dest, build_matrix.BUILD_PROFILE))
+            )
+            fx.build(workers=1, clean=True)
+            profile = build_matrix.json.loads(
+                read(os.path.join(fx.dest, build_matrix.BUILD_PROFILE))
+            )
+
+        self.assertEqual((profile['packs'], profile['rebuilt']), (4, 4))
+        self.assertEqual(profile['perPack']['p0']['bytesRead'], len(ENTRY))
+        self.assertEqual(profile['perPack']['p0']['bytesRewritten'], len(ENTRY))
+        self.assertEqual(profile['perPack']['no-js']['bytesRead'], len('plain'))
+        self.assertEqual(profile['ruleHits']['"@/scripts/app"'], 3)
+        self.assertEqual(profile['ruleHits']['"@/scripts/api"'], 0)
+        self.assertEqual(len(profile['slowest']), 4)
+        self.assertEqual(reused['rebuilt'], 0)
+        self.assertEqual(reused['slowest'], [])
+        self.assertTrue(reused['perPack']['p1']['reused'])
+
+    def test_rewrite_cache_replays_scans_with_identical_output(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            fx.pack('a', {'web/main.js': ENTRY, 'web/util.js': 'export const x = 1'})
+            fx.pack('b', {'web/main.js': ENTRY})
+            fx.pack('c', {'web/readme.js': '// call app.registerExtension() here'})
+            cache = os.path.join(tmp, 'rewrites.json.gz')
+            fx.build(workers=1)
+            plain = tree(fx.dest)
+            profiles = []
+            for _ in range(2):
+                fx.build(workers=1, clean=True, rewrite_cache=cache)
+                profiles.append(
+                    build_matrix.json.loads(
+                        read(os.path.join(fx.dest, build_matrix.BUILD_PROFILE))
+                    )['totals']
+                )
+                self.assertEqual(tree(fx.dest), plain)
+            rules = build_matrix.rewrite_digest()
+            files = build_matrix.load_cache(cache, rules)
+
+        # a and b ship the same main.js: one entry, looked up by both packs
+        self.assertEqual(len(files), 2)
+        self.assertEqual(sorted(v[1] for v in files.values()), [[], ['call registerExtension']])
+        counts = [(p.get('rewriteHits', 0), p.get('rewriteMisses', 0)) for p in profiles]
+        self.assertEqual(counts, [(0, 3), (3, 0)])
+
+    def test_a_lexer_version_bump_drops_cached_sites(self) -> None:
+        digests = (build_matrix.rewrite_digest(), build_matrix.rules_digest(''))
+
+        with mock.patch.object(build_matrix, 'LEXER_VERSION', 0):
+            bumped = (build_matrix.rewrite_digest(), build_matrix.rules_digest(''))
+
+        self.assertNotEqual(digests[0], bumped[0])
+        self.assertNotEqual(digests[1], bumped[1])
+
+    def test_a_lexer_table_change_drops_cached_sites(self) -> None:
+        digests = (build_matrix.rewrite_digest(), build_matrix.rules_digest(''))
+        changes = {
+            'SPECIFIERS_RX': build_matrix.re.compile(r'[\w$\s,]*'),
+            'REGEX_AFTER_PAREN': {'if'},
+        }
+        for name, value in changes.items():
+            with self.subTest(name=name), mock.patch.object(build_matrix, name, value):
+                self.assertNotEqual(build_matrix.rewrite_digest(), digests[0])
+                self.assertNotEqual(build_matrix.rules_digest(''), digests[1])
+
+    def test_rule_or_template_change_rebuilds_every_pack(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            fx = Fixture(tmp)
+            fx.pack('a', {'web/main.js': ENTRY})
+            fx.build(workers=1)
+            key = build_matrix.json.loads(
+                read(os.path.join(fx.dest, build_matrix.BUILD_CACHE))
+            )['packs']['a']['key']
+
+            with mock.patch.object(build_matrix, 'ENTRY_CAP', 59):
+                fx.build(workers=1)
+
+            cache = read(os.path.join(fx.dest, build_matrix.BUILD_CACHE))
+            self.assertNotIn(key, cache)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import census_diff as cd
+
+
+def side(registry=None, pins=None, lock=None) -> cd.Side:
+    return cd.Side(registry, pins, lock)
+
+
+class Diff(unittest.TestCase):
+    def test_each_change_lands_in_its_own_category(self) -> None:
+        before = side(
+            {'a': 'r/a', 'b': 'r/b', 'c': 'r/c', 'gone': 'r/g'},
+            {'a': '1' * 40, 'b': '2' * 40},
+            {
+                'a': {'etag': 'e1', 'ref': '1' * 40, 'status': 'ok'},
+                'b': {'etag': 'e2', 'ref': '2' * 40, 'status': 'ok'},
+                'c': {'status': 'failed'},
+            },
+        )
+        after = side(
+            {'a': 'r/a', 'b': 'r/b2', 'c': 'r/c', 'new': 'r/n'},
+            {'a': '1' * 40, 'b': '3' * 40},
+            {
+                'a': {'etag': 'e1b', 'ref': '1' * 40, 'status': 'ok'},
+                'b': {'etag': 'e3', 'ref': '3' * 40, 'status': 'ok'},
+                'c': {'status': 'ok', 'ref': 'HEAD'},
+            },
+        )
+
+        result = cd.diff(before, after)
+
+        self.assertEqual(result['added'], ['new'])
+        self.assertEqual(result['removed'], ['gone'])
+        self.assertEqual(
+            result['repoChanged'], [{'id': 'b', 'before': 'r/b', 'after': 'r/b2'}]
+        )
+        self.assertEqual(
+            [m['id'] for m in result['refMoved']], ['b', 'c']
+        )
+        self.assertEqual(result['refMoved'][0]['pin'], ['2' * 40, '3' * 40])
+        self.assertEqual([m['id'] for m in result['etagMoved']], ['a', 'b'])
+        self.assertEqual(
+            result['statusChanged'],
+            [{'id': 'c', 'before': 'failed', 'after': 'ok'}],
+        )
+        self.assertEqual(result['compared'], ['registry', 'pins', 'lock'])
+
+    def test_a_facet_missing_on_one_side_is_not_compared(self) -> None:
+        before = side(pins={'a': 'x'}, lock={'a': {'etag': 'e1'}})
+        after = side(pins={'a': 'x'})
+
+        result = cd.diff(before, after)
+
+        self.assertEqual(result['compared'], ['pins'])
+        self.assertEqual(result['counts'], dict.fromkeys(cd.CATEGORIES, 0))
+
+    def test_packs_only_a_one_sided_facet_knows_are_not_removed(self) -> None:
+        before = side(
+            {'a': 'r/a'}, {'a': 'x'}, {'a': {'etag': 'e1'}, 'b': {'etag': 'e2'}}
+        )
+        after = side(pins={'a': 'x'})
+
+        result = cd.diff(before, after)
+
+        self.assertEqual(result['compared'], ['pins'])
+        self.assertEqual(result['removed'], [])
+        self.assertEqual(result['packs'], {'before': 1, 'after': 1})
+
+    def test_pin_bump_summary_names_moved_packs(self) -> None:
+        result = cd.diff(
+            side(pins={'a': 'a' * 40, 'b': 'b' * 40}),
+            side(pins={'a': 'c' * 40, 'new': 'd' * 40}),
+        )
+        text = cd.markdown(result, 'Corpus pin bump')
+
+        self.assertIn('1 added, 1 removed', text)
+        self.assertIn('`a` pin aaaaaaaa -> cccccccc', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
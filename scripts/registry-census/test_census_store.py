@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import census_store
+import fetch_corpus
+import matrix_rows
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as fh:
+        return fh.read()
+
+
+class RoundTrip(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp = tempfile.TemporaryDirectory()
+        self.tmp = self.temp.name
+        self.store = census_store.CensusStore(os.path.join(self.tmp, 'c.sqlite'))
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self.temp.cleanup()
+
+    def test_lockfile_exports_byte_for_byte(self) -> None:
+        lock = {
+            'b-pack': {'etag': 'W/"e2"', 'ref': 'a' * 40, 'status': 'ok'},
+            'a-pack': {'status': 'failed', 'detail': 'http 404 curl 22'},
+            'ünï': {'status': 'empty', 'ref': 'HEAD'},
+        }
+        original = os.path.join(self.tmp, 'original.json')
+        with mock.patch.object(fetch_corpus, 'LOCKFILE', original):
+            fetch_corpus.write_lockfile(lock)
+        self.store.replace_lock(lock)
+
+        exported = os.path.join(self.tmp, 'exported.json')
+        self.store.export_lock(exported)
+
+        self.assertEqual(read_bytes(exported), read_bytes(original))
+
+    def test_registry_and_ready_marker_export_byte_for_byte(self) -> None:
+        snapshot = [
+            {'downloads': 12.5, 'id': 'a', 'repo': 'https://github.com/o/a'},
+            {'downloads': 0, 'id': 'b', 'repo': ''},
+        ]
+        original = os.path.join(self.tmp, 'registry.json')
+        with open(original, 'w', encoding='utf-8') as fh:
+            json.dump(snapshot, fh, indent=0, sort_keys=True)
+        ready = os.path.join(self.tmp, 'ready.json')
+        with mock.patch.object(fetch_corpus, 'READY_MARKER', ready):
+            fetch_corpus.write_ready_marker(1, 2, 1, 1)
+        with open(ready, encoding='utf-8') as fh:
+            self.store.put_meta(census_store.READY_KEY, json.load(fh))
+        self.store.replace_registry(list(reversed(snapshot)))
+
+        self.store.export_registry(os.path.join(self.tmp, 'out.json'))
+        self.store.export_markers(
+            os.path.join(self.tmp, 'ready-out.json'),
+            os.path.join(self.tmp, 'stale-out.json'),
+        )
+
+        self.assertEqual(
+            read_bytes(os.path.join(self.tmp, 'out.json')), read_bytes(original)
+        )
+        self.assertEqual(
+            read_bytes(os.path.join(self.tmp, 'ready-out.json')),
+            read_bytes(ready),
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, 'stale-out.json')))
+
+    def test_fetch_results_commit_per_pack(self) -> None:
+        result = fetch_corpus.Fetched('pack', 'ok', 'e1', '', 'HEAD')
+        self.store.record_fetch(
+            'run-1', 'pack', 'ok', '', 'e1', 'HEAD', 0.5,
+            fetch_corpus.lock_entry({'status': 'failed', 'detail': 'x'}, result),
+        )
+
+        # A second connection sees it without the writer closing: committed.
+        other = census_store.CensusStore(self.store.path)
+        try:
+            self.assertEqual(
+                other.lock(), {'pack': {'etag': 'e1', 'ref': 'HEAD', 'status': 'ok'}}
+            )
+        finally:
+            other.close()
+
+    def test_row_text_is_kept_verbatim(self) -> None:
+        text = '{"pack":"p","safe":"p","ops":{},"load":{"./a.js":"OK"}}'
+        self.assertTrue(self.store.upsert_row('run-1', 'p.json', text))
+        self.assertFalse(self.store.upsert_row('run-1', 'bad.json', '{'))
+
+        out = os.path.join(self.tmp, 'rows')
+        self.assertEqual(self.store.export_rows('run-1', out), 1)
+        self.assertEqual(read_bytes(os.path.join(out, 'p.json')), text.encode())
+
+    def test_packed_rows_import_like_loose_ones(self) -> None:
+        out = os.path.join(self.tmp, 'rows')
+        os.makedirs(out)
+        for pack in ('a', 'b', 'c'):
+            with open(os.path.join(out, f'{pack}.json'), 'w', encoding='utf-8') as fh:
+                json.dump({'pack': pack, 'load': {'./a.js': 'OK'}}, fh, indent=1)
+        with open(os.path.join(out, 'torn.json'), 'w', encoding='utf-8') as fh:
+            fh.write('{')
+        loose = census_store.import_rows(self.store, 'run-1', out)
+        matrix_rows.pack_rows(out, 'shard-1')
+
+        packed = census_store.import_rows(self.store, 'run-2', out)
+
+        self.assertEqual(loose, (3, 1))
+        self.assertEqual(packed, (3, 1))
+        self.assertEqual(
+            self.store.export_rows('run-1', os.path.join(self.tmp, 'one')),
+            self.store.export_rows('run-2', os.path.join(self.tmp, 'two')),
+        )
+        self.assertEqual(
+            read_bytes(os.path.join(self.tmp, 'one', 'b.json')),
+            read_bytes(os.path.join(self.tmp, 'two', 'b.json')),
+        )
+
+
+class Regressed(unittest.TestCase):
+    def test_regressions_are_ordered_by_downloads(self) -> None:
+        def row(pack: str, ok: int, err: str = '') -> str:
+            return json.dumps(
+                {
+                    'pack': pack,
+                    'load': {'./a.js': 'OK' if ok else 'THREW', './b.js': 'OK'},
+                    'loadedOk': ok + 1,
+                    'hookErrors': [],
+                    'ops': {'load': {'err': err, 'desync': ''}},
+                }
+            )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with census_store.CensusStore(os.path.join(tmp, 'c.sqlite')) as store:
+                store.replace_registry(
+                    [
+                        {'id': 'small', 'repo': 'r', 'downloads': 10},
+                        {'id': 'big', 'repo': 'r', 'downloads': 9000},
+                        {'id': 'steady', 'repo': 'r', 'downloads': 50},
+                    ]
+                )
+                for pack in ('small', 'big', 'steady'):
+                    store.upsert_row('run-1', f'{pack}.json', row(pack, 1))
+                store.upsert_row('run-2', 'small.json', row('small', 0))
+                store.upsert_row('run-2', 'big.json', row('big', 1, 'boom'))
+                store.upsert_row('run-2', 'steady.json', row('steady', 1))
+
+                found = store.regressed('run-2', 'run-1')
+
+        self.assertEqual([r[0] for r in found], ['big', 'small'])
+
+
+class MetricsHistory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp = tempfile.TemporaryDirectory()
+        self.store = census_store.CensusStore(os.path.join(self.temp.name, 'c.sqlite'))
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self.temp.cleanup()
+
+    def test_history_is_append_only(self) -> None:
+        first = {'runId': 'run-1', 'entryPct': 94.0, 'verdict': 'PASS'}
+
+        self.assertTrue(self.store.record_metrics(first, recorded=100.0))
+        self.assertFalse(
+            self.store.record_metrics({**first, 'entryPct': 10.0}, recorded=200.0)
+        )
+        self.assertEqual(self.store.run_metrics('run-1'), first)
+        self.assertIsNone(self.store.run_metrics('run-2'))
+
+    def test_per_pack_tables_stay_out_of_the_history(self) -> None:
+        metrics = {
+            'runId': 'run-1', 'entryPct': 94.0, 'verdict': 'PASS',
+            'sigHashes': {'p': 'abc'}, 'opSigs': {'ops': [], 'packs': {}},
+        }
+
+        self.store.record_metrics(metrics)
+
+        self.assertEqual(
+            self.store.run_metrics('run-1'),
+            {'runId': 'run-1', 'entryPct': 94.0, 'verdict': 'PASS'},
+        )
+
+    def test_recent_passing_runs_come_newest_first(self) -> None:
+        for i, verdict in enumerate(('PASS', 'PASS', 'FAIL', 'PASS')):
+            self.store.record_metrics(
+                {'runId': f'run-{i}', 'entryPct': 90.0 + i, 'verdict': verdict},
+                recorded=1000.0 + i,
+            )
+
+        recent = self.store.recent_metrics(2)
+
+        self.assertEqual([m['runId'] for m in recent], ['run-3', 'run-1'])
+        self.assertEqual(
+            [m['runId'] for m in self.store.recent_metrics(5, before=1003.0)],
+            ['run-1', 'run-0'],
+        )
+
+    def test_trend_reads_one_metric_over_a_date_range(self) -> None:
+        day = census_store._day('2026-03-01')
+        for i in range(5):
+            self.store.record_metrics(
+                {'runId': f'run-{i}', 'anyPct': 97.0 + i / 10, 'verdict': 'PASS'},
+                recorded=day + i * 86400,
+            )
+
+        found = self.store.trend('anyPct', day + 86400, day + 3 * 86400)
+
+        self.assertEqual(
+            found, [('run-1', day + 86400, 97.1), ('run-2', day + 2 * 86400, 97.2)]
+        )
+        self.assertEqual(self.store.trend('entryPct')[0][2], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import matrix_rows as mr
+
+
+def write_rows(out: str, packs: list[str]) -> None:
+    for pack in packs:
+        with open(os.path.join(out, f'{pack}.json'), 'w', encoding='utf-8') as fh:
+            json.dump({'pack': pack, 'ops': {'load': {'sig': pack}}}, fh)
+
+
+def read_all(out: str) -> tuple[list[tuple[str, dict]], list[str]]:
+    unreadable: list[str] = []
+    with contextlib.redirect_stderr(io.StringIO()):
+        rows = list(mr.read_rows(out, unreadable))
+    return rows, unreadable
+
+
+class PackRows(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.out = tmp.name
+
+    def test_packed_rows_read_as_the_directory_did(self) -> None:
+        write_rows(self.out, ['b', 'a', 'c'])
+        with open(os.path.join(self.out, 'torn.json'), 'w', encoding='utf-8') as fh:
+            fh.write('{"pack": ')
+        loose = read_all(self.out)
+
+        self.assertEqual(mr.pack_rows(self.out, 'shard-1'), (3, 1))
+
+        self.assertEqual(
+            sorted(os.listdir(self.out)),
+            ['_rows-shard-1.index.json', '_rows-shard-1.jsonl'],
+        )
+        self.assertEqual(read_all(self.out), loose)
+        self.assertEqual(loose[1], ['torn.json'])
+        self.assertEqual(
+            mr.row_names(self.out), ['a.json', 'b.json', 'c.json', 'torn.json']
+        )
+
+    def test_any_row_is_one_seek_away(self) -> None:
+        write_rows(self.out, [f'p{i:03d}' for i in range(50)])
+        mr.pack_rows(self.out, 'shard-1')
+
+        self.assertEqual(mr.read_row(self.out, 'p031.json')['pack'], 'p031')
+        self.assertIsNone(mr.read_row(self.out, 'p999.json'))
+
+    def test_shards_and_loose_rows_merge_in_name_order(self) -> None:
+        write_rows(self.out, ['a', 'd'])
+        mr.pack_rows(self.out, 'shard-1')
+        write_rows(self.out, ['b', 'e'])
+        mr.pack_rows(self.out, 'shard-2')
+        write_rows(self.out, ['c'])
+
+        rows, unreadable = read_all(self.out)
+
+        self.assertEqual(
+            [name for name, _ in rows],
+            ['a.json', 'b.json', 'c.json', 'd.json', 'e.json'],
+        )
+        self.assertEqual(unreadable, [])
+
+    def test_packing_again_appends_and_the_newest_row_wins(self) -> None:
+        write_rows(self.out, ['a', 'b'])
+        mr.pack_rows(self.out, 'shard-1')
+        jsonl = os.path.join(self.out, '_rows-shard-1.jsonl')
+        size = os.path.getsize(jsonl)
+        with open(os.path.join(self.out, 'a.json'), 'w', encoding='utf-8') as fh:
+            json.dump({'pack': 'a', 'rerun': True}, fh)
+
+        self.assertEqual(mr.read_row(self.out, 'a.json'), {'pack': 'a', 'rerun': True})
+        mr.pack_rows(self.out, 'shard-1')
+
+        self.assertGreater(os.path.getsize(jsonl), size)
+        self.assertEqual(mr.read_row(self.out, 'a.json'), {'pack': 'a', 'rerun': True})
+        self.assertEqual(len(read_all(self.out)[0]), 2)
+
+    def test_an_unreadable_index_is_not_an_empty_shard(self) -> None:
+        write_rows(self.out, ['a'])
+        mr.pack_rows(self.out, 'shard-1')
+        write_rows(self.out, ['b'])
+        index = os.path.join(self.out, '_rows-shard-1.index.json')
+        with open(index, 'w', encoding='utf-8') as fh:
+            fh.write('{')
+
+        rows, unreadable = read_all(self.out)
+
+        self.assertEqual([name for name, _ in rows], ['b.json'])
+        self.assertEqual(unreadable, ['_rows-shard-1.index.json'])
+
+    def test_an_index_is_parsed_once_until_it_is_rewritten(self) -> None:
+        write_rows(self.out, ['a'])
+        mr.pack_rows(self.out, 'shard-1')
+        index = os.path.join(self.out, '_rows-shard-1.index.json')
+
+        first = mr.load_index(index)
+        self.assertIs(mr.load_index(index), first)
+        write_rows(self.out, ['b'])
+        mr.pack_rows(self.out, 'shard-1')
+
+        self.assertIsNot(mr.load_index(index), first)
+        self.assertEqual(sorted(mr.load_index(index)['rows']), ['a.json', 'b.json'])
+        self.assertEqual(sorted(first['rows']), ['a.json'])
+
+
+class ParallelReads(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.out = tmp.name
+
+    def test_the_pool_reads_what_one_thread_reads_in_the_same_order(self) -> None:
+        write_rows(self.out, [f'p{i:03d}' for i in range(97)])
+        for name, text in (('p040.json', '{"pack": '), ('p041.json', '[1]'),
+                           ('p042.json', '[' * 100000)):
+            with open(os.path.join(self.out, name), 'w', encoding='utf-8') as fh:
+                fh.write(text)
+
+        results = []
+        for workers in (1, 4):
+            unreadable: list[str] = []
+            with contextlib.redirect_stderr(io.StringIO()):
+                rows = list(mr.read_rows(self.out, unreadable, workers))
+            results.append((rows, unreadable))
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(results[0][0]), 94)
+        self.assertEqual(results[0][1], ['p040.json', 'p041.json', 'p042.json'])
+
+    def test_side_files_are_filed_by_kind(self) -> None:
+        docs = {
+            '_manifest-shard-1.json': {'a': {}},
+            '_manifest-shard-2.json': [],
+            '_plan-shard-1.json': {'shards': 1},
+            '_aggregate-shard-1.json': {'rows': 1},
+            '_sample.json': {'packs': {}},
+            '_stopped-shard-1.json': {},
+        }
+        for name, doc in docs.items():
+            with open(os.path.join(self.out, name), 'w', encoding='utf-8') as fh:
+                json.dump(doc, fh)
+        with open(os.path.join(self.out, '_plan-shard-2.json'), 'w',
+                  encoding='utf-8') as fh:
+            fh.write('{')
+        write_rows(self.out, ['a'])
+
+        err = io.StringIO()
+        with contextlib.redirect_stderr(err):
+            files = mr.scan_run(self.out, skip=('_aggregate',))
+
+        self.assertEqual(files.manifests, {'_manifest-shard-1.json': {'a': {}}})
+        self.assertEqual(
+            files.plans,
+            {'_plan-shard-1.json': {'shards': 1}, '_plan-shard-2.json': None},
+        )
+        self.assertEqual(files.aggregates, {})
+        self.assertEqual(files.samples, {'_sample.json': {'packs': {}}})
+        self.assertEqual(files.stopped, ['_stopped-shard-1.json'])
+        self.assertIn('malformed shard manifest: _manifest-shard-2.json', err.getvalue())
+        self.assertIn('unreadable shard plan', err.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import rewrite_cache as rc
+
+FILES = {'b' * 40: [[], None], 'a' * 40: [[[1, 9, '"@/scripts/app"', '', 'r']], []]}
+
+
+class Cache(unittest.TestCase):
+    def test_round_trip_writes_the_same_bytes_for_the_same_results(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            one, two = os.path.join(tmp, 'one.gz'), os.path.join(tmp, 'two.gz')
+            rc.write_cache(one, 'rules', FILES)
+            rc.write_cache(two, 'rules', dict(reversed(FILES.items())))
+
+            self.assertEqual(rc.load_cache(one, 'rules'), FILES)
+            with open(one, 'rb') as a, open(two, 'rb') as b:
+                self.assertEqual(a.read(), b.read())
+            self.assertEqual(sorted(os.listdir(tmp)), ['one.gz', 'two.gz'])  # no .tmp left
+
+    def test_other_rules_or_a_damaged_file_read_as_empty(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.gz')
+            rc.write_cache(path, 'rules', FILES)
+            self.assertEqual(rc.load_cache(path, 'other rules'), {})
+
+            with open(path, 'r+b') as fh:
+                fh.truncate(20)
+            rc.load_cache.cache_clear()
+            self.assertEqual(rc.load_cache(path, 'rules'), {})
+            self.assertEqual(rc.load_cache(os.path.join(tmp, 'absent.gz'), 'rules'), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import sample_plan as sp
+
+
+def corpus(n: int = 400) -> dict[str, list]:
+    """n packs of 1 to 9 entries; @/rare is imported by one pack."""
+    features = {
+        f'p{i:03d}': [1 + i % 9, (i * 37) % 1000, ['@/scripts/app']]
+        for i in range(n)
+    }
+    features['p123'][2] = ['@/rare', '@/scripts/app']
+    return features
+
+
+class MakeSample(unittest.TestCase):
+    def test_sample_is_a_pure_function_of_its_inputs(self) -> None:
+        features = corpus()
+
+        first = sp.make_sample(features, 40, seed=3)
+        second = sp.make_sample(dict(reversed(features.items())), 40, seed=3)
+
+        self.assertEqual(first, second)
+        self.assertEqual(sp.check_sample(first), '')
+        self.assertNotEqual(first['packs'], sp.make_sample(features, 40, 4)['packs'])
+
+    def test_every_module_and_every_bucket_is_covered(self) -> None:
+        features = corpus()
+        features['p999'] = [40, 0, []]  # the only 10+ pack
+
+        sample = sp.make_sample(features, 5)
+
+        self.assertEqual(sample['packs']['p123'], sp.COVERED)
+        self.assertEqual(sample['packs']['p999'], '10+')
+        self.assertEqual(sample['modules']['@/rare'], [1, 1])
+        self.assertEqual(
+            {name.split()[0] for name in sample['strata']},
+            {'1', '2-3', '4-9', '10+', 'covered'},
+        )
+        self.assertEqual(sample['strata']['covered']['population'], 1)
+
+    def test_strata_are_filled_in_proportion(self) -> None:
+        sample = sp.make_sample(corpus(), 120)
+
+        self.assertEqual(len(sample['packs']), 120)
+        for name, stratum in sample['strata'].items():
+            share = stratum['population'] / 400 * 120
+            self.assertLessEqual(abs(stratum['sampled'] - share), 1.5, name)
+
+    def test_downloads_choose_a_stratum_not_a_likelihood(self) -> None:
+        features = {f'p{i:03d}': [1, 1, []] for i in range(200)}
+        for i in range(0, 200, 5):
+            features[f'p{i:03d}'][1] = 3
+
+        sample = sp.make_sample(features, 50)
+
+        self.assertEqual(
+            sample['strata'],
+            {
+                '1': {'population': 160, 'entries': 160, 'sampled': 40},
+                '1 popular': {'population': 40, 'entries': 40, 'sampled': 10},
+            },
+        )
+
+    def test_the_estimate_holds_when_popular_packs_fare_better(self) -> None:
+        # Popular packs all pass; half the rest fail: 60% pass overall.
+        features = {f'p{i:03d}': [1, 1 + 100 * (i < 40), []] for i in range(200)}
+        passes = {p for p in features if int(p[1:]) < 40 or int(p[1:]) % 2}
+
+        estimates = []
+        for seed in range(200):
+            sample = sp.make_sample(features, 40, seed)
+            parts = [
+                (
+                    stratum['population'] / 200,
+                    sum(s == name and p in passes for p, s in sample['packs'].items()),
+                    stratum['sampled'],
+                )
+                for name, stratum in sample['strata'].items()
+            ]
+            estimates.append(sp.stratified(parts)[0])
+
+        self.assertAlmostEqual(sum(estimates) / len(estimates), 0.6, delta=0.02)
+
+    def test_an_edited_sample_is_refused(self) -> None:
+        sample = sp.make_sample(corpus(), 20)
+        sample['packs']['p000'] = '1'
+
+        self.assertIn('digest', sp.check_sample(sample))
+        self.assertIn('version', sp.check_sample({'packs': {}}))
+
+
+class Intervals(unittest.TestCase):
+    def test_wilson_stays_inside_the_unit_interval(self) -> None:
+        low, high = sp.wilson(1.0, 80)
+
+        self.assertAlmostEqual(low, 80 / (80 + sp.Z**2))
+        self.assertEqual(high, 1.0)
+        self.assertEqual(sp.wilson(0.5, 0), (0.0, 1.0))
+
+    def test_strata_combine_by_population_share(self) -> None:
+        est, low, high = sp.stratified([(0.9, 10, 10), (0.1, 0, 10), (0.5, 0, 0)])
+
+        self.assertAlmostEqual(est, 0.9)
+        self.assertLess(low, est)
+        self.assertGreater(high, est)
+        # Unequal weights leave fewer effective units than the 20 sampled.
+        self.assertGreater(high - low, sp.wilson(0.9, 20)[1] - sp.wilson(0.9, 20)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import shard_plan as sp
+
+
+class Assign(unittest.TestCase):
+    def test_longest_first_balances_what_round_robin_does_not(self) -> None:
+        costs = {'a-huge': 60_000, 'b': 5_000, 'c': 5_000, 'd': 5_000}
+        costs.update({f'e{i:02d}': 4_000 for i in range(12)})
+
+        plan = sp.assign(costs, 4)
+
+        loads = [0] * 4
+        for pack, shard in plan.items():
+            loads[shard - 1] += costs[pack]
+        self.assertEqual(sorted(plan), sorted(costs))
+        self.assertEqual(max(loads), 60_000)  # the huge pack alone
+        self.assertEqual(plan['a-huge'], 1)
+        self.assertEqual(
+            [p for p, s in plan.items() if s == 1], ['a-huge'],
+        )
+
+    def test_plan_is_a_pure_function_of_its_inputs(self) -> None:
+        estimates = {f'p{i:03d}': (i % 7, i * 1000) for i in range(200)}
+        runtimes = {'p010': 9000, 'p011': 100}
+
+        first = sp.make_plan(estimates, runtimes, 4)
+        second = sp.make_plan(dict(reversed(estimates.items())), runtimes, 4)
+
+        self.assertEqual(first, second)
+        self.assertEqual(first['digest'], sp.plan_digest(4, first['packs']))
+
+
+class Predict(unittest.TestCase):
+    def test_measured_runtimes_win_and_scale_the_estimates(self) -> None:
+        estimates = {'measured': (1, 0), 'guessed': (1, 0), 'skipped': (0, 500)}
+        base = sp.estimate_ms(1, 0)
+
+        costs = sp.predict(estimates, {'measured': round(base * 3)})
+
+        self.assertEqual(costs['measured'], round(base * 3))
+        self.assertEqual(costs['guessed'], round(base * 3))
+        self.assertEqual(costs['skipped'], 0)
+
+    def test_runtimes_come_from_metrics_pack_ms(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'metrics.json')
+            with open(path, 'w', encoding='utf-8') as fh:
+                json.dump({'packMs': {'a': 1200, 'b': 'x', 'c': -1}}, fh)
+
+            self.assertEqual(sp.load_runtimes(path), {'a': 1200})
+            self.assertEqual(sp.load_runtimes(os.path.join(tmp, 'none')), {})
+
+
+class Batch(unittest.TestCase):
+    def test_cheap_packs_share_files_and_expensive_ones_run_alone(self) -> None:
+        costs = {f'tiny{i:02d}': 1_000 for i in range(20)}
+        costs.update({'mid': 6_000, 'huge': 90_000})
+
+        groups = sp.batch(costs, 10_000, most=8)
+
+        self.assertEqual(sorted(p for g in groups for p in g), sorted(costs))
+        self.assertEqual(groups[-1], ['huge'])
+        self.assertEqual([len(g) for g in groups[:-1]], [8, 8, 5])
+        self.assertTrue(all(sum(costs[p] for p in g) <= 10_000 for g in groups[:-1]))
+
+    def test_no_budget_keeps_one_pack_per_file(self) -> None:
+        self.assertEqual(sp.batch({'b': 5, 'a': 9}, 0), [['a'], ['b']])
+
+
+class CheckPlan(unittest.TestCase):
+    def test_plan_must_match_shard_count_digest_and_corpus(self) -> None:
+        plan = sp.make_plan({'a': (1, 10), 'b': (2, 10)}, {}, 2)
+
+        self.assertEqual(sp.check_plan(plan, 2, ['a', 'b']), '')
+        self.assertIn('not 3', sp.check_plan(plan, 3, ['a', 'b']))
+        self.assertIn('disagree', sp.check_plan(plan, 2, ['a', 'b', 'c']))
+        tampered = dict(plan, packs={'a': 1, 'b': 1})
+        self.assertIn('digest', sp.check_plan(tampered, 2, ['a', 'b']))
+
+
+if __name__ == '__main__':
+    unittest.main()
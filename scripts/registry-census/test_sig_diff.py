@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import matrix_rows
+import sig_diff
+import summarize_matrix as sm
+
+
+def sig(*nodes: dict, links: int = 0) -> str:
+    return json.dumps({'n': len(nodes), 'l': links, 'nodes': list(nodes)})
+
+
+def node(node_id: int, wn: str = 'seed=number', **over: object) -> dict:
+    return {
+        'id': node_id, 'type': 'KSampler', 'mode': 0, 'collapsed': False,
+        'widgets': len(wn.split(',')), 'wn': wn, 'in': [1], 'out': [0], **over,
+    }
+
+
+def write_rows(out: str, sigs: dict[str, dict[str, str]]) -> None:
+    os.makedirs(out, exist_ok=True)
+    for pack, ops in sigs.items():
+        with open(os.path.join(out, f'{pack}.json'), 'w', encoding='utf-8') as fh:
+            row = dict.fromkeys(sm.EXPECTED_ROW_KEYS)
+            row.update(pack=pack, ops={op: {'sig': s} for op, s in ops.items()})
+            json.dump(row, fh)
+
+
+class DiffSig(unittest.TestCase):
+    def test_changes_are_named_node_by_node(self) -> None:
+        before = sig(node(1), node(2, type='Note'), links=1)
+        after = sig(
+            node(1, wn='seed=combo,steps=number', collapsed=True), node(3), links=2
+        )
+
+        self.assertEqual(
+            sig_diff.diff_sig(before, after),
+            [
+                'links 1 -> 2',
+                'node 1 (KSampler) collapsed: false -> true',
+                'node 1 (KSampler) widgets: 1 -> 2',
+                'node 1 (KSampler) wn: -seed=number +seed=combo +steps=number',
+                'node 2 (Note) removed',
+                'node 3 (KSampler) added',
+            ],
+        )
+
+    def test_unstructured_signatures_are_shown_whole(self) -> None:
+        self.assertEqual(sig_diff.diff_sig(sig(node(1)), sig(node(1))), [])
+        self.assertEqual(
+            sig_diff.diff_sig(sig(node(1)), 'SIGFAIL boom')[-1][-15:],
+            '-> SIGFAIL boom',
+        )
+        self.assertEqual(
+            sig_diff.diff_sig('{"n": 0}', None), ['{"n": 0} -> null']
+        )
+
+
+class MovedRows(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base = os.path.join(tmp.name, 'base')
+        self.head = os.path.join(tmp.name, 'head')
+        packs = {f'p{i}': {'load': sig(node(1)), 'paste': sig(node(1))} for i in range(4)}
+        write_rows(self.base, packs)
+        matrix_rows.pack_rows(self.base, 'shard-1')
+        packs['p1'] = {'load': sig(node(1)), 'paste': sig(node(1), node(2))}
+        packs['p2'] = {'load': sig(node(1, mode=4)), 'paste': sig(node(1))}
+        write_rows(self.head, packs)
+        rows = [r for _name, r in matrix_rows.read_rows(self.base, [])]
+        self.table = sm.op_sig_table(sm.aggregate(rows, {}))
+
+    def test_the_table_finds_moves_and_only_moved_base_rows_are_read(self) -> None:
+        by_op, kept = sig_diff.moved_rows(self.head, self.table)
+        with mock.patch.object(
+            sig_diff, 'read_row', wraps=matrix_rows.read_row
+        ) as read_row:
+            lines = sig_diff.report(by_op, kept, self.base)
+
+        self.assertEqual(by_op, {'load': ['p2'], 'paste': ['p1']})
+        self.assertEqual(sorted(c.args[1] for c in read_row.call_args_list),
+                         ['p1.json', 'p2.json'])
+        self.assertEqual(lines[0], '2 moved signatures in 2 packs, 2 operations')
+        self.assertIn('    node 1 (KSampler) mode: 0 -> 4', lines)
+        self.assertIn('    node 2 (KSampler) added', lines)
+
+    def test_base_rows_stand_in_for_a_missing_table(self) -> None:
+        self.assertEqual(
+            sig_diff.moved_rows(self.head, None, self.base)[0],
+            sig_diff.moved_rows(self.head, self.table)[0],
+        )
+        self.assertIsNone(sig_diff.moved_rows(self.head, None))
+
+    def test_one_operation_can_be_singled_out(self) -> None:
+        by_op, kept = sig_diff.moved_rows(self.head, self.table)
+        lines = sig_diff.report(by_op, kept, self.base, only_op='paste')
+
+        self.assertIn('paste: 1 packs moved', lines)
+        self.assertNotIn('load: 1 packs moved', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,6 +11,7 @@ matrix workflow against the poison corpus.
 
 from __future__ import annotations
 
+import functools
 import io
 import json
 import os
@@ -22,7 +23,11 @@ from unittest import mock
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+import matrix_rows
 import summarize_matrix as sm
+from census_store import CensusStore
+from sample_plan import make_sample
+from shard_plan import plan_digest
 
 
 def row(pack: str, **over: object) -> dict:
@@ -60,6 +65,15 @@ def manifests_for(rows: list[dict], shards: int = 4) -> dict[str, dict]:
     return out
 
 
+def plan_for(manifests: dict[str, dict]) -> dict:
+    packs = {
+        pack: int(name.split('-')[-1].split('.')[0])
+        for name, manifest in manifests.items()
+        for pack in manifest
+    }
+    return {'shards': 4, 'packs': packs, 'digest': plan_digest(4, packs)}
+
+
 def break_both_entries(r: dict) -> None:
     r['load'] = {'./a.js': 'THREW boom', './b.js': 'THREW boom'}
     r['loadedOk'] = 0
@@ -266,6 +280,38 @@ class Population(unittest.TestCase):
         v = sm.evaluate(rows, manifests_for(rows), expect_shards=4)
         self.assertEqual(v.code, 0, v.lines)
 
+    def test_shards_sharing_one_plan_pass(self) -> None:
+        rows = population()
+        manifests = manifests_for(rows)
+        plan = plan_for(manifests)
+        plans = {f'_plan-shard-{n}.json': plan for n in range(1, 5)}
+        v = sm.evaluate(rows, manifests, expect_shards=4, plans=plans)
+        self.assertEqual(v.code, 0, v.lines)
+
+    def test_shards_built_from_different_plans_withhold(self) -> None:
+        rows = population()
+        manifests = manifests_for(rows)
+        plan = plan_for(manifests)
+        swapped = dict(plan['packs'], **{'pack-000': 2, 'pack-001': 1})
+        other = {
+            **plan, 'packs': swapped, 'digest': plan_digest(4, swapped)
+        }
+        plans = {f'_plan-shard-{n}.json': plan for n in range(1, 4)}
+        plans['_plan-shard-4.json'] = other
+        v = sm.evaluate(rows, manifests, expect_shards=4, plans=plans)
+        self.assertEqual(v.code, 2)
+        self.assertIn('SHARD PLAN MISMATCH', '\n'.join(v.lines))
+
+    def test_a_missing_or_unreadable_plan_withholds(self) -> None:
+        rows = population()
+        manifests = manifests_for(rows)
+        plan = plan_for(manifests)
+        plans = {f'_plan-shard-{n}.json': plan for n in range(1, 4)}
+        short = sm.evaluate(rows, manifests, expect_shards=4, plans=plans)
+        plans['_plan-shard-4.json'] = {}
+        broken_plan = sm.evaluate(rows, manifests, expect_shards=4, plans=plans)
+        self.assertEqual((short.code, broken_plan.code), (2, 2))
+
     def test_unset_expectation_skips_the_population_gate(self) -> None:
         rows = population()
         self.assertEqual(sm.evaluate(rows[:40], manifests_for(rows)).code, 0)
@@ -303,6 +349,364 @@ class Population(unittest.TestCase):
         self.assertIsNone(verdict.metrics)
 
 
+def shard_aggregates(rows: list[dict], manifests: dict[str, dict]) -> dict[str, dict]:
+    """What each shard of manifests_for() would write, keyed as main() reads."""
+    out = {}
+    for name, manifest in manifests.items():
+        mine = sorted(
+            (manifest[r['pack']]['safe'] + '.json', r)
+            for r in rows
+            if r['pack'] in manifest
+        )
+        agg = sm.aggregate([r for _, r in mine], {name: manifest}, [k for k, _ in mine])
+        out[name.replace('_manifest', '_aggregate')] = json.loads(json.dumps(agg))
+    return out
+
+
+class Aggregates(unittest.TestCase):
+    def test_merged_shards_render_the_single_pass_verdict(self) -> None:
+        rows = broken(2, break_op_err)
+        for r in rows[2:4]:
+            r['ops']['load']['err'] = 'other'
+        stub_out(rows[5])
+        manifests = manifests_for(rows)
+        aggregates = list(shard_aggregates(rows, manifests).values())
+        whole = sm.evaluate(rows, manifests, expect_shards=4)
+
+        for grouping in (
+            sm.merge(aggregates),
+            sm.merge([sm.merge(aggregates[2:]), sm.merge(aggregates[:2][::-1])]),
+        ):
+            merged = sm.render(grouping, manifests, expect_shards=4)
+            self.assertEqual(
+                (merged.code, merged.lines, merged.metrics),
+                (whole.code, whole.lines, whole.metrics),
+            )
+        self.assertIn('     2x load: boom', whole.lines)
+
+    def test_a_generator_is_read_once_to_the_same_verdict(self) -> None:
+        rows = broken(2, break_op_desync)
+        stub_out(rows[7])
+        pulled = []
+
+        def stream():
+            for r in rows:
+                pulled.append(r['pack'])
+                yield r
+
+        streamed = sm.evaluate_stream(stream(), manifests_for(rows))
+        listed = sm.evaluate(rows, manifests_for(rows))
+
+        self.assertEqual(pulled, [r['pack'] for r in rows])
+        self.assertEqual(
+            (streamed.code, streamed.lines, streamed.breaches, streamed.metrics),
+            (listed.code, listed.lines, listed.breaches, listed.metrics),
+        )
+
+    def test_an_operation_one_shard_never_ran_counts_against_its_packs(self) -> None:
+        rows = population(8)
+        for r in rows[:4]:
+            r['ops']['extra'] = {'sig': '{}'}
+        merged = sm.merge(
+            [sm.aggregate(rows[:4], {}), sm.aggregate(rows[4:], {})]
+        )
+
+        verdict = sm.render(merged, {})
+
+        self.assertIn(f'  {"extra":18s}     4 of 8 clean', verdict.lines)
+        self.assertEqual(verdict.code, 1)
+
+    def test_signatures_hashed_another_way_are_not_compared(self) -> None:
+        rows = population()
+        metrics = sm.evaluate(rows, {}).metrics
+        old = dict(metrics, runId='old', sigScheme=sm.SIG_SCHEME - 1)
+        rows[0]['ops']['load']['sig'] = '{"moved": 1}'
+
+        same = sm.evaluate(rows, {}, dict(metrics, runId='old'))
+        other = sm.evaluate(rows, {}, old)
+
+        self.assertIn('1 of 100', '\n'.join(same.lines))
+        self.assertNotIn('signature moved', '\n'.join(other.lines))
+
+    def test_moved_signatures_are_reported_by_operation(self) -> None:
+        rows = population()
+        for r in rows:
+            r['ops']['serialize'] = {'err': '', 'sig': '{}', 'depr': '', 'desync': ''}
+        metrics = sm.evaluate(rows, {}).metrics
+        for r in rows[:3]:
+            r['ops']['serialize']['sig'] = '{"moved": 1}'
+        rows[5]['ops']['load']['sig'] = '{"moved": 1}'
+
+        v = sm.evaluate(rows, {}, dict(metrics, runId='old'))
+        report = '\n'.join(v.lines)
+
+        self.assertEqual(metrics['opSigs']['ops'], ['load', 'serialize'])
+        self.assertEqual(len(metrics['opSigs']['packs']['pack-000'].split()), 2)
+        self.assertIn('4 of 100', report)
+        self.assertIn('serialize                3  pack-000, pack-001, pack-002', report)
+        self.assertIn('load                     1  pack-005', report)
+        self.assertLess(
+            report.index('serialize                3'),
+            report.index('load                     1'),
+        )
+
+    def test_an_operation_new_since_the_baseline_has_not_moved(self) -> None:
+        was = {'ops': ['load'], 'packs': {'a': 'h1', 'b': 'h1'}}
+        now = {'ops': ['fresh', 'load'], 'packs': {'a': 'h9 h1', 'b': 'h9 h2'}}
+
+        self.assertEqual(sm.moved_ops(now, was), {'load': ['b']})
+        self.assertIsNone(sm.moved_ops(now, {'packs': {}}))
+
+    def test_parsed_rows_get_the_verdict_their_dicts_get(self) -> None:
+        rows = broken(2, break_op_err)
+        break_op_desync(rows[2])
+        add_hook_error(rows[3])
+        break_one_entry(rows[4])
+        stub_out(rows[5])
+        rows[6]['ops']['paste'] = 'not an object'
+        rows[7]['ops']['load']['dispatching'] = False
+        rows[7]['ops']['load']['err'] = 'static write'
+        drifted = population(3)
+        del drifted[1]['hookErrors']
+
+        for case in (rows, drifted):
+            a = sm.evaluate(case, {})
+            b = sm.evaluate([sm.parse_row(r) for r in case], {})
+            self.assertEqual((a.code, a.lines, a.breaches, a.metrics),
+                             (b.code, b.lines, b.breaches, b.metrics))
+
+    def test_parsed_rows_share_their_outcomes_and_op_names(self) -> None:
+        first, second = (sm.parse_row(r) for r in population(2))
+
+        self.assertIs(first.op_names, second.op_names)
+        self.assertIs(first.op_results[0], second.op_results[0])
+        self.assertEqual(first.sigs, f'load={sm.op_hash({"sig": "{}"})}')
+
+
+def partial(
+    rows: list[dict], finished: int, shards: int = 4, stopped: bool = False
+) -> sm.Verdict:
+    """render_partial() once the first `finished` packs have run, shard 1's
+    first, and only the first `shards` shards of manifests_for(rows) built."""
+    manifests = manifests_for(rows)
+    plans = {'_plan-shard-1.json': plan_for(manifests)}
+    manifests = dict(list(manifests.items())[:shards])
+    so_far = [
+        json.loads(json.dumps(r))
+        for manifest in manifests.values()
+        for r in rows
+        if r['pack'] in manifest
+    ]
+    for r in so_far[finished:]:
+        stub_out(r)
+    completed = {r['pack'] for r in so_far if not r.get('incomplete')}
+    return sm.render_partial(
+        sm.aggregate(so_far, manifests), manifests, completed, 4, plans, stopped
+    )
+
+
+def shard_one_broken(n: int, mutate) -> list[dict]:
+    """population() with its first n shard-1 packs broken."""
+    rows = population()
+    for r in rows[: 4 * n : 4]:
+        mutate(r)
+    return rows
+
+
+class Incremental(unittest.TestCase):
+    def test_a_cratered_start_fails_before_the_rest_has_run(self) -> None:
+        rows = shard_one_broken(20, break_both_entries)
+
+        v = partial(rows, 50)
+
+        self.assertEqual(v.code, 1)
+        self.assertIn('VERDICT: FAIL CERTAIN', v.lines[-1])
+        self.assertTrue(any('entry JS loads' in b for b in v.breaches))
+        self.assertEqual(sm.evaluate(rows, manifests_for(rows)).code, 1)
+
+    def test_a_breach_a_perfect_remainder_can_absorb_stays_open(self) -> None:
+        v = partial(shard_one_broken(4, break_both_entries), 20)
+
+        self.assertEqual(v.code, 0)
+        self.assertIn('VERDICT: open', v.lines[-1])
+
+    def test_stubs_still_running_are_not_hangs(self) -> None:
+        self.assertEqual(partial(population(), 5).code, 0)
+
+    def test_unbuilt_shards_leave_entry_files_open(self) -> None:
+        rows = shard_one_broken(20, break_one_entry)
+
+        known = partial(rows, 50)
+        one_shard = partial(rows, 50, shards=1)
+
+        self.assertEqual(known.code, 1)
+        self.assertEqual(one_shard.code, 0)
+        self.assertIn('(75 in shards not built yet)', one_shard.lines[0])
+        self.assertNotIn('BREACH CERTAIN', '\n'.join(one_shard.lines))
+
+    def test_a_breach_the_harness_gate_could_withhold_is_left_to_the_verdict(
+        self,
+    ) -> None:
+        rows = [row(f'pack-{i:03d}') for i in range(400)]
+        for r in rows:
+            break_both_entries(r)
+            r['selfCheck'] = 'FAIL'
+        manifests = manifests_for(rows)
+        so_far = [json.loads(json.dumps(r)) for r in rows]
+        shard_one = [
+            r for r in so_far if r['pack'] in manifests['_manifest-shard-1.json']
+        ]
+        for r in shard_one[40:] + [r for r in so_far if r not in shard_one]:
+            stub_out(r)
+        finished = [r for r in so_far if not r.get('incomplete')]
+        judge = functools.partial(
+            sm.render_partial, sm.aggregate(so_far, manifests), manifests,
+            {r['pack'] for r in finished}, 4,
+        )
+
+        polled, merged = judge(), judge(stopped=True)
+
+        self.assertEqual(polled.code, 1)
+        self.assertIn('VERDICT: PASS IMPOSSIBLE', polled.lines[-1])
+        self.assertIn('left to the verdict job', polled.lines[-1])
+        self.assertEqual(merged.code, 2)
+        self.assertIn('only 0.0% of the packs that ran', merged.lines[-1])
+        self.assertEqual(sm.evaluate(finished, {}).code, 2)
+
+    def test_a_shard_stops_while_the_rest_could_all_hang(self) -> None:
+        v = partial(shard_one_broken(20, break_both_entries), 20)
+
+        self.assertEqual(v.code, 1)
+        self.assertIn('80 packs could still hang against 20 measured', v.lines[-1])
+
+    def test_a_finished_broken_shard_stops_on_its_plan_alone(self) -> None:
+        # CI: the shard sees its own manifest and the plan, nothing else.
+        rows = shard_one_broken(25, break_both_entries)
+
+        polled = partial(rows, 25, shards=1)
+        merged = partial(rows, 25, stopped=True)
+
+        self.assertEqual(polled.code, 1, polled.lines)
+        self.assertIn('VERDICT: PASS IMPOSSIBLE', polled.lines[-1])
+        self.assertIn('75 packs could still hang against 25 measured', polled.lines[-1])
+        self.assertEqual(merged.code, 1)
+        self.assertIn('VERDICT: FAIL CERTAIN', merged.lines[-1])
+
+    def test_an_unknown_population_decides_nothing(self) -> None:
+        rows = shard_one_broken(20, break_both_entries)
+        manifests = dict(list(manifests_for(rows).items())[:1])
+
+        v = sm.render_partial(
+            sm.aggregate(rows[:80:4], manifests), manifests,
+            {r['pack'] for r in rows[:80:4]}, 4,
+        )
+
+        self.assertEqual(v.code, 0)
+        self.assertIn('population not yet known', v.lines[0])
+
+
+BASELINE = {'entryPct': 100.0, 'runId': 'run-1'}
+
+
+def sampled(rows: list[dict], size: int) -> tuple[list[dict], dict, dict[str, dict]]:
+    """(sampled rows, sample, its one manifest) for a size-pack sample of rows,
+    every pack two entries, so one stratum besides the coverage pick."""
+    sample = make_sample({r['pack']: [2, 0, ['@/scripts/app']] for r in rows}, size)
+    picked = [r for r in rows if r['pack'] in sample['packs']]
+    return picked, sample, manifests_for(picked, shards=1)
+
+
+def by_stratum(picked: list[dict], sample: dict, manifests: dict) -> dict[str, dict]:
+    strata: dict[str, list[dict]] = {}
+    for r in picked:
+        strata.setdefault(sample['packs'][r['pack']], []).append(r)
+    return {name: sm.aggregate(rows, manifests) for name, rows in strata.items()}
+
+
+def judge_sample(
+    rows: list[dict], size: int, prev: object = BASELINE, **kwargs
+) -> sm.Verdict:
+    picked, sample, manifests = sampled(rows, size)
+    return sm.render_sample(
+        by_stratum(picked, sample, manifests), sample, manifests, 1,
+        prev=prev, **kwargs,
+    )
+
+
+class Sample(unittest.TestCase):
+    def test_intervals_clear_of_every_floor_pass_provisionally(self) -> None:
+        v = judge_sample(population(1000), 450)
+
+        self.assertEqual(v.code, 0, v.lines)
+        self.assertIn('SAMPLE ESTIMATE - 450 of 1000 JS packs', '\n'.join(v.lines))
+        self.assertIn('VERDICT: PROVISIONAL PASS', v.lines[-1])
+        self.assertIsNone(v.metrics)
+
+    def test_an_interval_wholly_below_its_floor_fails(self) -> None:
+        rows = population(1000)
+        for r in rows[::3]:
+            break_op_err(r)
+
+        v = judge_sample(rows, 450)
+
+        self.assertEqual(v.code, 1)
+        self.assertIn('VERDICT: SAMPLE FAIL', v.lines[-1])
+        self.assertTrue(
+            any('every operation clean (worst: load)' in b for b in v.breaches)
+        )
+
+    def test_no_baseline_leaves_the_delta_to_the_full_run(self) -> None:
+        v = judge_sample(population(1000), 450, prev=None)
+        rerun = judge_sample(population(1000), 450, run_id='run-1')
+
+        self.assertEqual(v.code, 2)
+        self.assertIn('no baseline to rule out an entry-clean drop', v.lines[-1])
+        self.assertNotIn('too close to call', v.lines[-1])
+        self.assertEqual(rerun.code, 2)
+
+    def test_an_erosion_the_interval_cannot_rule_out_is_undecided(self) -> None:
+        rows = population(1000)
+        for r in rows[::50]:
+            break_one_entry(r)  # entry-clean 99%: a 1pp drop, within tolerance
+
+        v = judge_sample(rows, 450)
+        rolling = judge_sample(
+            rows, 450, [{**BASELINE, 'verdict': 'PASS'}], rolling=5
+        )
+
+        self.assertEqual(v.code, 2, v.lines)
+        self.assertIn('entry-clean delta vs previous run too close', v.lines[-1])
+        self.assertEqual(rolling.code, 2)
+        self.assertIn('median of 1 runs', '\n'.join(rolling.lines))
+
+    def test_a_drop_wholly_past_the_tolerance_fails(self) -> None:
+        rows = population(1000)
+        for r in rows[::5]:
+            break_one_entry(r)  # entry-clean 90%: floor 91% and delta both
+
+        v = judge_sample(rows, 450)
+
+        self.assertEqual(v.code, 1)
+        self.assertTrue(any('dropped at least' in b for b in v.breaches))
+
+    def test_a_sample_too_small_to_tell_is_undecided(self) -> None:
+        v = judge_sample(population(1000), 80)
+
+        self.assertEqual(v.code, 2)
+        self.assertIn('VERDICT: UNDECIDED', v.lines[-1])
+        self.assertIn('registerNodeDef OK', v.lines[-1])
+
+    def test_the_gates_still_withhold_a_sample(self) -> None:
+        picked, sample, manifests = sampled(population(1000), 450)
+
+        v = sm.render_sample(
+            {'2-3': sm.aggregate(picked[1:], manifests)}, sample, manifests, 1
+        )
+
+        self.assertEqual(v.code, 2)
+        self.assertNotIn('SAMPLE ESTIMATE', '\n'.join(v.lines))
+
+
 class DeltaGate(unittest.TestCase):
     def eroded(self) -> list[dict]:
         return broken(10, break_one_entry)
@@ -335,6 +739,35 @@ class DeltaGate(unittest.TestCase):
                 )
 
 
+    def test_a_rolling_median_outvotes_one_lucky_baseline(self) -> None:
+        history = [
+            {'entryPct': e, 'runId': f'run-{i}', 'verdict': 'PASS'}
+            for i, e in enumerate((100.0, 96.0, 96.0, 95.5, 97.0))
+        ]
+
+        single = sm.evaluate(self.eroded(), {}, history[0], 'run-9')
+        rolling = sm.evaluate(self.eroded(), {}, history, 'run-9', rolling=5)
+
+        self.assertEqual(single.code, 1)
+        self.assertEqual(rolling.code, 0, rolling.lines)
+        self.assertIn(
+            '-1.0pp  (floor -1.5pp, median of 5 runs)', '\n'.join(rolling.lines)
+        )
+
+    def test_the_rolling_window_skips_this_run_and_failed_runs(self) -> None:
+        history = [
+            {'entryPct': 80.0, 'runId': 'run-9', 'verdict': 'PASS'},
+            {'entryPct': 80.0, 'runId': 'run-8', 'verdict': 'FAIL'},
+            {'entryPct': 100.0, 'runId': 'run-7', 'verdict': 'PASS'},
+        ]
+
+        v = sm.evaluate(self.eroded(), {}, history, 'run-9', rolling=3)
+
+        self.assertEqual(v.code, 1)
+        self.assertIn('from 100.0%, median of 1 runs', v.breaches[0])
+        self.assertIsNone(sm.rolling_baseline(history[:2], 3, 'run-9'))
+
+
 class StaleRegistry(unittest.TestCase):
     def test_stale_marker_reaches_report_and_metrics(self) -> None:
         v = sm.evaluate(
@@ -350,9 +783,97 @@ class StaleRegistry(unittest.TestCase):
         self.assertIsNone(v.metrics['staleRegistry'])
 
 
+def measured(entry: float, healthy: bool = True, delta: float | None = None) -> tuple:
+    values = {name: 100.0 for name in sm.FLOORS}
+    values.update(entry_clean=entry, delta=delta)
+    return values, healthy
+
+
+class Simulate(unittest.TestCase):
+    def test_values_are_the_percentages_render_gates(self) -> None:
+        rows = broken(3, break_op_err)
+        for r in rows[3:13]:
+            break_one_entry(r)
+
+        values = sm.criterion_values(sm.aggregate(rows, {}))
+
+        self.assertEqual(values['op_clean'], 97.0)
+        self.assertEqual(values['entry_clean'], 95.0)
+        self.assertEqual(values['any_loaded'], 100.0)
+
+    def test_each_configuration_counts_false_alarms_and_misses(self) -> None:
+        runs = [measured(92.0), measured(95.0), measured(90.0, healthy=False)]
+
+        results = {
+            config['entry_clean']: (fp, fn)
+            for config, fp, fn in sm.simulate(
+                runs, {'entry_clean': [89.0, 91.0, 93.0]}
+            )
+        }
+
+        self.assertEqual(results, {89.0: (0, 1), 91.0: (0, 0), 93.0: (1, 0)})
+
+    def test_the_tolerance_judges_the_delta_and_skips_a_first_run(self) -> None:
+        runs = [
+            measured(96.0),
+            measured(94.0, delta=-2.0),
+            measured(93.0, healthy=False, delta=-3.0),
+        ]
+
+        results = [
+            (config['tolerance'], fp, fn)
+            for config, fp, fn in sm.simulate(runs, {'tolerance': [1.5, 2.5, 3.5]})
+        ]
+
+        self.assertEqual(results, [(1.5, 1, 0), (2.5, 0, 0), (3.5, 0, 1)])
+
+    def test_stored_runs_are_ranked_against_their_labels(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            runs = {
+                'run-1': population(),
+                'run-2': broken(4, break_one_entry),  # 98% clean, labelled FAIL
+                'run-3': broken(2, break_one_entry),
+                'run-4': broken(100, stub_out),  # withheld
+            }
+            for name, rows in runs.items():
+                os.makedirs(os.path.join(tmp, name))
+                for r in rows:
+                    with open(
+                        os.path.join(tmp, name, f'{r["pack"]}.json'), 'w',
+                        encoding='utf-8',
+                    ) as fh:
+                        json.dump(r, fh)
+            labels = os.path.join(tmp, 'labels.json')
+            with open(labels, 'w', encoding='utf-8') as fh:
+                json.dump({'run-1': 'PASS', 'run-2': 'FAIL', 'run-3': 'PASS',
+                           'run-4': 'PASS'}, fh)
+            buf = io.StringIO()
+            with redirect_stdout(buf):
+                code = sm.simulate_main(
+                    [*(os.path.join(tmp, n) for n in runs), '--labels', labels,
+                     '--vary', 'tolerance=1:2:0.5', '--vary', 'entry_clean=98',
+                     '--top', '2']
+                )
+
+        lines = buf.getvalue().splitlines()
+        self.assertEqual(code, 0)
+        self.assertEqual(lines[0], 'floor simulation: 3 labelled runs (2 PASS, 1 FAIL)')
+        self.assertIn('withheld at the current floors', lines[1])
+        self.assertIn('run-4', lines[1])
+        self.assertTrue(lines[2].startswith('3 configurations in '), lines[2])
+        self.assertIn('misses 0 (0.0%) of 1 FAIL runs', lines[3])
+        # run-2's 2pp drop fails it within a tolerance under 2; run-3's 1pp
+        # drop and 99% clean pass it.
+        self.assertEqual(lines[-2:], [
+            '    0   0  entry_clean 98',
+            '    0   0  entry_clean 98, tolerance 1',
+        ])
+
+
 class MainIO(unittest.TestCase):
     def run_main(
-        self, rows, manifests=None, malformed_rows=(), **env
+        self, rows, manifests=None, malformed_rows=(), aggregates=None,
+        packed='', files=None, **env
     ) -> tuple[int, str, str]:
         with tempfile.TemporaryDirectory() as tmp:
             out = os.path.join(tmp, 'rows')
@@ -367,6 +888,11 @@ class MainIO(unittest.TestCase):
             for name in malformed_rows:
                 with open(f'{out}/{name}', 'w', encoding='utf-8') as fh:
                     fh.write('{')
+            for name, doc in {**(aggregates or {}), **(files or {})}.items():
+                with open(f'{out}/{name}', 'w', encoding='utf-8') as fh:
+                    json.dump(doc, fh)
+            if packed:
+                matrix_rows.pack_rows(out, packed)
             metrics = os.path.join(tmp, 'metrics', 'metrics.json')
             summary = os.path.join(tmp, 'summary.md')
             environ = {
@@ -422,6 +948,165 @@ class MainIO(unittest.TestCase):
         )
         self.assertEqual(code, 0)
 
+    def test_shard_aggregates_stand_in_for_rows(self) -> None:
+        rows = broken(1, break_op_err)
+        manifests = manifests_for(rows)
+        aggregates = shard_aggregates(rows, manifests)
+        expected = self.run_main(rows, manifests, MATRIX_EXPECT_SHARDS='4')
+
+        with mock.patch.object(sm, 'aggregate', side_effect=AssertionError):
+            merged = self.run_main(
+                rows, manifests, aggregates=aggregates, MATRIX_EXPECT_SHARDS='4'
+            )
+
+        self.assertEqual(merged, expected)
+        self.assertEqual(merged[0], 0)
+
+    def test_aggregates_short_of_the_row_files_are_not_trusted(self) -> None:
+        rows = population()
+        manifests = manifests_for(rows)
+        aggregates = shard_aggregates(rows[:-1], manifests)
+
+        code, _, output = self.run_main(
+            broken(1, stub_out), manifests, aggregates=aggregates
+        )
+
+        self.assertEqual(code, 0)
+        self.assertIn('(hung or crashed: 1)', output)
+
+    def test_aggregate_mode_writes_the_shard_share_only(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, '_aggregate-shard-1.json')
+            code, metrics, output = self.run_main(
+                broken(2, stub_out), MATRIX_AGGREGATE_OUT=out
+            )
+            with open(out, encoding='utf-8') as fh:
+                agg = json.load(fh)
+
+        self.assertEqual((code, metrics, output), (0, '', ''))
+        self.assertEqual((agg['rows'], agg['stubs'], agg['measured']), (100, 2, 98))
+
+    def test_packed_rows_give_the_directory_verdict(self) -> None:
+        rows = broken(1, break_op_err)
+        manifests = manifests_for(rows)
+        for malformed in ((), ('truncated.json',)):
+            expected = self.run_main(
+                rows, manifests, malformed, MATRIX_EXPECT_SHARDS='4'
+            )
+            packed = self.run_main(
+                rows, manifests, malformed, packed='shard-1',
+                MATRIX_EXPECT_SHARDS='4',
+            )
+            self.assertEqual(packed, expected)
+        self.assertEqual(expected[0], 2)
+
+    def test_a_poll_records_only_a_decided_outcome(self) -> None:
+        rows = shard_one_broken(20, break_both_entries)
+        for i, r in enumerate(rows[:40]):
+            if i % 4:
+                stub_out(r)
+        manifests = manifests_for(rows)
+        with tempfile.TemporaryDirectory() as tmp:
+            marker = os.path.join(tmp, '_stopped-shard-1.json')
+            code, metrics, output = self.run_main(
+                rows, manifests, MATRIX_PARTIAL_OUT=marker,
+                MATRIX_EXPECT_SHARDS='4',
+            )
+            stopped = json.loads(read_if_present(marker))
+            open_code, _, _ = self.run_main(
+                population(), manifests, MATRIX_PARTIAL_OUT=marker + '.2',
+                MATRIX_EXPECT_SHARDS='4',
+            )
+            self.assertFalse(os.path.exists(marker + '.2'))
+
+        self.assertEqual((code, metrics), (1, ''))
+        self.assertIn('FAIL CERTAIN', output)
+        self.assertEqual(stopped['code'], 1)
+        self.assertEqual(open_code, 0)
+
+    def test_a_run_stopped_early_fails_rather_than_reading_as_hung(self) -> None:
+        rows = shard_one_broken(20, break_both_entries)
+        for r in rows[60:]:
+            stub_out(r)
+        manifests = manifests_for(rows)
+        marker = {'_stopped-shard-1.json': {'code': 1}}
+
+        hung = self.run_main(rows, manifests, MATRIX_EXPECT_SHARDS='4')
+        code, metrics, output = self.run_main(
+            rows, manifests, files=marker, MATRIX_EXPECT_SHARDS='4'
+        )
+
+        hangs = 'rows complete (no hang or crash) 60.0% < 98%'
+        self.assertIn(hangs, hung[2])
+        self.assertNotIn(hangs, output)
+        self.assertEqual((code, metrics), (1, ''))
+        self.assertIn('STOPPED EARLY: _stopped-shard-1.json', output)
+
+    def test_a_sample_beside_the_rows_is_judged_as_one(self) -> None:
+        picked, sample, manifests = sampled(population(1000), 450)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as prev:
+            json.dump(BASELINE, prev)
+            prev.flush()
+            code, metrics, output = self.run_main(
+                picked, manifests, files={'_sample.json': sample},
+                MATRIX_EXPECT_SHARDS='1', MATRIX_PREV=prev.name,
+            )
+            sample['packs']['pack-000'] = '1'
+            edited = self.run_main(
+                picked, manifests, files={'_sample.json': sample},
+                MATRIX_EXPECT_SHARDS='1', MATRIX_PREV=prev.name,
+            )
+
+        self.assertEqual((code, metrics), (0, ''))
+        self.assertIn('PROVISIONAL PASS', output)
+        self.assertEqual(edited[0], 2)
+
+    def test_calibration_redraws_samples_from_the_full_rows(self) -> None:
+        rows = population(1000)
+        for r in rows[::3]:
+            break_op_err(r)
+        sample = sampled(rows, 450)[1]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'sample.json')
+            with open(path, 'w', encoding='utf-8') as fh:
+                json.dump(sample, fh)
+            code, metrics, output = self.run_main(
+                rows, manifests_for(rows), MATRIX_CALIBRATE=path,
+                MATRIX_CALIBRATE_SEEDS='3',
+            )
+
+        self.assertEqual((code, metrics), (0, ''))
+        self.assertIn('3 samples of 450 from 1000 JS packs', output)
+        self.assertIn('full verdict (FAIL)', output)
+        self.assertIn('sample FAIL 3', output)
+        self.assertIn('0 provisional PASS over a full FAIL', output)
+        self.assertIn('## Sample calibration', output)
+
+    def test_the_delta_reads_a_rolling_baseline_from_the_history(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, 'census.sqlite')
+            with CensusStore(db) as store:
+                for i, entry in enumerate((96.0, 96.5, 100.0)):
+                    store.record_metrics(
+                        {'entryPct': entry, 'runId': f'run-{i}', 'verdict': 'PASS'},
+                        recorded=float(i),
+                    )
+            prev = os.path.join(tmp, 'metrics.json')
+            with open(prev, 'w', encoding='utf-8') as fh:
+                json.dump({'entryPct': 100.0, 'runId': 'run-2'}, fh)
+            env = {'MATRIX_PREV': prev, 'MATRIX_RUN_ID': 'run-3'}
+
+            single = self.run_main(broken(10, break_one_entry), **env)
+            rolling = self.run_main(
+                broken(10, break_one_entry), MATRIX_HISTORY_DB=db,
+                MATRIX_ROLLING='3', **env,
+            )
+
+        self.assertEqual(single[0], 1)
+        self.assertEqual(rolling[0], 0)
+        self.assertIn('median of 3 runs', rolling[2])
+
     def test_non_numeric_shard_expectation_is_withheld(self) -> None:
         code, _, _ = self.run_main(population(), MATRIX_EXPECT_SHARDS='four')
         self.assertEqual(code, 2)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import vendor_index as vi
+
+LIB = b'/*! lib v1 */\n' + b'var x = 1;\n' * 200
+
+
+class Normalize(unittest.TestCase):
+    def test_copies_that_differ_only_in_packaging_hash_alike(self) -> None:
+        variants = [
+            LIB,
+            b'\xef\xbb\xbf' + LIB,
+            LIB.replace(b'\n', b'\r\n'),
+            LIB.replace(b';\n', b';   \n') + b'\n\n',
+            LIB + b'//# sourceMappingURL=lib.min.js.map\n',
+        ]
+
+        self.assertEqual({vi.content_hash(v) for v in variants}, {vi.content_hash(LIB)})
+        self.assertNotEqual(vi.content_hash(LIB), vi.content_hash(LIB + b'var y;'))
+
+
+class MakeIndex(unittest.TestCase):
+    def test_a_library_is_a_large_file_shared_by_enough_packs(self) -> None:
+        lib, small, rare = vi.content_hash(LIB), 'a' * 40, 'b' * 40
+        found = [
+            {lib: (len(LIB), 'three.min.js'), small: (20, 'helper.js')},
+            {lib: (len(LIB), 'vendor.js'), small: (20, 'helper.js')},
+            {lib: (len(LIB), 'three.min.js'), small: (20, 'helper.js'), rare: (5000, 'x.js')},
+        ]
+
+        index = vi.make_index(found)
+
+        self.assertEqual(list(index['libraries']), [lib])
+        self.assertEqual(
+            index['libraries'][lib],
+            {'packs': 3, 'bytes': len(LIB), 'name': 'three.min.js'},
+        )
+        self.assertEqual(vi.make_index(found, min_packs=4)['libraries'], {})
+
+    def test_an_edited_index_is_refused(self) -> None:
+        index = vi.make_index([{'c' * 40: (4096, 'lib.js')}] * 3)
+        with tempfile.TemporaryDirectory() as tmp:
+            good, bad = os.path.join(tmp, 'good.json'), os.path.join(tmp, 'bad.json')
+            with open(good, 'w', encoding='utf-8') as fh:
+                json.dump(index, fh)
+            index['libraries']['d' * 40] = {'packs': 9, 'bytes': 1, 'name': 'x'}
+            with open(bad, 'w', encoding='utf-8') as fh:
+                json.dump(index, fh)
+
+            self.assertEqual(vi.load_index(good), (frozenset({'c' * 40}), index['digest']))
+            with self.assertRaises(SystemExit):
+                vi.load_index(bad)
+
+
+if __name__ == '__main__':
+    unittest.main()
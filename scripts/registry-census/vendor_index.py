@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Known-library index for the ecosystem matrix, keyed by content hash.
+
+A filename says little about what a file is: a renamed three.js bundle reads
+as pack code and is rewritten and scanned like it, while a pack's own
+jquery-helpers.js reads as a vendored bundle. What does identify a library is
+its bytes turning up unchanged in many unrelated packs. The index lists the
+normalized content hash of every JS file of at least MIN_BYTES found
+identically in at least MIN_PACKS packs of the corpus; build_matrix.py stages
+a file whose hash is listed as an asset - linked, never rewritten or scanned.
+
+Normalization ignores what packs change without changing the code: a BOM,
+line endings, trailing whitespace and a trailing sourceMappingURL comment.
+
+Only self-contained files are eligible (build_matrix.library_candidates):
+one that registers an extension, imports the app, or imports another file
+by relative path is pack code however often it is copied, and the build has
+to scan it to stage what it loads. Mentioning the API is not enough - the
+litegraph bundle defines and calls registerNodeType - and neither is a
+computed import(). A bundle too few packs ship to be listed still falls to
+the VEND filename rule (build_matrix.named_vendored()).
+
+The index is a pure function of the corpus, so every shard of a run splits
+vendored from pack code the same way:
+
+    python3 scripts/registry-census/build_matrix.py \\
+        --write-vendor-index matrix-plan/vendor-index.json
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import re
+
+MIN_PACKS = 3
+# Smaller shared files are boilerplate, not libraries: too little to gain
+# from linking them, and nothing the index should vouch for.
+MIN_BYTES = 1024
+INDEX_VERSION = 1
+SOURCE_MAP_RX = re.compile(rb'\n//[#@] sourceMappingURL=\S*$')
+
+
+def normalize(data: bytes) -> bytes:
+    if data.startswith(b'\xef\xbb\xbf'):
+        data = data[3:]
+    data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    data = b'\n'.join(line.rstrip() for line in data.split(b'\n')).rstrip()
+    return SOURCE_MAP_RX.sub(b'', data).rstrip()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha1(normalize(data)).hexdigest()
+
+
+def make_index(
+    found: list[dict[str, tuple[int, str]]], min_packs: int = MIN_PACKS
+) -> dict:
+    """The index over per-pack {hash: (bytes, file name)} candidates.
+
+    A hash counts once per pack, however many copies the pack ships; the name
+    recorded is the most common one, ties broken alphabetically.
+    """
+    packs: dict[str, int] = {}
+    sizes: dict[str, int] = {}
+    names: dict[str, dict[str, int]] = {}
+    for candidates in found:
+        for digest, (size, name) in candidates.items():
+            packs[digest] = packs.get(digest, 0) + 1
+            sizes[digest] = size
+            seen = names.setdefault(digest, {})
+            seen[name] = seen.get(name, 0) + 1
+    libraries = {
+        digest: {
+            'packs': packs[digest],
+            'bytes': sizes[digest],
+            'name': min(names[digest], key=lambda n: (-names[digest][n], n)),
+        }
+        for digest in sorted(packs)
+        if packs[digest] >= min_packs and sizes[digest] >= MIN_BYTES
+    }
+    return {
+        'version': INDEX_VERSION,
+        'minPacks': min_packs,
+        'digest': index_digest(libraries),
+        'libraries': libraries,
+    }
+
+
+def index_digest(libraries: dict) -> str:
+    return hashlib.sha1('\n'.join(sorted(libraries)).encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def load_index(path: str) -> tuple[frozenset[str], str]:
+    """(library hashes, digest) from an index file; exits when unusable.
+
+    Cached per process: every pack a build worker stages consults it.
+    """
+    try:
+        with open(path, encoding='utf-8') as fh:
+            index = json.load(fh)
+    except (OSError, ValueError) as exc:
+        raise SystemExit(f'unreadable vendor index {path}: {exc}') from exc
+    libraries = index.get('libraries') if isinstance(index, dict) else None
+    if not isinstance(libraries, dict) or index.get('version') != INDEX_VERSION:
+        raise SystemExit(f'{path} is not a version {INDEX_VERSION} vendor index')
+    if index.get('digest') != index_digest(libraries):
+        raise SystemExit(f'vendor index {path}: digest does not match its libraries')
+    return frozenset(libraries), index['digest']
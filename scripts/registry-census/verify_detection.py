@@ -20,12 +20,12 @@ this script asserts two things:
 
 from __future__ import annotations
 
-import json
 import os
 import sys
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, HERE)
+from matrix_rows import read_rows  # noqa: E402
 from summarize_matrix import (  # noqa: E402
     CRITERION_LABELS,
     DELTA_CRITERION_LABEL,
@@ -101,16 +101,13 @@ def outcome(verdict: Verdict) -> str:
 def main() -> int:
     out = os.environ.get('MATRIX_OUT', '/tmp/matrix')
     rows: dict[str, dict] = {}
-    for name in os.listdir(out) if os.path.isdir(out) else []:
-        if not name.endswith('.json') or name.startswith('_'):
-            continue
-        try:
-            with open(os.path.join(out, name), encoding='utf-8') as fh:
-                r = json.load(fh)
+    # The harness-integrity check below reports the shortfall; a malformed
+    # row must not kill the reporter that exists to name it.
+    unreadable: list[str] = []
+    for name, r in read_rows(out, unreadable):
+        if isinstance(r.get('pack'), str):
             rows[r['pack']] = r
-        except (OSError, ValueError, KeyError, TypeError):
-            # The harness-integrity check below reports the shortfall; a
-            # malformed row must not kill the reporter that exists to name it.
+        else:
             print(f'  unreadable row: {name}', file=sys.stderr)
 
     failures: list[str] = []
@@ -1,3 +1,7 @@
+import fs from 'node:fs'
+import path from 'node:path'
+import { fileURLToPath } from 'node:url'
+import type { Plugin } from 'vite'
 import { configDefaults, mergeConfig } from 'vitest/config'
 
 import base from './vite.config.mts'
@@ -20,19 +24,88 @@ const merged = mergeConfig(base, {
 
 const PACK_FRAME = '__ecs_matrix__'
 
+// build_matrix.py --serve corpus stages no pack files: each spec imports
+// virtual:ecs-matrix-pack/<safe>/<file>, resolved here to the file in the
+// corpus checkout, and the import rewrites are applied at load time from the
+// pack's rewrite map (UTF-16 offsets, each edit checked against the text it
+// replaces, so a map from an older corpus fails loudly instead of splicing
+// into the wrong bytes). Without serve.json the specs import the copied tree.
+const SERVE_PREFIX = 'virtual:ecs-matrix-pack/'
+const MATRIX_DIR = fileURLToPath(new URL('./src/__ecs_matrix__/', import.meta.url))
+const SERVE_INDEX = path.join(MATRIX_DIR, 'serve.json')
+
+type Edit = [offset: number, old: string, replacement: string]
+interface ServeIndex {
+  corpus: string
+  packs: Record<string, { root: string; map: string }>
+}
+
+function corpusServer(serve: ServeIndex): Plugin {
+  const roots = new Map<string, string>()
+  const edits = new Map<string, Edit[]>()
+  for (const [safe, { root, map }] of Object.entries(serve.packs)) {
+    roots.set(safe, root)
+    const files: Record<string, Edit[]> = JSON.parse(
+      fs.readFileSync(path.join(MATRIX_DIR, map), 'utf-8')
+    ).files
+    for (const [rel, list] of Object.entries(files)) {
+      if (list.length) edits.set(path.join(root, rel), list)
+    }
+  }
+  return {
+    name: 'ecs-matrix-corpus',
+    enforce: 'pre',
+    resolveId(id) {
+      if (!id.startsWith(SERVE_PREFIX)) return null
+      const rest = id.slice(SERVE_PREFIX.length)
+      const slash = rest.indexOf('/')
+      const root = roots.get(rest.slice(0, slash))
+      return root ? path.join(root, rest.slice(slash + 1)) : null
+    },
+    load(id) {
+      const file = id.split('?', 1)[0]
+      const list = edits.get(file)
+      if (!list) return null
+      const code = fs.readFileSync(file, 'utf-8')
+      let out = ''
+      let pos = 0
+      for (const [offset, old, replacement] of list) {
+        if (code.slice(offset, offset + old.length) !== old) {
+          throw new Error(
+            `[matrix] rewrite map is stale for ${file} at ${offset}; rebuild the matrix`
+          )
+        }
+        out += code.slice(pos, offset) + replacement
+        pos = offset + old.length
+      }
+      return out + code.slice(pos)
+    }
+  }
+}
+
+const serve: ServeIndex | null = fs.existsSync(SERVE_INDEX)
+  ? JSON.parse(fs.readFileSync(SERVE_INDEX, 'utf-8'))
+  : null
+const PACK_FRAMES = serve ? [PACK_FRAME, serve.corpus] : [PACK_FRAME]
+if (serve) {
+  merged.plugins = [...(merged.plugins ?? []), corpusServer(serve)]
+  merged.test.env = { ...merged.test.env, MATRIX_CORPUS: serve.corpus }
+}
+
 // Pack code leaks unhandled rejections; without tolerating them vitest
 // attributes a stray rejection to whichever file is currently COLLECTING and
 // fails an innocent spec before its write-ahead stub exists (run
 // 31734434601: 470 specs, 469 rows). Tolerating ALL of them also hid
 // configuration, collection, worker and OOM failures, so the tolerance is
-// scoped to frames inside the generated pack tree. An error from anywhere
-// else is the harness failing and stays fatal.
+// scoped to frames inside the generated pack tree, or the corpus when packs
+// are served from it. An error from anywhere else is the harness failing and
+// stays fatal.
 merged.test.onUnhandledError = (error: unknown) => {
   const stack =
     error && typeof error === 'object' && 'stack' in error
       ? String((error as { stack?: unknown }).stack ?? '')
       : ''
-  if (stack.includes(PACK_FRAME)) return false
+  if (PACK_FRAMES.some((frame) => stack.includes(frame))) return false
   console.error('[matrix] unhandled error outside pack code:', error)
   return true
 }